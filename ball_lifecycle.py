@@ -0,0 +1,148 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Ball lifecycle. Balls are retired by click, by age or by leaving
+         a region into a free list, and new balls reuse them, physics slot
+         and shape included, so scenes that keep spawning balls stay flat
+         in memory and in time per frame.
+"""
+
+import collections
+from physics_core import objects_of_kind
+
+class BallPool:
+    """Spawns balls from a free list of retired ones.
+
+    retire() takes a ball out of the world and keeps it, spawn() brings
+    the last retired ball back with new properties, or adds a new ball
+    when none is free. Balls spawned here are retired once they are
+    lifetime seconds old, and any ball outside region, a box
+    [[x1, y1], [x2, y2]], is retired too. Both are checked by cull(),
+    after every step when the pool is one of the FixedStepper monitors.
+    At most capacity balls are kept free, None for no limit."""
+    def __init__(self, world: "World", lifetime: float = None,
+            region: list = None, capacity: int = None):
+        self.world = world
+        self.lifetime = lifetime
+        self.region = region
+        self.capacity = capacity
+        self.free = []
+        # (spawn time, ball, objectId) in spawn order, oldest first
+        self.births = collections.deque()
+
+        # Counters for stats()
+        self.spawned = 0
+        self.reused = 0
+        self.retired = 0
+
+    def stats(self) -> dict:
+        """Balls in the world and free, spawned, reused and retired."""
+        return {'balls': len(objects_of_kind(self.world.objs, 'balls')),
+            'free': len(self.free), 'spawned': self.spawned,
+            'reused': self.reused, 'retired': self.retired}
+
+    def spawn(self, xy_current: list, radius: float, mass: float,
+            charge: float, velocity: list = None) -> "Ball":
+        """Adds a ball, reusing a retired one if there is any."""
+        world = self.world
+        if self.free:
+            ball = world.respawn_ball(self.free.pop(), xy_current, radius,
+                mass, charge)
+            self.reused += 1
+        else:
+            ball = world.add_ball(xy_current, radius, mass, charge)
+        if velocity is not None:
+            ball.velocity0[0] = ball.velocity1[0] = velocity[0]
+            ball.velocity0[1] = ball.velocity1[1] = velocity[1]
+        self.spawned += 1
+        if self.lifetime is not None:
+            self.births.append((world.clock(), ball, ball.objectId))
+        return ball
+
+    def retire(self, ball: "Ball") -> None:
+        """Takes ball out of the world and keeps it for spawn()."""
+        self.world.remove_object(ball)
+        self.retired += 1
+        if self.capacity is None or len(self.free) < self.capacity:
+            self.free.append(ball)
+        return None
+
+    def alive(self, ball: "Ball", objectId: int) -> bool:
+        """True if ball is still in the world as objectId."""
+        return self.world.objs.get(objectId) is ball
+
+    def ball_at(self, xy: list) -> "Ball | None":
+        """The ball whose circle holds xy, the closest if several do."""
+        particles = getattr(self.world, 'particles', None)
+        if particles is not None:
+            # Array engine, every ball at once
+            d2 = ((particles.xy - xy)**2).sum(axis = 1)
+            rows = (particles.isBall & (d2 <= particles.radius**2)
+                ).nonzero()[0]
+            if len(rows) == 0:
+                return None
+            return particles.objects[int(rows[d2[rows].argmin()])]
+        closest = None
+        closestD2 = None
+        for ball in objects_of_kind(self.world.objs, 'balls'):
+            d2 = (ball.xy_current[0] - xy[0])**2 \
+                + (ball.xy_current[1] - xy[1])**2
+            if d2 <= ball.radius**2 and (closest is None or d2 < closestD2):
+                closest = ball
+                closestD2 = d2
+        return closest
+
+    def retire_at(self, xy: list) -> bool:
+        """Retires the ball under xy, e.g. a click. False if none is."""
+        ball = self.ball_at(xy)
+        if ball is None:
+            return False
+        self.retire(ball)
+        return True
+
+    def expired(self) -> list:
+        """Balls spawned lifetime seconds ago or earlier."""
+        if self.lifetime is None:
+            return []
+        now = self.world.clock()
+        balls = []
+        while self.births and self.births[0][0] + self.lifetime <= now:
+            spawnTime, ball, objectId = self.births.popleft()
+            # Skip balls retired otherwise, maybe respawned since
+            if self.alive(ball, objectId):
+                balls.append(ball)
+        return balls
+
+    def outside(self) -> list:
+        """Balls whose center is outside region."""
+        if self.region is None:
+            return []
+        [x1, y1], [x2, y2] = self.region
+        particles = getattr(self.world, 'particles', None)
+        if particles is not None:
+            # Array engine, every ball at once
+            x = particles.xy[:, 0]
+            y = particles.xy[:, 1]
+            rows = (particles.isBall & ((x < x1) | (x > x2) | (y < y1)
+                | (y > y2))).nonzero()[0]
+            return [particles.objects[row] for row in rows.tolist()]
+        return [ball for ball in objects_of_kind(self.world.objs, 'balls')
+            if not (x1 <= ball.xy_current[0] <= x2
+                and y1 <= ball.xy_current[1] <= y2)]
+
+    def cull(self) -> int:
+        """Retires expired balls and balls outside region, returns how many.
+
+        Balls are collected first, so rows moving during retire() do not
+        matter."""
+        count = 0
+        for ball in self.expired() + self.outside():
+            if self.alive(ball, ball.objectId):
+                self.retire(ball)
+                count += 1
+        return count
+
+    def after_step(self, world: "World") -> None:
+        """FixedStepper monitor, culls after every step."""
+        self.cull()
+        return None
@@ -0,0 +1,204 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Barnes-Hut quadtree solver for the gravitational and electric
+         pseudo forces. Far away groups of balls and satellites are
+         replaced by one summary body, so a step costs O(N log N).
+"""
+
+import math
+from physics_core import objects_of_kind
+
+class QuadNode:
+    """One square cell of the quadtree.
+
+    Mass and charge are summarized separately. Positive and negative
+    charge each get their own center, so cancelling charges stay exact."""
+    def __init__(self, centerX: float, centerY: float, halfSize: float,
+            depth: int):
+        self.centerX = centerX
+        self.centerY = centerY
+        self.halfSize = halfSize
+        self.depth = depth
+        self.children = None
+        self.bodies = []
+
+        # Totals and weighted centers, filled in by summarize()
+        self.mass = 0
+        self.massXY = [0, 0]
+        self.chargePositive = 0
+        self.positiveXY = [0, 0]
+        self.chargeNegative = 0
+        self.negativeXY = [0, 0]
+
+    def child_for(self, x: float, y: float) -> "QuadNode":
+        """Returns the child quadrant that contains x, y."""
+        index = (x >= self.centerX) + 2 * (y >= self.centerY)
+        return self.children[index]
+
+    def split(self) -> None:
+        """Creates four children and moves the bodies into them."""
+        quarter = self.halfSize / 2
+        self.children = []
+        for signY in (-1, 1):
+            for signX in (-1, 1):
+                self.children.append(QuadNode(self.centerX + signX * quarter,
+                    self.centerY + signY * quarter, quarter, self.depth + 1))
+        bodies = self.bodies
+        self.bodies = []
+        for body in bodies:
+            self.child_for(body[1], body[2]).bodies.append(body)
+        return None
+
+    def summarize(self) -> None:
+        """Totals mass and charge of the subtree and their centers."""
+        if self.children is None:
+            masses = [(body[3], body[1], body[2]) for body in self.bodies]
+        else:
+            masses = []
+            for child in self.children:
+                child.summarize()
+                masses.append((child.mass, child.massXY[0], child.massXY[1]))
+        massSum = [0, 0]
+        for mass, x, y in masses:
+            self.mass += mass
+            massSum[0] += mass * x
+            massSum[1] += mass * y
+        if self.mass != 0:
+            self.massXY = [massSum[0] / self.mass, massSum[1] / self.mass]
+
+        # Charge centers, one for each sign
+        if self.children is None:
+            charges = [(body[4], body[1], body[2]) for body in self.bodies]
+        else:
+            charges = []
+            for child in self.children:
+                charges.append((child.chargePositive, child.positiveXY[0],
+                    child.positiveXY[1]))
+                charges.append((child.chargeNegative, child.negativeXY[0],
+                    child.negativeXY[1]))
+        positiveSum = [0, 0]
+        negativeSum = [0, 0]
+        for charge, x, y in charges:
+            if charge > 0:
+                self.chargePositive += charge
+                positiveSum[0] += charge * x
+                positiveSum[1] += charge * y
+            elif charge < 0:
+                self.chargeNegative += charge
+                negativeSum[0] += charge * x
+                negativeSum[1] += charge * y
+        if self.chargePositive != 0:
+            self.positiveXY = [positiveSum[0] / self.chargePositive,
+                positiveSum[1] / self.chargePositive]
+        if self.chargeNegative != 0:
+            self.negativeXY = [negativeSum[0] / self.chargeNegative,
+                negativeSum[1] / self.chargeNegative]
+        return None
+
+class BarnesHutSolver:
+    """Approximates g_force() and e_force() with a quadtree.
+
+    A cell is used as a single body when its width / distance < theta.
+    A cell that contains the point is always opened, so no body is
+    summarized together with itself whatever theta. theta = 0 gives the
+    exact pairwise sum."""
+    def __init__(self, theta: float = 0.5, leafSize: int = 8,
+            maxDepth: int = 24):
+        if theta < 0:
+            raise ValueError(f'theta must be 0 or more: {theta}')
+        self.theta = theta
+        self.leafSize = leafSize
+        self.maxDepth = maxDepth
+        self.root = None
+
+    def prepare(self, objects: list, boundary: "Boundary") -> None:
+        """Builds the tree over the balls and satellites for this step."""
+        bodies = []
+        for obj in objects_of_kind(objects, 'sources'):
+            bodies.append((obj, obj.xy_current[0], obj.xy_current[1],
+                obj.mass, obj.charge))
+        self.build(bodies, boundary.xy1, boundary.xy2)
+        return None
+
+    def build(self, bodies: list, xy1: list, xy2: list) -> None:
+        """Builds the tree from (key, x, y, mass, charge) tuples.
+
+        The root covers the box xy1 - xy2, grown to fit stray bodies."""
+        left = min([xy1[0]] + [body[1] for body in bodies])
+        top = min([xy1[1]] + [body[2] for body in bodies])
+        right = max([xy2[0]] + [body[1] for body in bodies])
+        bottom = max([xy2[1]] + [body[2] for body in bodies])
+        halfSize = max(right - left, bottom - top) / 2 + 1e-9
+        self.root = QuadNode((left + right) / 2, (top + bottom) / 2,
+            halfSize, 0)
+
+        for body in bodies:
+            node = self.root
+            while node.children is not None:
+                node = node.child_for(body[1], body[2])
+            node.bodies.append(body)
+            # Split full leaves, except when bodies sit on the same spot
+            while len(node.bodies) > self.leafSize and \
+                    node.depth < self.maxDepth:
+                node.split()
+                node = node.child_for(body[1], body[2])
+        self.root.summarize()
+        return None
+
+    def forces(self, obj: "Ball | PointForceField") -> tuple:
+        """Gravity and electric force on obj, like g_force() and e_force()."""
+        return self.forces_at(obj.xy_current[0], obj.xy_current[1], obj.mass,
+            obj.charge, obj)
+
+    def forces_at(self, x: float, y: float, mass: float, charge: float,
+            key = None) -> tuple:
+        """Gravity and electric force on a body at x, y.
+
+        The body whose key matches is skipped, so nothing pulls on itself."""
+        xyGForce = [0, 0]
+        xyEForce = [0, 0]
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node.children is None:
+                # Exact sum over the bodies of a leaf
+                for body in node.bodies:
+                    if body[0] == key:
+                        continue
+                    d = math.sqrt((body[1] - x)**2 + (body[2] - y)**2)
+                    if d == 0:
+                        continue
+                    force = mass * body[3] / d
+                    xyGForce[0] += (body[1] - x) * force
+                    xyGForce[1] += (body[2] - y) * force
+                    force = charge * body[4] / d
+                    xyEForce[0] += (x - body[1]) * force
+                    xyEForce[1] += (y - body[2]) * force
+                continue
+
+            d = math.sqrt((node.centerX - x)**2 + (node.centerY - y)**2)
+            inside = abs(x - node.centerX) <= node.halfSize and \
+                abs(y - node.centerY) <= node.halfSize
+            if inside or 2 * node.halfSize >= self.theta * d:
+                stack.extend(node.children)
+                continue
+
+            # Far enough away to use the cell summary
+            for total, center, sign in ((node.mass, node.massXY, 1),
+                    (node.chargePositive, node.positiveXY, -1),
+                    (node.chargeNegative, node.negativeXY, -1)):
+                if total == 0:
+                    continue
+                d = math.sqrt((center[0] - x)**2 + (center[1] - y)**2)
+                if d == 0:
+                    continue
+                if sign == 1:
+                    force = mass * total / d
+                    xyGForce[0] += (center[0] - x) * force
+                    xyGForce[1] += (center[1] - y) * force
+                else:
+                    force = charge * total / d
+                    xyEForce[0] += (x - center[0]) * force
+                    xyEForce[1] += (y - center[1]) * force
+        return xyGForce, xyEForce
@@ -0,0 +1,287 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Reproducible headless benchmarks for the physics hot paths.
+         Runs seeded scenes of 10 to 100k balls, writes steps/sec,
+         per-phase time and peak memory to JSON, and compares a run
+         against a stored baseline.
+
+Usage:
+    python3 benchmarks.py run --suite quick --output bench.json
+    python3 benchmarks.py compare bench.json baseline.json
+"""
+
+import argparse
+import concurrent.futures
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+import physics_core
+import profiling
+import spatial_hash
+
+# Every case is engine x balls x satellites x meter grid size
+SUITES = {
+    'quick': [
+        {'engine': 'objects', 'balls': balls, 'satellites': 3,
+            'meters': meters} for balls in (10, 100) for meters in (0, 12)
+    ] + [
+        {'engine': 'arrays', 'balls': balls, 'satellites': 3,
+            'meters': meters} for balls in (10, 100, 1000)
+            for meters in (0, 12)
+    ],
+    # Direct sums up to 10k balls, the mesh solver past that
+    'full': [
+        {'engine': 'objects', 'balls': balls, 'satellites': satellites,
+            'meters': 12} for balls in (10, 100, 1000)
+            for satellites in (3, 30)
+    ] + [
+        {'engine': 'arrays', 'balls': balls, 'satellites': satellites,
+            'meters': meters} for balls in (10, 100, 1000, 10000)
+            for satellites in (3, 30) for meters in (0, 12, 48)
+    ] + [
+        {'engine': 'arrays', 'balls': balls, 'satellites': satellites,
+            'meters': meters, 'solver': 'mesh'} for balls in (10000, 100000)
+            for satellites in (3, 30) for meters in (0, 12, 48)
+    ],
+    # Direct sums on 1 process against the strip solver's process pool
+    'parallel': [
+        {'engine': 'arrays', 'balls': balls, 'satellites': 3, 'meters': 0,
+            'workers': workers} for balls in (10000, 30000)
+            for workers in (1, 4, 16, 32)
+    ],
+}
+
+def case_name(case: dict) -> str:
+    """Stable name used to match cases between runs."""
+    name = f"{case['engine']}-b{case['balls']}-s{case['satellites']}" \
+        f"-m{case['meters']}"
+    if 'workers' in case:
+        name += f"-w{case['workers']}"
+    if 'solver' in case:
+        name += f"-{case['solver']}"
+    return name
+
+def make_world(case: dict, seed: int) -> physics_core.World:
+    """Builds the seeded scene of a case."""
+    rng = random.Random(seed)
+    if case['engine'] == 'arrays':
+        # NumPy is only needed for the array engine
+        import particle_arrays
+        import field_sampling
+        world = particle_arrays.ArrayWorld([0, 0], [720, 720],
+            physics_core.SimulationClock())
+        world.set_field_sampler(field_sampling.FieldSampler())
+    else:
+        world = physics_core.World([0, 0], [720, 720],
+            physics_core.SimulationClock())
+    world.set_collision_grid(spatial_hash.SpatialHash())
+    if case.get('workers', 1) > 1:
+        import domain_decomposition
+        world.set_force_solver(domain_decomposition.StripSolver(
+            case['workers']))
+    if case.get('solver') == 'mesh':
+        import particle_mesh
+        solver = particle_mesh.MeshSolver()
+        world.set_force_solver(solver)
+        world.set_field_sampler(particle_mesh.MeshFieldSampler(solver))
+
+    # Smaller balls for big scenes so they still fit in the box
+    radius = max(0.5, min(5, 200 / math.sqrt(case['balls'])))
+    world.add_field_grid(case['meters'], case['meters'])
+    for i in range(case['satellites']):
+        world.add_satellite(10, 5, rng.choice([-5, 0, 5]),
+            rng.choice([-0.2, 0.2]), rng.uniform(100, 340),
+            rng.uniform(0, 2 * math.pi))
+    for i in range(case['balls']):
+        world.add_ball([rng.uniform(10, 710), rng.uniform(10, 710)], radius,
+            0.1, rng.choice([-0.5, 0, 0.5]))
+    return world
+
+def close_world(world: physics_core.World) -> None:
+    """Stops the worker processes of a strip solver, if world has one."""
+    if hasattr(world.forceSolver, 'close'):
+        world.forceSolver.close()
+    return None
+
+def run_case(case: dict, seed: int, dt: float, minTime: float,
+        maxSteps: int) -> dict:
+    """Measures one case: steps/sec, time per phase and peak memory."""
+    world = make_world(case, seed)
+    world.step(dt)
+
+    # Steps per second, without any instrumentation
+    steps = 0
+    startTime = time.perf_counter()
+    elapsed = 0
+    while steps < maxSteps and (steps == 0 or elapsed < minTime):
+        world.step(dt)
+        steps += 1
+        elapsed = time.perf_counter() - startTime
+
+    # Time per phase on a few more steps
+    profiler = profiling.PhaseProfiler()
+    world.set_profiler(profiler)
+    for i in range(min(steps, 5)):
+        world.step(dt)
+        profiler.end_frame()
+    world.set_profiler(None)
+    phases = {row['name']: row['mean'] for row in profiler.summary()
+        if row['kind'] == 'time_ms'}
+
+    # Peak memory of building the scene and one step
+    close_world(world)
+    del world
+    tracemalloc.start()
+    world = make_world(case, seed)
+    world.step(dt)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    close_world(world)
+
+    result = dict(case)
+    result.update({'name': case_name(case), 'steps': steps,
+        'seconds': elapsed, 'stepsPerSecond': steps / elapsed,
+        'phasesMs': phases, 'peakMemoryMB': peak / 2**20})
+    return result
+
+def limit_resources(memoryMB: int, seconds: int) -> None:
+    """Caps the address space and CPU time of a case's process, where
+    supported."""
+    try:
+        import resource
+    except ImportError:
+        # No resource module on Windows, cases run without a cap
+        return None
+    limit = memoryMB * 2**20
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    resource.setrlimit(resource.RLIMIT_CPU, (seconds, seconds))
+    return None
+
+def run_safely(case: dict, *settings) -> dict:
+    """run_case(), with running out of memory turned into a result."""
+    try:
+        return run_case(case, *settings)
+    except MemoryError:
+        return {'name': case_name(case), 'error': 'memory cap exceeded'}
+
+def run_limited(case: dict, memoryMB: int, seconds: int, *settings
+        ) -> dict:
+    """Runs a case in a fresh process under the memory and time caps.
+
+    The process is killed once it has used seconds of CPU time, which
+    ends the case with an error result instead of the whole suite."""
+    with concurrent.futures.ProcessPoolExecutor(max_workers = 1,
+            initializer = limit_resources,
+            initargs = (memoryMB, seconds)) as pool:
+        try:
+            return pool.submit(run_safely, case, *settings).result()
+        except concurrent.futures.process.BrokenProcessPool:
+            return {'name': case_name(case),
+                'error': 'time cap exceeded or process killed'}
+
+def run_suite(suite: str, seed: int, dt: float, minTime: float,
+        maxSteps: int, output: str, memoryMB: int = 4096,
+        seconds: int = 600) -> dict:
+    """Runs every case of a suite and writes the results to output.
+
+    Each case runs in its own process with at most memoryMB of memory and
+    seconds of CPU time, a case over either is recorded as an error."""
+    try:
+        import numpy
+        numpyVersion = numpy.__version__
+    except ImportError:
+        numpyVersion = None
+    report = {'meta': {'suite': suite, 'seed': seed, 'dt': dt,
+        'python': platform.python_version(), 'numpy': numpyVersion,
+        'machine': platform.machine(), 'platform': platform.platform(),
+        'date': time.strftime('%Y-%m-%d %H:%M:%S')}, 'results': []}
+
+    for case in SUITES[suite]:
+        result = run_limited(case, memoryMB, seconds, seed, dt, minTime,
+            maxSteps)
+        report['results'].append(result)
+        if 'error' in result:
+            print(f"{result['name']:>26}: {result['error']}", flush = True)
+        else:
+            print(f"{result['name']:>26}: {result['stepsPerSecond']:10.1f} "
+                f"steps/s {result['peakMemoryMB']:8.1f} MB", flush = True)
+
+        # Write as we go, so a long suite keeps what it has measured
+        with open(output, 'w') as file:
+            json.dump(report, file, indent = 2)
+    return report
+
+def compare(current: str, baseline: str, tolerance: float) -> int:
+    """Flags cases that got slower, bigger or failing against the baseline.
+
+    Returns the number of regressions."""
+    with open(current) as file:
+        currentResults = {result['name']: result
+            for result in json.load(file)['results']}
+    with open(baseline) as file:
+        baselineResults = {result['name']: result
+            for result in json.load(file)['results']}
+
+    regressions = 0
+    for name, result in currentResults.items():
+        if 'error' in result:
+            print(f"{name:>26}: {result['error']}")
+            regressions += 'error' not in baselineResults.get(name, {})
+            continue
+        if name not in baselineResults:
+            print(f'{name:>26}: new case')
+            continue
+        base = baselineResults[name]
+        if 'error' in base:
+            print(f'{name:>26}: fixed, {base["error"]} in the baseline')
+            continue
+        speed = result['stepsPerSecond'] / base['stepsPerSecond']
+        memory = result['peakMemoryMB'] / max(base['peakMemoryMB'], 1e-9)
+        flags = []
+        if speed < 1 - tolerance:
+            flags.append('SLOWER')
+        if memory > 1 + tolerance:
+            flags.append('MORE MEMORY')
+        regressions += len(flags) > 0
+        print(f'{name:>26}: speed x{speed:.2f} memory x{memory:.2f} '
+            + ' '.join(flags))
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description = 'Headless benchmarks for the physics hot paths.')
+    commands = parser.add_subparsers(dest = 'command', required = True)
+
+    run = commands.add_parser('run', help = 'run a benchmark suite')
+    run.add_argument('--suite', choices = SUITES, default = 'quick')
+    run.add_argument('--output', default = 'bench.json')
+    run.add_argument('--seed', type = int, default = 2024)
+    run.add_argument('--dt', type = float, default = 1 / 120)
+    run.add_argument('--min-time', type = float, default = 1.0,
+        help = 'seconds to time each case for')
+    run.add_argument('--max-steps', type = int, default = 200)
+    run.add_argument('--memory-mb', type = int, default = 4096,
+        help = 'memory cap of each case')
+    run.add_argument('--case-seconds', type = int, default = 600,
+        help = 'CPU time cap of each case')
+
+    check = commands.add_parser('compare', help = 'compare with a baseline')
+    check.add_argument('current')
+    check.add_argument('baseline')
+    check.add_argument('--tolerance', type = float, default = 0.1,
+        help = 'allowed relative slowdown or memory growth')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run_suite(args.suite, args.seed, args.dt, args.min_time,
+            args.max_steps, args.output, args.memory_mb, args.case_seconds)
+        return 0
+    return 1 if compare(args.current, args.baseline, args.tolerance) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
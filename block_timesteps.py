@@ -0,0 +1,73 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Block (hierarchical power-of-two) timesteps for the balls. Each
+         ball steps with dt / 2^level, picked from its acceleration and
+         jerk, so only balls in close encounters get substepped.
+"""
+
+import math
+
+class BlockTimesteps:
+    """Picks the timestep level of every ball.
+
+    A world step of dt is split into 2^maxLevel substeps. A ball at
+    level L moves every 2^(maxLevel - L) substeps, with dt / 2^L. Its
+    wanted step is eta x |acceleration| / |jerk|, so a ball whose force
+    swings around quickly, as next to a satellite, gets a small one.
+    A ball only moves to a coarser level where both block grids line up.
+    Balls that are not due stay where their last substep left them and
+    pull on the due ones from there, there is no predictor. The error
+    in their force is first order, about |velocity| x the time since
+    their last move, so it is up to one step of the coarsest level.
+    Set with World.set_block_timesteps(), needs a SimulationClock."""
+    def __init__(self, maxLevel: int = 6, eta: float = 0.002):
+        self.maxLevel = maxLevel
+        self.eta = eta
+        # Level of every ball in the objects engine, by objectId
+        self.levels = {}
+
+        # Counters for stats()
+        self.simulatedTime = 0
+        self.forceEvaluations = 0
+        self.substeps = 0
+
+    def stats(self) -> dict:
+        """Ball force evaluations per simulated second and substeps run."""
+        return {'simulatedTime': self.simulatedTime,
+            'forceEvaluations': self.forceEvaluations,
+            'evaluationsPerSecond': self.forceEvaluations
+                / max(self.simulatedTime, 1e-12),
+            'substeps': self.substeps}
+
+    def level_for(self, acceleration: float, jerk: float, dt: float) -> int:
+        """Level whose step dt / 2^level is within eta |a| / |jerk|."""
+        if jerk <= 0:
+            return 0
+        if acceleration <= 0:
+            return self.maxLevel
+        ratio = dt * jerk / (self.eta * acceleration)
+        if ratio <= 1:
+            return 0
+        return min(math.ceil(math.log2(ratio)), self.maxLevel)
+
+    def levels_for(self, acceleration: "np.ndarray", jerk: "np.ndarray",
+            dt: float) -> "np.ndarray":
+        """level_for() of many balls at once, for the array engine."""
+        # NumPy is only needed for the array engine
+        import numpy as np
+        ratio = np.divide(dt * jerk, self.eta * acceleration,
+            out = np.full(len(jerk), 2.0**self.maxLevel),
+            where = acceleration > 0)
+        ratio[jerk <= 0] = 1
+        levels = np.ceil(np.log2(np.maximum(ratio, 1)))
+        return np.minimum(levels, self.maxLevel).astype(np.int64)
+
+    def coarsest_level(self, substep: int) -> int:
+        """Coarsest level whose blocks end at substep, 1 to 2^maxLevel.
+
+        A ball that just moved can take any level from this one up."""
+        level = self.maxLevel
+        while level > 0 and substep % (1 << (self.maxLevel - level + 1)) == 0:
+            level -= 1
+        return level
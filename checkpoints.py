@@ -0,0 +1,167 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Saves the full state of a world to a checkpoint file and restores
+         it exactly. With a SimulationClock, a restored run continues step
+         for step the same as the run that was saved.
+"""
+
+import json
+import os
+from physics_core import objects_of_kind
+
+VERSION = 1
+# Saved per ball and satellite, with the value used when a kind has none
+BODY_FIELDS = {'xy_current': [0, 0], 'velocity0': [0, 0],
+    'velocity1': [0, 0], 'mass': 0, 'charge': 0, 'radius': 0,
+    'acceleration': [0, 0], 'previousLapse': 0, 'omega': 0,
+    'orbitRadius': 0, 'angle': 0, 'centerOrbit': [0, 0], 'timeStamp': 0,
+    'timeLapse': 0}
+
+def body_columns(world: "World") -> dict:
+    """Every field of BODY_FIELDS for all sources, one list per field.
+
+    Bodies keep the order of the sources list, which is the order forces
+    are summed and collisions resolved in."""
+    bodies = objects_of_kind(world.objs, 'sources')
+    columns = {'kind': [obj.name for obj in bodies]}
+    particles = getattr(world, 'particles', None)
+    if particles is not None:
+        # Array engine, whole columns at once
+        rows = [obj.row for obj in bodies]
+        for name, column in (('xy_current', 'xy'), ('velocity0', 'velocity'),
+                ('velocity1', 'velocity'), ('mass', 'mass'),
+                ('charge', 'charge'), ('radius', 'radius'),
+                ('acceleration', 'acceleration'),
+                ('previousLapse', 'previousLapse'), ('omega', 'omega'),
+                ('orbitRadius', 'orbitRadius'), ('angle', 'angle'),
+                ('centerOrbit', 'centerOrbit'), ('level', 'level')):
+            columns[name] = getattr(particles, column)[rows].tolist()
+        columns['level'] = [int(level) for level in columns['level']]
+        columns['timeStamp'] = [world.timeStamp.timeStamp] * len(bodies)
+        columns['timeLapse'] = [world.timeStamp.timeLapse] * len(bodies)
+        return columns
+
+    for name, default in BODY_FIELDS.items():
+        if isinstance(default, list):
+            columns[name] = [list(getattr(obj, name, default))
+                for obj in bodies]
+        else:
+            columns[name] = [getattr(obj, name, default) for obj in bodies]
+    levels = {}
+    if world.blockTimesteps is not None:
+        levels = world.blockTimesteps.levels
+    columns['level'] = [levels.get(obj.objectId, 0) for obj in bodies]
+    return columns
+
+def world_state(world: "World", rng = None, extra: dict = None) -> dict:
+    """The state of world as plain lists and numbers.
+
+    rng is an optional random.Random whose state is saved along, extra
+    any JSON-ready values of the caller, e.g. menu settings. Solvers,
+    grids and samplers are settings, not state, and are not saved."""
+    if not hasattr(world.clock, 'now'):
+        raise ValueError('Checkpoints need a world with a SimulationClock')
+    state = {'version': VERSION, 'clock': world.clock.now,
+        'boundary': [list(world.boundary.xy1), list(world.boundary.xy2)],
+        'integrator': world.integrator,
+        'meters': [list(obj.xy_current)
+            for obj in objects_of_kind(world.objs, 'meters')],
+        'bodies': body_columns(world), 'extra': extra or {}}
+    if hasattr(world, 'timeStamp'):
+        # The array engine keeps one time stamp for every body
+        state['worldTimeStamp'] = [world.timeStamp.timeStamp,
+            world.timeStamp.timeLapse]
+    if rng is not None:
+        version, internal, gauss = rng.getstate()
+        state['random'] = [version, list(internal), gauss]
+    return state
+
+def save_checkpoint(world: "World", path: str, rng = None,
+        extra: dict = None) -> None:
+    """Writes world_state() to path.
+
+    The file is written next to path and renamed over it, so a crash
+    never leaves half a checkpoint behind."""
+    state = world_state(world, rng, extra)
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as file:
+        file.write(json.dumps(state, separators = (',', ':')))
+    os.replace(temporary, path)
+    return None
+
+def load_checkpoint(path: str) -> dict:
+    """Reads a checkpoint written by save_checkpoint()."""
+    with open(path) as file:
+        state = json.load(file)
+    if state.get('version') != VERSION:
+        raise ValueError(f'Not a version {VERSION} checkpoint: {path}')
+    return state
+
+def set_vector(obj, name: str, value: list) -> None:
+    """Copies value into the vector attribute name of obj in place.
+
+    Array engine views and drawn objects keep their own vectors."""
+    vector = getattr(obj, name)
+    vector[0] = value[0]
+    vector[1] = value[1]
+    return None
+
+def restore_world(state: dict, world: "World", rng = None) -> dict:
+    """Adds the saved meters and bodies to world and sets the clock.
+
+    world has to be new, with the saved boundary and no bodies or meters,
+    and set up with the same solver and settings as the saved one.
+    Returns the extra values given to save_checkpoint()."""
+    if objects_of_kind(world.objs, 'sources') or \
+            objects_of_kind(world.objs, 'meters'):
+        raise ValueError('Checkpoints restore into an empty world')
+    if [list(world.boundary.xy1), list(world.boundary.xy2)] \
+            != state['boundary']:
+        raise ValueError(f'Checkpoint boundary {state["boundary"]} does not'
+            ' match the world')
+
+    world.clock.now = state['clock']
+    world.set_integrator(state['integrator'])
+    for xy in state['meters']:
+        world.add_object(world.fieldClass(xy))
+
+    columns = state['bodies']
+    particles = getattr(world, 'particles', None)
+    for i, kind in enumerate(columns['kind']):
+        body = {name: columns[name][i] for name in BODY_FIELDS}
+        if kind == 'Ball':
+            obj = world.add_ball(body['xy_current'], body['radius'],
+                body['mass'], body['charge'])
+            set_vector(obj, 'acceleration', body['acceleration'])
+            obj.previousLapse = body['previousLapse']
+        else:
+            obj = world.add_satellite(body['radius'], body['mass'],
+                body['charge'], body['omega'], body['orbitRadius'],
+                body['angle'])
+            set_vector(obj, 'centerOrbit', body['centerOrbit'])
+        # Positions last, a satellite places itself from its angle
+        set_vector(obj, 'velocity0', body['velocity0'])
+        set_vector(obj, 'velocity1', body['velocity1'])
+        set_vector(obj, 'xy_current', body['xy_current'])
+        set_vector(obj, 'XY_next', body['xy_current'])
+        if particles is not None:
+            particles.level[obj.row] = columns['level'][i]
+        else:
+            obj.timeStamp = body['timeStamp']
+            obj.timeLapse = body['timeLapse']
+            if world.blockTimesteps is not None and kind == 'Ball':
+                world.blockTimesteps.levels[obj.objectId] = \
+                    columns['level'][i]
+
+    if 'worldTimeStamp' in state:
+        world.timeStamp.timeStamp, world.timeStamp.timeLapse = \
+            state['worldTimeStamp']
+    if rng is not None and 'random' in state:
+        version, internal, gauss = state['random']
+        rng.setstate((version, tuple(internal), gauss))
+    return state['extra']
+
+def restore_checkpoint(path: str, world: "World", rng = None) -> dict:
+    """load_checkpoint() and restore_world() in one call."""
+    return restore_world(load_checkpoint(path), world, rng)
@@ -0,0 +1,267 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Continuous collision detection. Finds the time of impact of
+         every ball-ball, ball-satellite and ball-wall pair inside a step
+         and advances exactly from one collision to the next, so fast
+         balls cannot pass through each other or the walls.
+"""
+
+import heapq
+import math
+
+class EventCollider:
+    """Event-driven collisions for one physics step.
+
+    Bodies move in straight lines from their start to their predicted end
+    position. Collision events wait in a priority queue by time of
+    impact; after each one, only the bodies involved are rescheduled,
+    against the bodies whose swept boxes overlap theirs. Balls bounce
+    with the same elastic formula as check_collision(), applied both to
+    the path and to the integrator's end-of-step velocity. Satellites
+    follow their orbit and are never deflected, a ball the formula leaves
+    closing in on a satellite bounces off it like off a moving wall."""
+    def __init__(self, maxEvents: int = 10000):
+        self.maxEvents = maxEvents
+
+        # Counters for the last step
+        self.events = 0
+        self.candidatePairs = 0
+        self.collisions = 0
+        self.wallBounces = 0
+
+    def resolve(self, start: list, end: list, radius: list, mass: list,
+            isBall: list, boxes: list, t: float, velocity: list = None
+            ) -> dict:
+        """Collisions of bodies moving from start to end in t seconds.
+
+        boxes are (x1, y1, x2, y2) walls that keep the balls inside.
+        velocity holds the velocities at the end of the step from the
+        integrator, which bounce with the paths; without it the balls end
+        with their path velocity. Returns {index: (XY_next, velocity)}
+        for every ball whose path changed; other bodies keep their
+        predicted end."""
+        self.events = 0
+        self.candidatePairs = 0
+        self.collisions = 0
+        self.wallBounces = 0
+        if t <= 0 or not start:
+            return {}
+        self.radius = radius
+        self.mass = mass
+        self.isBall = isBall
+        self.boxes = boxes
+        self.t = t
+        self.position = [[xy[0], xy[1]] for xy in start]
+        self.velocity = [[(end[i][0] - start[i][0]) / t,
+            (end[i][1] - start[i][1]) / t] for i in range(len(start))]
+        # Velocity to end the step with, the path's for satellites
+        self.endVelocity = [[velocity[i][0], velocity[i][1]]
+            if velocity is not None and isBall[i] else list(self.velocity[i])
+            for i in range(len(start))]
+        self.bodyTime = [0.0] * len(start)
+        self.count = [0] * len(start)
+        self.queue = []
+        self.sequence = 0
+        # Candidates of every body, and balls bounced out of their box
+        self.partners = [[] for i in range(len(start))]
+        self.roaming = set()
+
+        for i, j in self.swept_pairs(start, end):
+            self.partners[i].append(j)
+            self.partners[j].append(i)
+            self.schedule_pair(i, j, 0.0)
+        for i in range(len(start)):
+            if isBall[i]:
+                self.schedule_walls(i, 0.0)
+
+        changed = set()
+        while self.queue and self.events < self.maxEvents:
+            [when, sequence, i, j, countI, countJ] = heapq.heappop(
+                self.queue)
+            # Events of a body that bounced since they were found are stale
+            if self.count[i] != countI or \
+                    (j >= 0 and self.count[j] != countJ):
+                continue
+            self.events += 1
+            self.advance(i, when)
+            if j >= 0:
+                self.advance(j, when)
+                self.bounce_pair(i, j)
+            else:
+                self.bounce_wall(i, -1 - j)
+            for k in (i, j):
+                if k >= 0 and isBall[k]:
+                    self.count[k] += 1
+                    changed.add(k)
+                    self.reschedule(k, when)
+
+        result = {}
+        for i in changed:
+            self.advance(i, t)
+            result[i] = (self.position[i], self.endVelocity[i])
+        return result
+
+    def swept_pairs(self, start: list, end: list) -> list:
+        """Pairs whose boxes around the whole path overlap.
+
+        Sweep and prune along x; only these can collide during the step,
+        as long as the bodies stay inside their boxes."""
+        spans = []
+        for i in range(len(start)):
+            r = self.radius[i]
+            spans.append((min(start[i][0], end[i][0]) - r,
+                max(start[i][0], end[i][0]) + r,
+                min(start[i][1], end[i][1]) - r,
+                max(start[i][1], end[i][1]) + r, i))
+        self.spans = list(spans)
+        spans.sort()
+
+        pairs = []
+        active = []
+        for span in spans:
+            active = [other for other in active if other[1] >= span[0]]
+            for other in active:
+                if other[2] <= span[3] and span[2] <= other[3] and \
+                        (self.isBall[span[4]] or self.isBall[other[4]]):
+                    pairs.append((span[4], other[4]))
+            active.append(span)
+        self.candidatePairs = len(pairs)
+        return pairs
+
+    def push(self, when: float, i: int, j: int) -> None:
+        """Queues an event of body i with body j, or wall -1 - j."""
+        heapq.heappush(self.queue, [when, self.sequence, i, j, self.count[i],
+            self.count[j] if j >= 0 else 0])
+        self.sequence += 1
+        return None
+
+    def point_at(self, i: int, when: float) -> list:
+        """Position of body i at time when, along its current path."""
+        lapse = when - self.bodyTime[i]
+        return [self.position[i][0] + self.velocity[i][0] * lapse,
+            self.position[i][1] + self.velocity[i][1] * lapse]
+
+    def advance(self, i: int, when: float) -> None:
+        """Moves body i along its path up to time when."""
+        self.position[i] = self.point_at(i, when)
+        self.bodyTime[i] = when
+        return None
+
+    def schedule_pair(self, i: int, j: int, now: float) -> None:
+        """Queues the next contact of i and j after now, if any."""
+        xyI = self.point_at(i, now)
+        xyJ = self.point_at(j, now)
+        dX = xyI[0] - xyJ[0]
+        dY = xyI[1] - xyJ[1]
+        vX = self.velocity[i][0] - self.velocity[j][0]
+        vY = self.velocity[i][1] - self.velocity[j][1]
+        radiusSum = self.radius[i] + self.radius[j]
+
+        # Solve |d + v * s| = radiusSum for the first s >= 0
+        b = dX * vX + dY * vY
+        if b >= 0:
+            # Not getting closer
+            return None
+        c = dX * dX + dY * dY - radiusSum * radiusSum
+        if c <= 0:
+            # Already touching and closing in
+            self.push(now, i, j)
+            return None
+        a = vX * vX + vY * vY
+        discriminant = b * b - a * c
+        if discriminant < 0:
+            return None
+        when = now + (-b - math.sqrt(discriminant)) / a
+        if when <= self.t:
+            self.push(when, i, j)
+        return None
+
+    def schedule_walls(self, i: int, now: float) -> None:
+        """Queues the first wall ball i reaches after now, if any."""
+        xy = self.point_at(i, now)
+        r = self.radius[i]
+        first = None
+        for box in self.boxes:
+            for axis in range(2):
+                v = self.velocity[i][axis]
+                if v < 0:
+                    wall = box[axis] + r
+                elif v > 0:
+                    wall = box[axis + 2] - r
+                else:
+                    continue
+                when = now + max((wall - xy[axis]) / v, 0)
+                if when <= self.t and (first is None or when < first[0]):
+                    first = (when, axis)
+        if first is not None:
+            self.push(first[0], i, -1 - first[1])
+        return None
+
+    def inside_span(self, i: int, now: float) -> bool:
+        """True if body i stays inside its swept box from now on."""
+        x1, x2, y1, y2, index = self.spans[i]
+        r = self.radius[i]
+        xy = self.point_at(i, now)
+        end = self.point_at(i, self.t)
+        return x1 <= min(xy[0], end[0]) - r and max(xy[0], end[0]) + r <= x2 \
+            and y1 <= min(xy[1], end[1]) - r and max(xy[1], end[1]) + r <= y2
+
+    def reschedule(self, i: int, now: float) -> None:
+        """Finds new events for ball i after its velocity changed.
+
+        A ball that stays inside its swept box can only meet its
+        candidates and the balls that left their boxes. One that leaves
+        its box is checked against every body from then on."""
+        if i not in self.roaming and not self.inside_span(i, now):
+            self.roaming.add(i)
+        if i in self.roaming:
+            others = range(len(self.position))
+        else:
+            others = set(self.partners[i]) | self.roaming
+        for j in others:
+            if j != i:
+                self.schedule_pair(i, j, now)
+        self.schedule_walls(i, now)
+        return None
+
+    def bounce_pair(self, i: int, j: int) -> None:
+        """Elastic bounce of i and j, satellites keep their path."""
+        massSum = self.mass[i] + self.mass[j]
+        # Velocity after collision, same formula as check_collision()
+        for velocities in (self.velocity, self.endVelocity):
+            velocityI = velocities[i]
+            velocityJ = velocities[j]
+            newI = [((self.mass[i] - self.mass[j]) * velocityI[k]
+                + 2 * self.mass[j] * velocityJ[k]) / massSum
+                for k in range(2)]
+            if self.isBall[j]:
+                velocities[j] = [((self.mass[j] - self.mass[i])
+                    * velocityJ[k] + 2 * self.mass[i] * velocityI[k])
+                    / massSum for k in range(2)]
+            if self.isBall[i]:
+                velocities[i] = newI
+        if not (self.isBall[i] and self.isBall[j]) and self.closing(i, j):
+            # A satellite lighter than the ball does not push it back, so
+            # the pair would touch again at once. Bounce off it like off
+            # a moving wall instead, the limit of a very heavy satellite
+            ball, satellite = (i, j) if self.isBall[i] else (j, i)
+            for velocities in (self.velocity, self.endVelocity):
+                velocities[ball] = [2 * velocities[satellite][k]
+                    - velocities[ball][k] for k in range(2)]
+        self.collisions += self.isBall[i] + self.isBall[j]
+        return None
+
+    def closing(self, i: int, j: int) -> bool:
+        """True if bodies i and j, both at their own time, get closer."""
+        return (self.position[i][0] - self.position[j][0]) \
+            * (self.velocity[i][0] - self.velocity[j][0]) \
+            + (self.position[i][1] - self.position[j][1]) \
+            * (self.velocity[i][1] - self.velocity[j][1]) < 0
+
+    def bounce_wall(self, i: int, axis: int) -> None:
+        """Reflects ball i off a wall across axis."""
+        self.velocity[i][axis] = -self.velocity[i][axis]
+        self.endVelocity[i][axis] = -self.endVelocity[i][axis]
+        self.wallBounces += 1
+        return None
@@ -0,0 +1,161 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Per-step system diagnostics. Kinetic and pseudo-potential energy,
+         total momentum and collision counts are computed as NumPy
+         reductions after every step, kept in a ring buffer and optionally
+         streamed to a CSV file, e.g. to watch energy drift.
+"""
+
+import math
+import numpy as np
+from physics_core import objects_of_kind
+
+# Columns of every record
+FIELDS = ('time', 'kinetic', 'potential', 'total', 'momentumX',
+    'momentumY', 'collisions', 'wallBounces')
+
+def pseudo_potential(xy: np.ndarray, mass: np.ndarray, charge: np.ndarray,
+        isBall: np.ndarray = None, blockSize: int = 1024) -> float:
+    """Potential energy of the 1/d pseudo laws over all pairs.
+
+    Their forces are m_i m_j and q_i q_j long at any distance, so a
+    pair's potential grows with the distance d as (m_i m_j - q_i q_j) d.
+    With isBall, pairs of two satellites are left out: their orbits are
+    fixed, so they never trade energy with the balls. Rows are processed
+    in blocks of blockSize."""
+    if isBall is not None:
+        satellites = ~isBall
+        # All pairs, less those among the satellites
+        return pseudo_potential(xy, mass, charge, blockSize = blockSize) \
+            - pseudo_potential(xy[satellites], mass[satellites],
+                charge[satellites], blockSize = blockSize)
+    total = 0.0
+    for start in range(0, len(xy), blockSize):
+        stop = min(start + blockSize, len(xy))
+        dX = xy[:, 0][None, :] - xy[start:stop, 0][:, None]
+        dY = xy[:, 1][None, :] - xy[start:stop, 1][:, None]
+        d = np.sqrt(dX * dX + dY * dY)
+        total += float(mass[start:stop] @ (d @ mass)
+            - charge[start:stop] @ (d @ charge))
+    # Every pair was counted from both ends
+    return total / 2
+
+class SystemDiagnostics:
+    """Energy, momentum and collision counts after every step.
+
+    Set with World.set_diagnostics(). Kinetic energy and momentum are
+    those of the balls, satellites follow their orbits. The potential is
+    a sum over every pair with a ball, so it is only computed every
+    potentialEvery steps, other records have NaN potential and total.
+    The physics adds to collisions (balls that bounced off another body)
+    and wallBounces during a step. The last capacity records stay in
+    memory, with a path they are also written to CSV every flushEvery
+    records."""
+    def __init__(self, capacity: int = 4096, potentialEvery: int = 10,
+            path: str = None, flushEvery: int = 256):
+        self.capacity = capacity
+        self.potentialEvery = potentialEvery
+        self.flushEvery = min(flushEvery, capacity)
+        self.records = np.full((capacity, len(FIELDS)), np.nan)
+        self.count = 0
+        self.written = 0
+
+        # Counters for the step being run
+        self.collisions = 0
+        self.wallBounces = 0
+
+        self.file = None
+        if path is not None:
+            self.file = open(path, 'w')
+            self.file.write(','.join(FIELDS) + '\n')
+
+    def bodies(self, world: "World") -> tuple:
+        """Positions, velocities, masses, charges and ball flags."""
+        particles = getattr(world, 'particles', None)
+        if particles is not None:
+            return particles.xy, particles.velocity, particles.mass, \
+                particles.charge, particles.isBall
+        rows = np.array([(obj.xy_current[0], obj.xy_current[1],
+            obj.velocity0[0], obj.velocity0[1], obj.mass, obj.charge,
+            obj.name == 'Ball')
+            for obj in objects_of_kind(world.objs, 'sources')],
+            dtype = float).reshape(-1, 7)
+        return rows[:, 0:2], rows[:, 2:4], rows[:, 4], rows[:, 5], \
+            rows[:, 6] > 0
+
+    def after_step(self, world: "World") -> None:
+        """Records the world after a step and resets the counters."""
+        xy, velocity, mass, charge, isBall = self.bodies(world)
+        ballMass = mass[isBall]
+        ballVelocity = velocity[isBall]
+        kinetic = float(ballMass @ (ballVelocity * ballVelocity).sum(axis = 1)
+            ) / 2
+        momentum = (ballMass @ ballVelocity).tolist()
+        potential = math.nan
+        if self.count % self.potentialEvery == 0:
+            potential = pseudo_potential(xy, mass, charge, isBall)
+
+        self.records[self.count % self.capacity] = (world.clock(), kinetic,
+            potential, kinetic + potential, momentum[0], momentum[1],
+            self.collisions, self.wallBounces)
+        self.collisions = 0
+        self.wallBounces = 0
+        self.count += 1
+        if self.file is not None and \
+                self.count - self.written >= self.flushEvery:
+            self.flush()
+        return None
+
+    def history(self, last: int = None) -> np.ndarray:
+        """The last records, oldest first, as (rows, len(FIELDS))."""
+        rows = min(self.count, self.capacity)
+        if last is not None:
+            rows = min(rows, last)
+        index = np.arange(self.count - rows, self.count) % self.capacity
+        return self.records[index]
+
+    def column(self, name: str, last: int = None) -> np.ndarray:
+        """One field of FIELDS over the last records."""
+        return self.history(last)[:, FIELDS.index(name)]
+
+    def latest(self) -> dict:
+        """The last record by field name."""
+        if self.count == 0:
+            return {}
+        return dict(zip(FIELDS, self.history(1)[0].tolist()))
+
+    def energy_drift(self, last: int = None) -> float:
+        """Relative change of the total energy over the last records.
+
+        Only records with a potential count, NaN with fewer than two."""
+        total = self.column('total', last)
+        total = total[~np.isnan(total)]
+        if len(total) < 2 or total[0] == 0:
+            return math.nan
+        return float((total[-1] - total[0]) / abs(total[0]))
+
+    def flush(self) -> None:
+        """Appends the records not yet written to the CSV file."""
+        if self.file is None:
+            return None
+        np.savetxt(self.file, self.history(self.count - self.written),
+            fmt = '%.17g', delimiter = ',')
+        self.file.flush()
+        self.written = self.count
+        return None
+
+    def close(self) -> None:
+        """Writes what is left and closes the CSV file."""
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
+        return None
+
+    def __enter__(self) -> "SystemDiagnostics":
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.close()
+        return None
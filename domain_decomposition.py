@@ -0,0 +1,209 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Parallel force solver. Balls and meters are split into vertical
+         strips across a process pool, bodies and forces are exchanged
+         through one shared-memory table, and every worker sums the
+         forces on its own strip.
+"""
+
+import concurrent.futures
+import os
+import weakref
+from multiprocessing import shared_memory
+import numpy as np
+from particle_arrays import pairwise_forces
+from physics_core import objects_of_kind
+
+# Columns of the shared table. Source and target rows hold x, y, mass
+# and charge, force rows gravity x, y and electric x, y.
+COLUMNS = 4
+
+# Shared tables this worker process has attached, by name
+attached = {}
+
+def attach(name: str, rows: int) -> np.ndarray:
+    """The shared table name as a (rows, COLUMNS) array.
+
+    A worker attaches each table once and lets go of the previous one,
+    the solver only replaces its table when it has to grow."""
+    if name not in attached:
+        for block in attached.values():
+            block.close()
+        attached.clear()
+        attached[name] = shared_memory.SharedMemory(name)
+    return np.ndarray((rows, COLUMNS), dtype = float,
+        buffer = attached[name].buf)
+
+def strip_forces(name: str, rows: int, sources: int, targets: int,
+        start: int, stop: int, cutoff: float) -> None:
+    """Forces on targets start to stop of the shared table.
+
+    Runs in a worker. Without cutoff the strip feels every source, as the
+    1/d laws have no range. With one it only reads its halo, the sources
+    within cutoff of the strip."""
+    table = attach(name, rows)
+    strip = table[sources + start:sources + stop]
+    src = table[:sources]
+    if cutoff is not None:
+        low = strip[:, 0].min() - cutoff
+        high = strip[:, 0].max() + cutoff
+        src = src[(src[:, 0] >= low) & (src[:, 0] <= high)]
+    gForce, eForce = pairwise_forces(strip[:, 0:2].copy(), strip[:, 2],
+        strip[:, 3], src[:, 0:2].copy(), src[:, 2].copy(), src[:, 3].copy(),
+        cutoff = cutoff)
+    forces = table[sources + targets + start:sources + targets + stop]
+    forces[:, 0:2] = gForce
+    forces[:, 2:4] = eForce
+    return None
+
+def release(resources: dict) -> None:
+    """Shuts the pool down and frees the shared table."""
+    pool = resources.pop('pool', None)
+    if pool is not None:
+        pool.shutdown()
+    resources.pop('table', None)
+    block = resources.pop('block', None)
+    if block is not None:
+        block.close()
+        block.unlink()
+    return None
+
+class StripSolver:
+    """Sums g_force() and e_force() on a process pool.
+
+    Every step the sources and the targets, balls and field meters, are
+    written to one shared-memory table. Targets are sorted by x and cut
+    into one strip per worker. A worker reads the sources it needs from
+    the table, the halo of its strip with a cutoff or all of them
+    without, and writes the forces on its strip back into the table,
+    where they are gathered. Forces always come from the positions at
+    the start of the step. With fewer than serialBelow targets the
+    forces are summed in this process. Set with World.set_force_solver(),
+    close() stops the workers.
+
+    The 1/d laws have no range: a source pulls with the same strength at
+    any distance. Without a cutoff every source is in every strip's halo,
+    so each worker reads the whole source table. It reads it from shared
+    memory without copying, and sums exactly, so there is no far-field
+    summary of the other strips. For approximate far fields use
+    barnes_hut.BarnesHutSolver instead. A real halo only exists with a
+    cutoff."""
+    def __init__(self, workers: int = None, cutoff: float = None,
+            serialBelow: int = 1024):
+        self.workers = workers or os.cpu_count()
+        self.cutoff = cutoff
+        self.serialBelow = serialBelow
+        self.rows = 0
+        self.forcesOf = {}
+        self.sources = (np.zeros((0, 2)), np.zeros(0), np.zeros(0))
+        # Pool and shared table, freed by close() or with the solver
+        self.resources = {}
+        self.finalizer = weakref.finalize(self, release, self.resources)
+
+        # Counters for stats()
+        self.steps = 0
+        self.parallelSteps = 0
+
+    def stats(self) -> dict:
+        """Workers, steps, steps that ran on the pool and table size."""
+        return {'workers': self.workers, 'steps': self.steps,
+            'parallelSteps': self.parallelSteps, 'tableRows': self.rows}
+
+    def table(self, rows: int) -> np.ndarray:
+        """The shared table, replaced by a bigger one if under rows."""
+        if rows > self.rows:
+            self.resources.pop('table', None)
+            block = self.resources.pop('block', None)
+            if block is not None:
+                block.close()
+                block.unlink()
+            self.rows = max(rows, 2 * self.rows)
+            block = shared_memory.SharedMemory(create = True,
+                size = self.rows * COLUMNS * 8)
+            self.resources['block'] = block
+            self.resources['table'] = np.ndarray((self.rows, COLUMNS),
+                dtype = float, buffer = block.buf)
+        return self.resources['table']
+
+    def solve(self, srcXY: np.ndarray, srcMass: np.ndarray,
+            srcCharge: np.ndarray, xy: np.ndarray, mass: np.ndarray,
+            charge: np.ndarray) -> tuple:
+        """Forces on targets xy from every source, as (N, 2) arrays."""
+        self.steps += 1
+        targets = len(xy)
+        if targets < self.serialBelow or self.workers < 2:
+            return pairwise_forces(xy, mass, charge, srcXY, srcMass,
+                srcCharge, cutoff = self.cutoff)
+        if 'pool' not in self.resources:
+            self.resources['pool'] = concurrent.futures.ProcessPoolExecutor(
+                max_workers = self.workers)
+
+        sources = len(srcXY)
+        table = self.table(sources + 2 * targets)
+        table[:sources, 0:2] = srcXY
+        table[:sources, 2] = srcMass
+        table[:sources, 3] = srcCharge
+        order = np.argsort(xy[:, 0], kind = 'stable')
+        strips = table[sources:sources + targets]
+        strips[:, 0:2] = xy[order]
+        strips[:, 2] = mass[order]
+        strips[:, 3] = charge[order]
+
+        bounds = np.linspace(0, targets, self.workers + 1).astype(int)
+        futures = [self.resources['pool'].submit(strip_forces,
+            self.resources['block'].name, self.rows, sources, targets,
+            start, stop, self.cutoff)
+            for start, stop in zip(bounds[:-1].tolist(), bounds[1:].tolist())
+            if stop > start]
+        for future in futures:
+            future.result()
+        self.parallelSteps += 1
+
+        forces = table[sources + targets:sources + 2 * targets]
+        gForce = np.empty((targets, 2))
+        eForce = np.empty((targets, 2))
+        gForce[order] = forces[:, 0:2]
+        eForce[order] = forces[:, 2:4]
+        return gForce, eForce
+
+    def prepare(self, objects: list, boundary: "Boundary") -> None:
+        """Solves the forces on every ball and meter at once."""
+        bodies = objects_of_kind(objects, 'sources')
+        targets = [obj for obj in bodies if obj.name == 'Ball'] \
+            + list(objects_of_kind(objects, 'meters'))
+        self.sources = self.columns(bodies)
+        gForce, eForce = self.solve(*self.sources, *self.columns(targets))
+        self.forcesOf = {id(obj): (g, e) for obj, g, e
+            in zip(targets, gForce.tolist(), eForce.tolist())}
+        return None
+
+    def columns(self, objects: list) -> tuple:
+        """Positions, masses and charges of objects as arrays."""
+        xy = np.array([obj.xy_current for obj in objects],
+            dtype = float).reshape(-1, 2)
+        mass = np.array([obj.mass for obj in objects], dtype = float)
+        charge = np.array([obj.charge for obj in objects], dtype = float)
+        return xy, mass, charge
+
+    def forces(self, obj: "Ball | PointForceField") -> tuple:
+        """Gravity and electric force on obj from the last prepare()."""
+        if id(obj) in self.forcesOf:
+            return self.forcesOf[id(obj)]
+        # Added since prepare(), summed on its own
+        gForce, eForce = pairwise_forces(*self.columns([obj]),
+            *self.sources, cutoff = self.cutoff)
+        return gForce[0].tolist(), eForce[0].tolist()
+
+    def particle_forces(self, particles: "ParticleArrays",
+            ballXY: np.ndarray, balls: np.ndarray,
+            boundary: "Boundary") -> tuple:
+        """Forces on every ball of an ArrayWorld, as (N, 2) arrays."""
+        return self.solve(particles.xy, particles.mass, particles.charge,
+            ballXY, particles.mass[balls], particles.charge[balls])
+
+    def close(self) -> None:
+        """Stops the worker processes and frees the shared table."""
+        release(self.resources)
+        self.rows = 0
+        return None
@@ -0,0 +1,104 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Dense field display. The gravitational and electric field is
+         sampled on a grid over the playground in one batched call and
+         turned into an RGB image, hue for direction and brightness for
+         magnitude, instead of one set of lines per field meter.
+"""
+
+import math
+import time
+import numpy as np
+
+QUANTITIES = ('total', 'gravity', 'electric')
+
+def direction_colours(vectors: np.ndarray, scale: float) -> np.ndarray:
+    """RGB of (..., 2) vectors, as uint8 (..., 3).
+
+    The hue goes around the colour wheel with the direction, red for
+    +x, and the brightness rises with the length up to scale."""
+    hue = (np.arctan2(vectors[..., 1], vectors[..., 0]) / (2 * math.pi)) \
+        % 1.0
+    value = np.clip(np.hypot(vectors[..., 0], vectors[..., 1])
+        / max(scale, 1e-12), 0, 1)
+
+    # HSV to RGB at full saturation, one of six hue sectors per pixel
+    sector = (hue * 6).astype(np.int64) % 6
+    fraction = hue * 6 - np.floor(hue * 6)
+    rising = value * fraction
+    falling = value * (1 - fraction)
+    red = np.choose(sector, [value, falling, 0, 0, rising, value])
+    green = np.choose(sector, [rising, value, value, falling, 0, 0])
+    blue = np.choose(sector, [0, 0, rising, value, value, falling])
+    return (np.stack([red, green, blue], axis = -1) * 255).astype(np.uint8)
+
+class FieldRaster:
+    """Field of the whole playground as one image.
+
+    resolution x resolution pixels cover the boundary box, each sampled
+    at its center like a field meter. quantity is 'total' (the black
+    meter line), 'gravity' or 'electric'. Brightness is scaled to the
+    scalePercentile of the field length in the image, so the colours
+    adapt as masses and charges change. At most rate images per second
+    are made, see due()."""
+    def __init__(self, resolution: int = 256, quantity: str = 'total',
+            rate: float = 5, scalePercentile: float = 99,
+            realClock = time.perf_counter):
+        if quantity not in QUANTITIES:
+            raise ValueError(f'Unknown field quantity: {quantity}')
+        self.resolution = resolution
+        self.quantity = quantity
+        self.rate = rate
+        self.scalePercentile = scalePercentile
+        self.realClock = realClock
+        self.nextRender = realClock()
+        self.gridKey = None
+        self.points = np.zeros((0, 2))
+
+    def due(self) -> bool:
+        """True once per 1 / rate seconds, the raster should be redrawn."""
+        currentTime = self.realClock()
+        if currentTime < self.nextRender:
+            return False
+        self.nextRender = currentTime + (1 / self.rate if self.rate else 0)
+        return True
+
+    def grid(self, boundary: "Boundary") -> np.ndarray:
+        """Pixel centers over the boundary box, row by row from the top."""
+        key = (tuple(boundary.xy1), tuple(boundary.xy2), self.resolution)
+        if key != self.gridKey:
+            self.gridKey = key
+            n = self.resolution
+            x = boundary.xy1[0] + (np.arange(n) + 0.5) \
+                * (boundary.xy2[0] - boundary.xy1[0]) / n
+            y = boundary.xy1[1] + (np.arange(n) + 0.5) \
+                * (boundary.xy2[1] - boundary.xy1[1]) / n
+            gridX, gridY = np.meshgrid(x, y)
+            self.points = np.stack([gridX.ravel(), gridY.ravel()], axis = 1)
+        return self.points
+
+    def field(self, sample, boundary: "Boundary") -> np.ndarray:
+        """The chosen field at every pixel, as (resolution, resolution, 2).
+
+        sample is any points -> (G, E) function, such as a FieldSampler's
+        sample_field() or field_sampling.sample_field() with sources."""
+        gField, eField = sample(self.grid(boundary))
+        match self.quantity:
+            case 'gravity':
+                vectors = gField
+            case 'electric':
+                vectors = eField
+            case _:
+                vectors = gField + eField
+        return vectors.reshape(self.resolution, self.resolution, 2)
+
+    def image(self, sample, boundary: "Boundary") -> np.ndarray:
+        """RGB image of the field, uint8 (resolution, resolution, 3)."""
+        # Single precision is plenty for colours, and faster
+        vectors = self.field(sample, boundary).astype(np.float32)
+        length = np.hypot(vectors[..., 0], vectors[..., 1]).ravel()
+        rank = min(int(len(length) * self.scalePercentile / 100),
+            len(length) - 1)
+        scale = float(np.partition(length, rank)[rank])
+        return direction_colours(vectors, scale)
@@ -8,412 +8,230 @@ Purpose: Simulate effects electric and gravitational force from rotating
 from cmu_graphics import *
 import time
 import math
-from random import randrange
-
-def dist(xy1: float, xy2: float) -> float:
-    """Calculate distance between two points."""
-    return math.sqrt((xy1[0] - xy2[0])**2 + (xy1[1] - xy2[1])**2)
-
-class TimeStamp:
-    """Measures time passed.
-
-    Each individual object (e.g., satellite, ball) has a timestamp."""
-    def __init__(self):
-        self.timeStamp = time.time()
-        self.timeLapse = 0
-        
-    def time_lapse(self) -> float:
-        """Calculates and resets time passed."""
-        currentTime = time.time()
-        self.timeLapse = (currentTime - self.timeStamp)
-        self.timeStamp = currentTime
-        return self.timeLapse
-
-class Point:
-    """Updates object location.
-
-    Helpful for calculating kinetics involving forces or collisions."""
-    def __init__(self, xy_parameter: list):
-        self.xy_current = [0, 0]
-        self.XY_next = [0, 0]
-        # Current or previous graph point
-        self.xy_current[0] = xy_parameter[0]
-        self.xy_current[1] = xy_parameter[1]
-        # For calculation and new point
-        self.XY_next[0] = xy_parameter[0]
-        self.XY_next[1] = xy_parameter[1]        
-    
-    def update_point(self) -> None:
-        """Current point is updated based on calculated point."""
-        self.xy_current[0] = self.XY_next[0]
-        self.xy_current[1] = self.XY_next[1]
-        return None
-    
-    def copy_point(self) -> None:
-        """Copy current point to new point for calculation purpose."""
-        self.XY_next[0] = self.xy_current[0]
-        self.XY_next[1] = self.xy_current[1]
-        return None
-        
-class GravitationalForce:
-    """For gravity force vector calculation."""
-    def __init__(self, mass: float):
-        self.xyGForce = [0, 0]
-        self.mass = mass
-        
-    def g_force(self, objects: "Ball | Satellite") -> list:
-        """Calculating gravity force vector based on object's mass."""
-        self.xyGForce = [0, 0]
-        vector = [0, 0]
-
-        for obj in objects:
-            if obj.name == 'Ball' or obj.name == 'Satellite':
-                # Avoids force from itself
-                if obj.xy_current[0] != self.xy_current[0] and \
-                    obj.xy_current[1] != self.xy_current[1]:
-                    vector[0] = obj.xy_current[0] - self.xy_current[0]
-                    vector[1] = obj.xy_current[1] - self.xy_current[1]
-
-                    # Pseudo gravitational force formula with  d instead of d^2
-                    # for visual exaggeration
-                    force = self.mass * obj.mass / dist(self.xy_current, 
-                        obj.xy_current)
-                    self.xyGForce[0] += vector[0] * force
-                    self.xyGForce[1] += vector[1] * force
-        return self.xyGForce
-
-class ElectricForce:
-    """For electric force calculation."""
-    def __init__(self, charge: float):
-        self.charge = charge
-        self.xyEForce = [0, 0]
-
-    def e_force(self, objects: list) -> list:
-        """Calculates & returns electric force vector from objects."""
-        self.xyEForce = [0, 0]
-        vector = [0, 0]
-
-        for obj in objects:
-            # Forces from physical objects only
-            if obj.name == 'Ball' or obj.name == 'Satellite':
-                # Avoid force from itself
-                if obj.xy_current[0] != self.xy_current[0] and \
-                    obj.xy_current[1] != self.xy_current[1]:
-                    vector[0] = self.xy_current[0] - obj.xy_current[0]
-                    vector[1] = self.xy_current[1] - obj.xy_current[1]
-
-                    # Pseudo electric force formula with d instead of d^2
-                    # for visual exaggeration
-                    force = self.charge * obj.charge / dist(self.xy_current, 
-                        obj.xy_current)
-                    self.xyEForce[0] += vector[0] * force
-                    self.xyEForce[1] += vector[1] * force
-        return self.xyEForce
-
-class Boundary:
-    """Boundary of app object.
-
-    Detects object collision with boundaries.
-    Sets vector for ricochet."""
+import physics_core
+import barnes_hut
+import spatial_hash
+import profiling
+import simulation_thread
+import collision_events
+import neighbour_lists
+import block_timesteps
+import checkpoints
+import ball_lifecycle
+from physics_core import dist
+
+# Settings of new objects, saved with every checkpoint
+CHECKPOINT_SETTINGS = ('radiusBall', 'radiusSatellite', 'massBall',
+    'massSatellite', 'chargeBall', 'chargeSatellite', 'omegaBall')
+
+class Boundary(physics_core.Boundary):
+    """Boundary drawn as four lines around the playground."""
     def __init__(self, xy1: list, xy2: list):
-        # Boundary defined by two points xy1 and xy2, xy1 < xy2
-        self.name = 'Boundary'
-        self.xy1 = [0, 0]
-        self.xy2 = [0, 0]
-        self.xy1[0] = xy1[0]
-        self.xy1[1] = xy1[1]
-        self.xy2[0] = xy2[0]
-        self.xy2[1] = xy2[1]
+        physics_core.Boundary.__init__(self, xy1, xy2)
 
         Line(xy1[0], xy1[1], xy1[0], xy2[1])
         Line(xy1[0], xy1[1], xy2[0], xy1[1])
         Line(xy2[0], xy1[1], xy2[0], xy2[1])
         Line(xy1[0], xy2[1], xy2[0], xy2[1])
 
-    def collision(self, xy_current, xyVelocity: list,
-            radius: float, timeLapse: float) -> list:
-        reflectVelocity = [0, 0]
-        reflectVelocity[0] = xyVelocity[0]
-        reflectVelocity[1] = xyVelocity[1]
-        XY_next = [0, 0]
-        XY_next[0] = xy_current[0]
-        XY_next[1] = xy_current[1]
-
-        # Change velocity direction with elastic collision to wall
-        if xy_current[0] - self.xy1[0] < radius:
-            reflectVelocity = [-xyVelocity[0], xyVelocity[1]]
-            XY_next[0] = self.xy1[0] + radius
-            XY_next[0] += reflectVelocity[0] * timeLapse
-            XY_next[1] += reflectVelocity[1] * timeLapse
-
-        if self.xy2[0] - xy_current[0] < radius:
-            reflectVelocity = [-xyVelocity[0], xyVelocity[1]]
-            XY_next[0] = self.xy2[0] - radius
-            XY_next[0] += reflectVelocity[0] * timeLapse 
-            XY_next[1] += reflectVelocity[1] * timeLapse
-
-        if xy_current[1] - self.xy1[1] < radius:
-            reflectVelocity = [xyVelocity[0], -xyVelocity[1]]
-            XY_next[1] = self.xy1[1] + radius
-            XY_next[0] += reflectVelocity[0] * timeLapse 
-            XY_next[1] += reflectVelocity[1] * timeLapse
-
-        if self.xy2[1] - xy_current[1] < radius:
-            reflectVelocity = [xyVelocity[0], -xyVelocity[1]]
-            XY_next[1] = self.xy2[1] - radius
-            XY_next[0] += reflectVelocity[0] * timeLapse 
-            XY_next[1] += reflectVelocity[1] * timeLapse
-        
-        # All the objects should stay inside the boundary
-        if XY_next[0] - self.xy1[0] < radius:
-            XY_next[0] = self.xy1[0] + radius
-        if self.xy2[0] - XY_next[0] < radius:
-            XY_next[0] = self.xy2[0] - radius
-        if XY_next[1] - self.xy1[1] < radius:
-            XY_next[1] = self.xy1[1] + radius
-        if self.xy2[1] - XY_next[1] < radius:
-            XY_next[1] = self.xy2[1] - radius
-            
-        return [XY_next, reflectVelocity]
-    
-    def movement(self, objects: list) -> None:
-        """Boundary does not move.
+class CircleShape:
+    """Draws a ball or satellite as a circle in its charge color.
 
-        Returns nothing for compatability in onStep()."""
-        return None
-    
-    def update(self, objects: list) -> None:
-        """Boundary does not move.
+    The circle is created at the first sync_shape(), so objects added
+    on the simulation thread still get their shapes on the UI thread."""
+    __slots__ = ()
 
-        Returns nothing for compatability in onStep()."""
+    def init_shape(self) -> None:
+        """No circle until the first sync_shape()."""
+        self.circle = None
         return None
 
-class PhysicalProperty:
-    """Defines physical characteristics of object."""
-    def __init__(self, mass: float, charge: float):
-        self.mass = mass
-        self.charge = charge
-        
-class KineticStatus:
-    """To calculate object kinetic factors."""
-    def __init__(self):
-        # Need current and future velocity in case of collision
-        self.velocity0 = [0, 0]
-        self.velocity1 = [0, 0]
-        self.energy = [0, 0]
-        self.momentum = [0, 0]
-
-    def kinetic_status_update(self):
-        # Copy calculated velocity to current velocity
-        self.velocity0[0] = self.velocity1[0]
-        self.velocity0[1] = self.velocity1[1]
-        
-class OrbitalEngine:
-    """Sets satellite orbit variables"""
-    def __init__(self):
-        # In rad / sec
-        self.omegaOrbit = 0.1
-        self.centerOrbit = [0, 0]
-        self.radiusOrbit = 400
-        self.directionOrbit = 1
-        
-class PhysicalObject(PhysicalProperty, GravitationalForce, ElectricForce,
-        KineticStatus):
-    """Creates physical object with kinetic & electrical properties."""
-    def __init__(self, mass: float, charge: float):
-        PhysicalProperty.__init__(self, mass, charge)
-        KineticStatus.__init__(self)
-        GravitationalForce.__init__(self, mass)
-        ElectricForce.__init__(self, charge)
-
-        # Positive change is blue
-        # Negative charge is red
-        # Neutral charge is black
-        if charge > 0:
-            self.chargeColor = "blue"
-        elif charge < 0 :
-            self.chargeColor = "red"
-        else:
-            self.chargeColor = 'black'
-                         
-# Classes for actual moving objects on app object
-class Ball(TimeStamp, Point, PhysicalObject):
-    """For ball(s) in app object."""
-    def __init__(self, xy_current: list, radius: float, mass: float, 
-            charge: float):
-        self.name = 'Ball'
-        TimeStamp.__init__(self)
-        Point.__init__(self, xy_current)
-        PhysicalObject.__init__(self, mass, charge)
-        self.radius = radius
-        self.circle =  Circle(self.xy_current[0], self.xy_current[1],
-            radius, fill = self.chargeColor)
-        self.weight = mass
-        
-    def movement(self, objects: list) -> None:
-        """Calculate ball velocity based on gravity & electric force."""
-        t = self.time_lapse()
-
-        # From xy to XY for calculation
-        self.copy_point()
-
-        # Collect force
-        self.g_force(objects)
-        self.e_force(objects)
-
-        # Total force from G and E
-        tXForce = self.xyGForce[0] + self.xyEForce[0]
-        tYForce = self.xyGForce[1] + self.xyEForce[1]
-
-        # Acceleration from force
-        tXAcc = tXForce / self.mass
-        tYAcc = tYForce / self.mass
-        
-        # Calculate next position
-        # Formula: A = dv/dt
-        self.velocity1[0] = self.velocity0[0] + tXAcc * t
-        self.velocity1[1] = self.velocity0[1] + tYAcc * t
+    def create_circle(self, x: float, y: float, radius: float,
+            color: str) -> None:
+        """Adds the circle at x, y."""
+        self.circle =  Circle(x, y, radius, fill = color)
+        self.drawnX = x
+        self.drawnY = y
+        self.drawnStyle = (radius, color)
+        return None
 
-        # Formula: v = dx/dt
-        self.XY_next[0] = self.xy_current[0] + self.velocity1[0] * t
-        self.XY_next[1] = self.xy_current[1] + self.velocity1[1] * t
+    def sync_shape(self, threshold: float = 0, state: tuple = None) -> bool:
+        """Moves the circle if it is more than threshold pixels off."""
+        if state is None:
+            state = self.shape_state()
+        x, y, radius, color = state
+        if self.circle is None:
+            self.create_circle(x, y, radius, color)
+            return True
+        if self.drawnX is None or self.drawnStyle != (radius, color):
+            # Hidden by hide_shape(), or respawned with another radius or
+            # charge between two renders
+            self.circle.radius = radius
+            self.circle.fill = color
+            self.circle.visible = True
+            self.drawnStyle = (radius, color)
+        elif abs(x - self.drawnX) <= threshold and \
+                abs(y - self.drawnY) <= threshold:
+            return False
+        self.circle.centerX = x
+        self.circle.centerY = y
+        self.drawnX = x
+        self.drawnY = y
+        return True
 
+    def hide_shape(self) -> None:
+        """Hides the circle of a removed object, kept for reuse."""
+        if self.circle is not None:
+            self.circle.visible = False
+            self.drawnX = None
         return None
-        
-    def update(self, objects: list) -> None:
-        """Updating ball position based on nearby forces 
 
-        Or object collisions."""
-        self.check_collision(objects, self.radius)
-        
-        # Finalize object movement after collision
-        self.update_point() 
-        self.kinetic_status_update()
-        self.circle.centerX = self.xy_current[0]
-        self.circle.centerY = self.xy_current[1]
-        return None
+# Classes for actual moving objects on app object
+class Ball(CircleShape, physics_core.Ball):
+    """For ball(s) in app object."""
+    __slots__ = ('circle', 'drawnX', 'drawnY', 'drawnStyle')
 
-    def check_collision(self, objects: list, radius = 1) -> None:
-        for obj in objects:
-            # Check ball and satellites
-            if obj.name == 'Ball' or obj.name == 'Satellite':
-                # Exclude itself
-                if obj.xy_current[0] != self.xy_current[0] and \
-                        obj.xy_current[1] != self.xy_current[1]:
-                    # If center of two are closer 
-                    # Than the sum of radii at new position XY
-                    if dist(self.XY_next, obj.xy_current) < self.radius + \
-                            obj.radius:
-                        # Prepare metrics for momemtum calculation
-                        massDiff = self.mass - obj.mass
-                        massSum = self.mass + obj.mass
-
-                        # Velocity after collision
-                        self.velocity1[0] = massDiff / massSum \
-                            * self.velocity0[0] + 2 * obj.mass \
-                            * obj.velocity0[0] / massSum
-                        self.velocity1[1] = massDiff / massSum \
-                            * self.velocity0[1] + 2 * obj.mass \
-                            * obj.velocity0[1]/ massSum
-
-                        # Re-calculate position with reflected velocity
-                        self.XY_next[0] = self.xy_current[0] + \
-                            self.velocity1[0] * self.timeLapse
-                        self.XY_next[1] = self.xy_current[1] + \
-                            self.velocity1[1] * self.timeLapse
-        
-        # Check if ball should bounce at the boundary with a new position
-        for obj in objects:
-            if obj.name == 'Boundary':
-                [xyUpdate, velocityUpdate] = obj.collision(self.XY_next,
-                    self.velocity1, radius, self.timeLapse)
-
-                self.XY_next[0] = xyUpdate[0]
-                self.XY_next[1] = xyUpdate[1]
-                self.velocity1[0] = velocityUpdate[0]
-                self.velocity1[1] = velocityUpdate[1]
-        return None
-    
-class Satellite(TimeStamp, Point, OrbitalEngine, PhysicalObject):
+    def __init__(self, xy_current: list, radius: float, mass: float,
+            charge: float, clock = time.time):
+        physics_core.Ball.__init__(self, xy_current, radius, mass, charge,
+            clock)
+        self.init_shape()
+
+class Satellite(CircleShape, physics_core.Satellite):
     """For moving satellites in ring."""
-    def __init__(self, xy_current: list, radius: float, mass: float, 
-            charge: float, omega: float, orbitRadius: float, angle: float):
-        self.name = 'Satellite'
-        TimeStamp.__init__(self)
-        Point.__init__(self, xy_current)
-        PhysicalObject.__init__(self, mass, charge)
-        self.radius = radius
-        self.omega = omega
-        self.orbitRadius = orbitRadius
-        self.angle = angle
-
-        # Orbit around center
-        tX = app.centerPlayground[0] + self.orbitRadius * math.cos(self.angle)
-        tY = app.centerPlayground[1] + self.orbitRadius * math.sin(self.angle)
-        self.circle =  Circle(tX, tY, radius, fill = self.chargeColor)
-        self.xy_current[0] = tX
-        self.xy_current[1] = tY
-        
-    def movement(self, objects: "Satellite") -> None:
-        """Circular satellite movement."""
-        t = self.time_lapse()
+    __slots__ = ('circle', 'drawnX', 'drawnY', 'drawnStyle')
 
-        # From xy to XY for calculation
-        self.copy_point()
-        
-        # Angular rotation by timeLapse
-        self.angle += t * self.omega
-        self.XY_next[0] = app.centerPlayground[0] + self.orbitRadius \
-            * math.cos(self.angle)
-        self.XY_next[1] = app.centerPlayground[1] + self.orbitRadius \
-            * math.sin(self.angle)
-        return None
-        
-    def update(self, objects: list) -> None:
-        """Updating satellite position to update nearby vector field points."""
-        self.update_point()
-        self.circle.centerX = self.xy_current[0]
-        self.circle.centerY = self.xy_current[1] 
-        return None
-        
-class PointForceField(Point, GravitationalForce, ElectricForce):
+    def __init__(self, xy_current: list, radius: float, mass: float,
+            charge: float, omega: float, orbitRadius: float, angle: float,
+            clock = time.time):
+        physics_core.Satellite.__init__(self, xy_current, radius, mass,
+            charge, omega, orbitRadius, angle, clock)
+        self.init_shape()
+
+class PointForceField(physics_core.PointForceField):
     """For creating and updating field vectors.
 
     Blue vectors = gravity force
     Red vectors = electrical force
     Black vectors = average of both forces"""
     def __init__(self, xy_current: list):
-        self.name = 'Field'
-        Point.__init__(self, xy_current)
-        GravitationalForce.__init__(self, 1)
-        ElectricForce.__init__(self, 1)
-        
+        physics_core.PointForceField.__init__(self, xy_current)
+
         # Initial zero force field lines
-        self.line_g = Line(xy_current[0], xy_current[1], xy_current[0], 
+        self.line_g = Line(xy_current[0], xy_current[1], xy_current[0],
             xy_current[1], fill='blue')
-        self.line_e = Line(xy_current[0], xy_current[1], xy_current[0], 
+        self.line_e = Line(xy_current[0], xy_current[1], xy_current[0],
             xy_current[1], fill='red')
-        self.line_t = Line(xy_current[0], xy_current[1], xy_current[0], 
+        self.line_t = Line(xy_current[0], xy_current[1], xy_current[0],
             xy_current[1], fill='black')
+        # Force vectors as last drawn: gravity x, y and electric x, y
+        self.drawnForce = [0, 0, 0, 0]
+
+    def sync_shape(self, threshold: float = 0, state: tuple = None) -> bool:
+        """Collecting calculated force vectors & updating field vectors.
+
+        Lines are left alone unless a vector changed by more than
+        threshold pixels."""
+        if state is None:
+            state = self.shape_state()
+        [gX, gY, eX, eY] = state
+        drawn = self.drawnForce
+        if abs(gX - drawn[0]) <= threshold and \
+                abs(gY - drawn[1]) <= threshold and \
+                abs(eX - drawn[2]) <= threshold and \
+                abs(eY - drawn[3]) <= threshold:
+            return False
+        self.drawnForce = [gX, gY, eX, eY]
+        self.line_g.x2 = gX + self.xy_current[0]
+        self.line_g.y2 = gY + self.xy_current[1]
+        self.line_e.x2 = eX + self.xy_current[0]
+        self.line_e.y2 = eY + self.xy_current[1]
+        self.line_t.x2 = gX + eX + self.xy_current[0]
+        self.line_t.y2 = gY + eY + self.xy_current[1]
+        return True
 
-    def movement(self, objects: list) -> None:
-        """Collects sum of forces from objects."""
-        self.g_force(objects)
-        self.e_force(objects)
-        return None
-        
-    def update(self, objects: list) -> None:
-        """Collecting calculated force vectors & updating field vectors."""
-        self.line_g.x2 = self.xyGForce[0] + self.xy_current[0]
-        self.line_g.y2 = self.xyGForce[1] + self.xy_current[1]
-        self.line_e.x2 = self.xyEForce[0] + self.xy_current[0]
-        self.line_e.y2 = self.xyEForce[1] + self.xy_current[1]
-        self.line_t.x2 = self.xyGForce[0] + self.xyEForce[0] + \
-            self.xy_current[0]
-        self.line_t.y2 = self.xyGForce[1] + self.xyEForce[1] + \
-            self.xy_current[1]
+class FieldRasterImage:
+    """Draws a field_raster.FieldRaster as one image behind the objects.
+
+    Replaces the line meters, the whole field is one shape that is
+    redrawn at the raster's own rate."""
+    def __init__(self, raster: "FieldRaster", boundary: Boundary):
+        self.raster = raster
+        self.boundary = boundary
+        self.image = None
+
+    def draw(self, pixels: "np.ndarray") -> None:
+        """Shows an RGB array stretched over the playground."""
+        # Pillow is only needed for the raster field display
+        import PIL.Image
+        picture = CMUImage(PIL.Image.fromarray(pixels))
+        if self.image is None:
+            self.image = Image(picture, self.boundary.xy1[0],
+                self.boundary.xy1[1],
+                width = self.boundary.xy2[0] - self.boundary.xy1[0],
+                height = self.boundary.xy2[1] - self.boundary.xy1[1])
+            self.image.toBack()
+        else:
+            self.image.url = picture
         return None
 
+    def frame(self, world: physics_core.World) -> bool:
+        """Redraws the field if the raster is due, returns True if it was."""
+        if not self.raster.due():
+            return False
+        prof = world.profiler
+        if prof is not None:
+            start = prof.clock()
+        sampler = world.fieldSampler
+        if sampler is None or not hasattr(sampler, 'sample_field'):
+            import field_sampling
+            if hasattr(world, 'particles'):
+                sources = field_sampling.FieldSources.from_particles(
+                    world.particles)
+            else:
+                sources = field_sampling.FieldSources.from_objects(
+                    world.objs)
+            sample = lambda points: field_sampling.sample_field(points,
+                sources)
+        else:
+            # Batched or mesh sampler, with the sources of the last step
+            sample = sampler.sample_field
+        self.draw(self.raster.image(sample, world.boundary))
+        if prof is not None:
+            prof.lap('Field raster', start)
+        return True
+
+class GraphicsWorld(physics_core.World):
+    """World whose objects are drawn with cmu_graphics shapes."""
+    boundaryClass = Boundary
+    fieldClass = PointForceField
+    satelliteClass = Satellite
+    ballClass = Ball
+
+def world_class(engine: str) -> type:
+    """Picks the drawable world class for the selected physics engine."""
+    match engine:
+        case 'objects':
+            return GraphicsWorld
+        case 'arrays':
+            # NumPy is only needed for the array engine
+            import particle_arrays
+
+            class ArrayBall(CircleShape, particle_arrays.BallView):
+                """Array-backed ball drawn as a circle."""
+                __slots__ = ('circle', 'drawnX', 'drawnY', 'drawnStyle')
+
+            class ArraySatellite(CircleShape, particle_arrays.SatelliteView):
+                """Array-backed satellite drawn as a circle."""
+                __slots__ = ('circle', 'drawnX', 'drawnY', 'drawnStyle')
+
+            class GraphicsArrayWorld(GraphicsWorld,
+                    particle_arrays.ArrayWorld):
+                """Array-backed world drawn with cmu_graphics shapes."""
+                satelliteClass = ArraySatellite
+                ballClass = ArrayBall
+            return GraphicsArrayWorld
+
 def mouse_click_range_check(xy_current: float, xy1: float, xy2: float) -> bool:
     """A function that checks if a mouse click xy is inside a box defined 
 
@@ -460,6 +278,20 @@ class menuItem:
         self.String.fill = 'black'
         return None
 
+def world_command(function, *args) -> None:
+    """Runs a change to the world now, or on the simulation thread."""
+    if app.simulation is None:
+        function(*args)
+    else:
+        app.simulation.submit(function, *args)
+    return None
+
+def scale_objects(objects: list, attribute: str, ratio: float) -> None:
+    """Multiplies attribute of every object by ratio."""
+    for object in objects:
+        setattr(object, attribute, getattr(object, attribute) * ratio)
+    return None
+
 def onMousePress(mouseX: float, mouseY: float) -> None:
     clickedXY = [mouseX, mouseY]
 
@@ -492,21 +324,22 @@ def onMousePress(mouseX: float, mouseY: float) -> None:
                 vectorY = clickedXY[1] - app.centerPlayground[1]
                 orbitRadius = dist(clickedXY, app.centerPlayground)
                 angle = math.atan2(vectorY, vectorX)
-                app.objs.append( 
-                                Satellite(app.centerPlayground, 
-                                          app.radiusSatellite, 
-                                          app.massSatellite, 
-                                          app.chargeSatellite * chargeSign,
-                                          app.omegaBall * rotationSign,
-                                          orbitRadius, angle)) 
+                world_command(app.world.add_satellite, app.radiusSatellite,
+                                        app.massSatellite,
+                                        app.chargeSatellite * chargeSign,
+                                        app.omegaBall * rotationSign,
+                                        orbitRadius, angle)
 
             case 'Ball':
-                # Add ball at clicked point
-                app.objs.append( 
-                                Ball(clickedXY, 
-                                     app.radiusBall, 
-                                     app.massBall, 
-                                     app.chargeBall * chargeSign) )
+                # Add ball at clicked point, reusing a removed one
+                world_command(app.ballPool.spawn, clickedXY,
+                                   app.radiusBall,
+                                   app.massBall,
+                                   app.chargeBall * chargeSign)
+
+            case 'Remove':
+                # Remove the ball under the click
+                world_command(app.ballPool.retire_at, clickedXY)
 
     else:
         # Check if menu items were clicked
@@ -565,9 +398,8 @@ def onMousePress(mouseX: float, mouseY: float) -> None:
                     case 'Decrease':
                         ratio = 1/app.menuSatelliteSpeedStepRatio
                 # Change angular speed of all satellites
-                for object in app.objs:
-                    if object.name == 'Satellite':
-                        object.omega *= ratio
+                world_command(scale_objects, app.world.objs.satellites, 'omega',
+                    ratio)
 
             case 'Satellite mass':
                 match clickedName:
@@ -576,9 +408,8 @@ def onMousePress(mouseX: float, mouseY: float) -> None:
                     case 'Decrease':
                         ratio = 1/app.menuSatelliteMassStepRatio
                 # Change mass of all satellites
-                for object in app.objs:
-                    if object.name == 'Satellite':
-                        object.mass *= ratio    
+                world_command(scale_objects, app.world.objs.satellites, 'mass',
+                    ratio)
 
             case 'Satellite charge':
                 match clickedName:
@@ -587,9 +418,8 @@ def onMousePress(mouseX: float, mouseY: float) -> None:
                     case 'Decrease':
                         ratio = 1/app.menuSatelliteChargeStepRatio
                 # Change charge of all satellites
-                for object in app.objs:
-                    if object.name == 'Satellite':
-                        object.charge *= ratio                
+                world_command(scale_objects, app.world.objs.satellites, 'charge',
+                    ratio)
 
             case 'Ball mass':
                 match clickedName:
@@ -598,9 +428,8 @@ def onMousePress(mouseX: float, mouseY: float) -> None:
                     case 'Decrease':
                         ratio = 1/app.menuBallMassStepRatio
                 # Change mass of all balls
-                for object in app.objs:
-                    if object.name == 'Ball':
-                        object.mass *= ratio    
+                world_command(scale_objects, app.world.objs.balls, 'mass',
+                    ratio)
                         
             case 'Ball charge':
                 match clickedName:
@@ -609,15 +438,17 @@ def onMousePress(mouseX: float, mouseY: float) -> None:
                     case 'Decrease':
                         ratio = 1/app.menuBallMassStepRatio
                 # Change mass of all satellites
-                for object in app.objs:
-                    if object.name == 'Ball':
-                        object.charge *= ratio
+                world_command(scale_objects, app.world.objs.balls, 'charge',
+                    ratio)
+
+        # Let the physics engine pick up changed mass, charge or omega
+        world_command(app.world.properties_changed)
     return None
 
 def menu_setup() -> None:
     """Creates menu selection items."""
 
-    app.menuObjectTypeList = ['Satellite', 'Ball']
+    app.menuObjectTypeList = ['Satellite', 'Ball', 'Remove']
     app.menuObjectType = 'Satellite'
     app.menuChargeTypeList = ['Positive', 'Negative', 'Neutral']
     app.menuChargeType = 'Positive'
@@ -721,11 +552,62 @@ def menu_setup() -> None:
             selected) )
     return None
 
+def profiler_overlay_setup() -> None:
+    """Creates the hidden labels of the profiler overlay."""
+    app.profilerLabels = []
+    for i in range(app.profilerOverlayLines):
+        app.profilerLabels.append(Label('', 10, 12 + 14 * i, align = 'left',
+            size = 11, visible = False))
+    return None
+
+def profiler_overlay_update() -> None:
+    """Shows the slowest phases of the profiler on the playground."""
+    lines = app.world.profiler.overlay_lines(app.profilerOverlayLines)
+    for i in range(len(app.profilerLabels)):
+        app.profilerLabels[i].value = lines[i] if i < len(lines) else ''
+    return None
+
+def onKeyPress(key: str) -> None:
+    """p switches the profiler on or off, x exports its results,
+    c saves a checkpoint."""
+    match key:
+        case 'p':
+            if app.world.profiler is None:
+                profiler = profiling.PhaseProfiler()
+            else:
+                profiler = None
+            world_command(app.world.set_profiler, profiler)
+            for label in app.profilerLabels:
+                label.visible = profiler is not None
+        case 'x':
+            if app.world.profiler is not None:
+                app.world.profiler.export_csv('profile.csv')
+                app.world.profiler.export_json('profile.json')
+        case 'c':
+            world_command(checkpoints.save_checkpoint, app.world,
+                app.checkpointPath, None, {name: getattr(app, name)
+                    for name in CHECKPOINT_SETTINGS})
+    return None
+
 # Frame update
 def onStep() -> None:
-    for object in app.objs:
-        object.movement(app.objs)
-        object.update(app.objs)
+    # With a simulation thread, physics runs by itself and only drawing
+    # happens here. A replay moves the bodies without any physics.
+    if app.player is not None:
+        app.player.frame()
+        app.renderer.frame()
+    elif app.simulation is None:
+        app.stepper.frame()
+    else:
+        app.renderer.frame()
+    if app.fieldRaster is not None:
+        app.fieldRaster.frame(app.world)
+
+    # Refresh the overlay every few frames only, labels are slow
+    profiler = app.world.profiler
+    if profiler is not None and \
+            profiler.frames % app.profilerOverlayEvery == 0:
+        profiler_overlay_update()
     return None
 
 # Set up screen
@@ -757,43 +639,178 @@ def setup() -> None:
     # Field vector setup
     app.nColMeter = 12
     app.nRowMeter = 12
+    # Field display: 'meters' draws the line meters above, 'raster' one
+    # image of the field instead, hue for direction and brightness for
+    # strength (needs NumPy and Pillow). Quantity is 'total', 'gravity'
+    # or 'electric', rate is images per second.
+    app.fieldDisplay = 'meters'
+    app.fieldRasterResolution = 256
+    app.fieldRasterRate = 5
+    app.fieldRasterQuantity = 'total'
+
+    # Physics engine: 'objects' or 'arrays' (needs NumPy)
+    app.physicsEngine = 'objects'
+    # Force solver: 'direct' pairwise sums, 'barnes-hut' quadtree,
+    # 'cutoff' short-range sums from Verlet neighbour lists or 'mesh'
+    # FFT particle-mesh (needs NumPy), exact within meshShortRange pixels,
+    # or 'strips' summed on stripWorkers processes (None for every core)
+    app.forceSolver = 'direct'
+    app.barnesHutTheta = 0.5
+    app.cutoffRadius = 150
+    app.cutoffSkin = 20
+    app.meshResolution = 64
+    app.meshShortRange = 0
+    app.stripWorkers = None
+    # Spatial hash broad phase for ball collisions
+    app.collisionGrid = True
+    # Exact collision times from an event queue, fast balls never tunnel
+    app.collisionEvents = False
+    # Fill all field meters with one NumPy call, optionally with
+    # precomputed satellite tables
+    app.batchedField = False
+    app.satelliteFieldTables = False
+    # Fixed physics steps per rendered frame, 'euler' or 'verlet'
+    app.stepsPerSecond = 30
+    app.physicsSubsteps = 4
+    app.integrator = 'euler'
+    # 'sequential' updates objects one by one, 'two-phase' computes every
+    # force and collision first and moves everything afterwards
+    app.updateOrder = 'sequential'
+    # Balls in close encounters get up to 2^maxLevel finer steps
+    app.blockTimesteps = False
+    app.blockMaxLevel = 6
+    # Shape updates per second (None for every frame) and the smallest
+    # change in pixels worth redrawing
+    app.renderRate = 30
+    app.renderThreshold = 0.5
+    # Run physics on a worker thread, so input never waits for it
+    app.simulationThread = False
+    # Record every physics step to a file, or replay one instead of
+    # running physics (both need NumPy)
+    app.recordTrajectory = None
+    app.recordCapacity = 1024
+    app.replayTrajectory = None
+    # Press c to save the world to checkpointPath, start from a saved
+    # checkpoint instead of the default scene
+    app.checkpointPath = 'checkpoint.json'
+    app.restoreCheckpoint = None
+    # Start from a scene file (.json or .npz, needs NumPy) instead of the
+    # default scene
+    app.scenePath = None
+    # Remove balls older than ballLifetime seconds or outside the box
+    # cullRegion [[x1, y1], [x2, y2]], None for never. Removed balls are
+    # reused by the next ball added.
+    app.ballLifetime = None
+    app.cullRegion = None
+    # Energy, momentum and collision counts after every step (needs
+    # NumPy), also written to diagnosticsPath as CSV if set
+    app.diagnostics = False
+    app.diagnosticsPath = None
 
     # Graphics objects to interact
-    app.objs = []
-    app.objs.append(Boundary([0, 0], [app.widthPlayground, 
-        app.heightPlayground]))
-    
-    # Add force field vectors
-    for i in range(app.nColMeter):
-        for j in range(app.nRowMeter):
-            tX = ( i + 1 ) / ( app.nColMeter + 1 ) * app.widthPlayground
-            tY = ( j + 1 ) / ( app.nRowMeter + 1 ) * app.heightPlayground
-            app.objs.append(PointForceField([tX, tY]))
-
-    # Add three satellites
-    app.objs.append(Satellite(app.centerPlayground, app.radiusSatellite, 
-        app.massSatellite, 0*app.chargeSatellite, app.omegaBall, 300, 0))
-    app.objs.append(Satellite(app.centerPlayground, app.radiusSatellite, 
-        app.massSatellite, app.chargeSatellite, -app.omegaBall, 280, 
-        math.pi/3))
-    app.objs.append(Satellite(app.centerPlayground, app.radiusSatellite, 
-        app.massSatellite, -app.chargeSatellite, app.omegaBall, 320, 
-        math.pi/2))
-    
-    # Add four balls
-    app.objs.append(Ball([app.widthPlayground/2 - 100, 
-        app.heightPlayground/2 - 100], app.radiusBall, app.massBall, 
-        0*app.chargeBall))
-    app.objs.append(Ball([app.widthPlayground/2 + 100, 
-        app.heightPlayground/2 + 100], app.radiusBall, app.massBall, 
-        0*app.chargeBall))
-    app.objs.append(Ball([app.widthPlayground/2,
-        app.heightPlayground/2 + 150], app.radiusBall, app.massBall,
-        app.chargeBall))
-    app.objs.append(Ball([app.widthPlayground/2, 
-        app.heightPlayground/2 - 150], app.radiusBall, app.massBall, 
-        -app.chargeBall))
+    app.world = world_class(app.physicsEngine)([0, 0], [app.widthPlayground,
+        app.heightPlayground], physics_core.SimulationClock())
+    app.world.set_integrator(app.integrator)
+    app.world.set_update_order(app.updateOrder)
+    dt = 1 / (app.stepsPerSecond * app.physicsSubsteps)
+    if app.simulationThread and app.replayTrajectory is None:
+        app.simulation = simulation_thread.SimulationThread(app.world, dt,
+            2 * app.physicsSubsteps)
+        app.stepper = app.simulation.stepper
+        app.renderer = physics_core.RenderSync(app.world, app.renderRate,
+            app.renderThreshold, source = app.simulation)
+    else:
+        app.simulation = None
+        app.renderer = physics_core.RenderSync(app.world, app.renderRate,
+            app.renderThreshold)
+        app.stepper = physics_core.FixedStepper(app.world, dt,
+            2 * app.physicsSubsteps, renderer = app.renderer)
+    if app.forceSolver == 'barnes-hut':
+        app.world.set_force_solver(
+            barnes_hut.BarnesHutSolver(app.barnesHutTheta))
+    elif app.forceSolver == 'cutoff':
+        app.world.set_force_solver(neighbour_lists.NeighbourListSolver(
+            app.cutoffRadius, app.cutoffSkin))
+    elif app.forceSolver == 'strips':
+        # NumPy is only needed for the process pool solver
+        import domain_decomposition
+        app.world.set_force_solver(domain_decomposition.StripSolver(
+            app.stripWorkers))
+    if app.collisionGrid:
+        app.world.set_collision_grid(spatial_hash.SpatialHash())
+    if app.collisionEvents:
+        app.world.set_collision_events(collision_events.EventCollider())
+    elif app.blockTimesteps:
+        app.world.set_block_timesteps(block_timesteps.BlockTimesteps(
+            app.blockMaxLevel))
+    if app.forceSolver == 'mesh':
+        # NumPy is only needed for the mesh, which also fills the meters
+        import particle_mesh
+        solver = particle_mesh.MeshSolver(app.meshResolution,
+            app.meshShortRange)
+        app.world.set_force_solver(solver)
+        app.world.set_field_sampler(particle_mesh.MeshFieldSampler(solver))
+    elif app.batchedField:
+        # NumPy is only needed for batched field sampling
+        import field_sampling
+        app.world.set_field_sampler(field_sampling.FieldSampler(
+            satelliteTables = app.satelliteFieldTables))
+    app.fieldRaster = None
+    if app.fieldDisplay == 'raster':
+        # NumPy is only needed for the raster field display
+        import field_raster
+        app.fieldRaster = FieldRasterImage(field_raster.FieldRaster(
+            app.fieldRasterResolution, app.fieldRasterQuantity,
+            app.fieldRasterRate), app.world.boundary)
+        # The raster shows the field, so no line meters
+        app.nColMeter = 0
+        app.nRowMeter = 0
+    app.objs = app.world.objs
+    app.player = None
+    if app.replayTrajectory is not None:
+        # Bodies come from the recording, one record per physics step
+        import trajectory
+        app.player = trajectory.TrajectoryPlayer(trajectory.Trajectory(
+            app.replayTrajectory), app.world, app.physicsSubsteps)
+    elif app.restoreCheckpoint is not None:
+        # Bodies, meters and the clock exactly as saved
+        settings = checkpoints.restore_checkpoint(app.restoreCheckpoint,
+            app.world)
+        for name, value in settings.items():
+            setattr(app, name, value)
+    elif app.scenePath is not None:
+        # Every kind added in bulk, circles appear at the first render
+        import scenes
+        scenes.populate_scene(app.world, scenes.load_scene(app.scenePath),
+            meters = app.fieldRaster is None)
+    else:
+        physics_core.populate_default_scene(app.world, app.radiusBall,
+            app.radiusSatellite, app.massBall, app.massSatellite,
+            app.chargeBall, app.chargeSatellite, app.omegaBall,
+            app.nColMeter, app.nRowMeter)
+    if app.recordTrajectory is not None:
+        import trajectory
+        app.recorder = trajectory.TrajectoryRecorder(app.recordTrajectory,
+            app.recordCapacity, dt)
+        app.stepper.monitors.append(app.recorder)
+    app.ballPool = ball_lifecycle.BallPool(app.world, app.ballLifetime,
+        app.cullRegion)
+    if app.ballLifetime is not None or app.cullRegion is not None:
+        app.stepper.monitors.append(app.ballPool)
+    if app.diagnostics or app.diagnosticsPath is not None:
+        import diagnostics
+        app.world.set_diagnostics(diagnostics.SystemDiagnostics(
+            path = app.diagnosticsPath))
+
+    # Profiler overlay on top of everything, press p to show it
+    app.profilerOverlayLines = 8
+    app.profilerOverlayEvery = 15
+    profiler_overlay_setup()
+
+    if app.simulation is not None:
+        app.simulation.start()
     return None
 
-setup()
-cmu_graphics.run()
\ No newline at end of file
+if __name__ == '__main__':
+    setup()
+    cmu_graphics.run()
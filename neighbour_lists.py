@@ -0,0 +1,158 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Short-range mode for the gravitational and electric pseudo
+         forces. Bodies only feel sources within a cutoff radius, found
+         from cached Verlet neighbour lists, so a step costs O(N k).
+"""
+
+import math
+from physics_core import objects_of_kind
+
+class NeighbourListSolver:
+    """Replaces g_force() and e_force() with a cutoff radius.
+
+    Every body keeps a list of the sources within cutoff + skin. The
+    lists are rebuilt only when some body has moved more than skin / 2
+    since the last build, before that no source can have crossed the
+    cutoff unseen. Set with World.set_force_solver()."""
+    def __init__(self, cutoff: float = 150, skin: float = 20):
+        self.cutoff = cutoff
+        self.skin = skin
+        self.bodies = []
+        self.meters = []
+        self.buildXY = []
+        self.neighbours = {}
+
+        # Arrays engine lists, see particle_forces()
+        self.rows = None
+        self.cols = None
+        self.particleXY = None
+        self.ballRows = None
+
+        # Counters for stats()
+        self.steps = 0
+        self.rebuilds = 0
+        self.pairs = 0
+
+    def stats(self) -> dict:
+        """Steps, list rebuilds and pairs in the lists."""
+        return {'steps': self.steps, 'rebuilds': self.rebuilds,
+            'pairs': self.pairs}
+
+    def moved_too_far(self, xy: list) -> bool:
+        """True if any position is over skin / 2 away from the last build."""
+        limit = (self.skin / 2)**2
+        for [x, y], [x0, y0] in zip(xy, self.buildXY):
+            if (x - x0)**2 + (y - y0)**2 > limit:
+                return True
+        return False
+
+    def prepare(self, objects: list, boundary: "Boundary") -> None:
+        """Rebuilds the lists if the bodies changed or moved too far."""
+        self.steps += 1
+        bodies = objects_of_kind(objects, 'sources')
+        meters = objects_of_kind(objects, 'meters')
+        xy = [obj.xy_current for obj in bodies]
+        if bodies != self.bodies or meters != self.meters or \
+                self.moved_too_far(xy):
+            self.rebuild(bodies, meters)
+        return None
+
+    def rebuild(self, bodies: list, meters: list) -> None:
+        """Bins the sources into cells of cutoff + skin and lists them.
+
+        Meters get lists too, they read their field from forces()."""
+        reach = self.cutoff + self.skin
+        self.bodies = list(bodies)
+        self.meters = list(meters)
+        self.buildXY = [[obj.xy_current[0], obj.xy_current[1]]
+            for obj in bodies]
+
+        cells = {}
+        for obj in bodies:
+            key = (math.floor(obj.xy_current[0] / reach),
+                math.floor(obj.xy_current[1] / reach))
+            cells.setdefault(key, []).append(obj)
+
+        self.neighbours = {}
+        self.pairs = 0
+        for obj in self.bodies + self.meters:
+            x, y = obj.xy_current[0], obj.xy_current[1]
+            cellX = math.floor(x / reach)
+            cellY = math.floor(y / reach)
+            near = []
+            for i in (-1, 0, 1):
+                for j in (-1, 0, 1):
+                    for other in cells.get((cellX + i, cellY + j), ()):
+                        if other is not obj and (other.xy_current[0] - x)**2 \
+                                + (other.xy_current[1] - y)**2 <= reach**2:
+                            near.append(other)
+            self.neighbours[id(obj)] = near
+            self.pairs += len(near)
+        self.rebuilds += 1
+        return None
+
+    def forces(self, obj: "Ball | PointForceField") -> tuple:
+        """Gravity and electric force on obj from sources within cutoff."""
+        xyGForce = [0, 0]
+        xyEForce = [0, 0]
+        x, y = obj.xy_current[0], obj.xy_current[1]
+        for other in self.neighbours.get(id(obj), ()):
+            vector = [other.xy_current[0] - x, other.xy_current[1] - y]
+            d = math.sqrt(vector[0]**2 + vector[1]**2)
+            if d == 0 or d > self.cutoff:
+                continue
+            # Same 1/d pseudo laws as g_force() and e_force()
+            force = obj.mass * other.mass / d
+            xyGForce[0] += vector[0] * force
+            xyGForce[1] += vector[1] * force
+            force = obj.charge * other.charge / d
+            xyEForce[0] -= vector[0] * force
+            xyEForce[1] -= vector[1] * force
+        return xyGForce, xyEForce
+
+    def particle_forces(self, particles: "ParticleArrays",
+            ballXY: "np.ndarray", balls: "np.ndarray",
+            boundary: "Boundary") -> tuple:
+        """forces() for every ball of an ArrayWorld, as (N, 2) arrays."""
+        # NumPy is only needed for the array engine
+        import numpy as np
+        from particle_arrays import grid_candidate_pairs
+        self.steps += 1
+        xy = particles.xy
+        reach = self.cutoff + self.skin
+        if self.particleXY is None or len(self.particleXY) != len(xy) or \
+                not np.array_equal(self.ballRows, balls) or \
+                ((xy - self.particleXY)**2).sum(axis = 1).max() \
+                > (self.skin / 2)**2:
+            rows, cols = grid_candidate_pairs(ballXY, xy, reach)
+            dXY = xy[cols] - ballXY[rows]
+            near = (cols != balls[rows]) \
+                & ((dXY * dXY).sum(axis = 1) <= reach**2)
+            self.rows = rows[near]
+            self.cols = cols[near]
+            self.particleXY = xy.copy()
+            self.ballRows = balls.copy()
+            self.pairs = len(self.rows)
+            self.rebuilds += 1
+
+        rows = self.rows
+        cols = self.cols
+        dXY = xy[cols] - ballXY[rows]
+        d = np.sqrt((dXY * dXY).sum(axis = 1))
+        inverseD = np.zeros_like(d)
+        np.divide(1.0, d, out = inverseD, where = (d > 0) & (d <= self.cutoff))
+
+        gForce = np.zeros((len(balls), 2))
+        eForce = np.zeros((len(balls), 2))
+        weightG = particles.mass[cols] * inverseD
+        weightE = particles.charge[cols] * inverseD
+        for axis in range(2):
+            gForce[:, axis] = np.bincount(rows, dXY[:, axis] * weightG,
+                len(balls))
+            eForce[:, axis] = -np.bincount(rows, dXY[:, axis] * weightE,
+                len(balls))
+        gForce *= particles.mass[balls, None]
+        eForce *= particles.charge[balls, None]
+        return gForce, eForce
@@ -0,0 +1,798 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: NumPy structure-of-arrays store for balls and satellites, and a
+         world that steps all of them with batched pairwise forces.
+"""
+
+import math
+import time
+import numpy as np
+import physics_core
+
+# Bytes of scratch buffers per (target, source) pair in pairwise_forces(),
+# three float64 and two bool
+BYTES_PER_PAIR = 26
+
+def pairwise_forces(xy: np.ndarray, mass: np.ndarray, charge: np.ndarray,
+        srcXY: np.ndarray, srcMass: np.ndarray, srcCharge: np.ndarray,
+        memoryBudget: int = 2**20, cutoff: float = None) -> tuple:
+    """Gravitational and electric force on every target from every source.
+
+    Same 1/d pseudo laws as g_force() and e_force(). Pairs at zero distance,
+    such as a particle and itself, are skipped, and with cutoff so are
+    pairs further apart. Targets are processed in blocks sized so the
+    scratch buffers, allocated once and reused by every block, stay under
+    memoryBudget bytes whatever the number of sources. Buffers that fit
+    in the CPU cache are also the fastest."""
+    gForce = np.zeros((len(xy), 2))
+    eForce = np.zeros((len(xy), 2))
+    nSources = len(srcXY)
+    if len(xy) == 0 or nSources == 0:
+        return gForce, eForce
+    blockSize = max(1, min(len(xy),
+        memoryBudget // (BYTES_PER_PAIR * nSources)))
+    bufferX = np.empty((blockSize, nSources))
+    bufferY = np.empty((blockSize, nSources))
+    bufferD = np.empty((blockSize, nSources))
+    bufferPaired = np.empty((blockSize, nSources), dtype = bool)
+    if cutoff is not None:
+        bufferNear = np.empty((blockSize, nSources), dtype = bool)
+
+    for start in range(0, len(xy), blockSize):
+        stop = min(start + blockSize, len(xy))
+        blockXY = xy[start:stop]
+        dX = bufferX[:stop - start]
+        dY = bufferY[:stop - start]
+        inverseD = bufferD[:stop - start]
+        paired = bufferPaired[:stop - start]
+
+        # Squared distance from each target in the block to each source
+        np.subtract(srcXY[:, 0][None, :], blockXY[:, 0][:, None], out = dX)
+        np.subtract(srcXY[:, 1][None, :], blockXY[:, 1][:, None], out = dY)
+        np.multiply(dX, dX, out = dX)
+        np.multiply(dY, dY, out = dY)
+        np.add(dX, dY, out = inverseD)
+        np.greater(inverseD, 0, out = paired)
+        if cutoff is not None:
+            near = bufferNear[:stop - start]
+            np.less_equal(inverseD, cutoff * cutoff, out = near)
+            paired &= near
+        np.sqrt(inverseD, out = inverseD, where = paired)
+        np.divide(1.0, inverseD, out = inverseD, where = paired)
+        np.logical_not(paired, out = paired)
+        np.copyto(inverseD, 0.0, where = paired)
+
+        # Sum of m_j * (xy_j - xy_i) / d_ij as two matrix products
+        weightG = np.multiply(inverseD, srcMass[None, :], out = dX)
+        gForce[start:stop] = mass[start:stop, None] * (weightG @ srcXY
+            - blockXY * weightG.sum(axis = 1)[:, None])
+
+        # Electric force points away from sources with the same sign
+        weightE = np.multiply(inverseD, srcCharge[None, :], out = dY)
+        eForce[start:stop] = charge[start:stop, None] * (blockXY
+            * weightE.sum(axis = 1)[:, None] - weightE @ srcXY)
+    return gForce, eForce
+
+def grid_candidate_pairs(queryXY: np.ndarray, pointXY: np.ndarray,
+        cellSize: float) -> tuple:
+    """Uniform grid broad phase for many queries at once.
+
+    Returns (rows, cols) such that pointXY[cols] is in the same or an
+    adjacent cell as queryXY[rows]."""
+    cells = np.floor(pointXY / cellSize).astype(np.int64)
+    queryCells = np.floor(queryXY / cellSize).astype(np.int64)
+
+    # One integer key per cell, with room for the neighbour offsets
+    low = np.minimum(cells.min(axis = 0), queryCells.min(axis = 0)) - 1
+    height = max(cells[:, 1].max(), queryCells[:, 1].max()) - low[1] + 2
+    keys = (cells[:, 0] - low[0]) * height + (cells[:, 1] - low[1])
+    order = np.argsort(keys, kind = 'stable')
+    sortedKeys = keys[order]
+
+    rows = []
+    cols = []
+    queries = np.arange(len(queryXY))
+    for offsetX in (-1, 0, 1):
+        for offsetY in (-1, 0, 1):
+            queryKeys = (queryCells[:, 0] + offsetX - low[0]) * height \
+                + (queryCells[:, 1] + offsetY - low[1])
+            left = np.searchsorted(sortedKeys, queryKeys, 'left')
+            counts = np.searchsorted(sortedKeys, queryKeys, 'right') - left
+            total = counts.sum()
+            if total == 0:
+                continue
+            # Position of every candidate inside its cell's run
+            starts = np.repeat(np.cumsum(counts) - counts, counts)
+            within = np.arange(total) - starts
+            rows.append(np.repeat(queries, counts))
+            cols.append(order[np.repeat(left, counts) + within])
+    if not rows:
+        return np.zeros(0, dtype = np.int64), np.zeros(0, dtype = np.int64)
+    return np.concatenate(rows), np.concatenate(cols)
+
+# Columns of ParticleArrays with their width
+ARRAY_COLUMNS = {'xy': 2, 'velocity': 2, 'mass': 1, 'charge': 1,
+    'radius': 1, 'isBall': 1, 'angle': 1, 'omega': 1, 'orbitRadius': 1,
+    'centerOrbit': 2, 'acceleration': 2, 'previousLapse': 1, 'level': 1}
+
+class ParticleArrays:
+    """Contiguous arrays for every ball and satellite.
+
+    Row i belongs to objects[i]. Satellite-only columns are zero for balls.
+    Removing a row moves the last row into it, so rows stay packed."""
+    def __init__(self, capacity: int = 64):
+        self.objects = []
+        # World settings of the views, see ParticleView
+        self.settings = {}
+        self.count = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int) -> None:
+        """Grows every array to capacity rows, keeping existing rows."""
+        old = self.count
+        for name, width in ARRAY_COLUMNS.items():
+            dtype = bool if name == 'isBall' else float
+            shape = (capacity, width) if width > 1 else (capacity,)
+            array = np.zeros(shape, dtype = dtype)
+            if old > 0:
+                array[:old] = getattr(self, '_' + name)[:old]
+            setattr(self, '_' + name, array)
+        self.capacity = capacity
+        return None
+
+    def append_row(self) -> int:
+        """Reserves the next row, growing the arrays when full."""
+        if self.count == self.capacity:
+            self._allocate(2 * self.capacity)
+        self.count += 1
+        return self.count - 1
+
+    def append_rows(self, n: int) -> int:
+        """Reserves the next n rows at once and returns the first."""
+        if self.count + n > self.capacity:
+            self._allocate(max(2 * self.capacity, self.count + n))
+        self.count += n
+        return self.count - n
+
+    def remove_row(self, row: int) -> None:
+        """Frees row by moving the last row and its view into it.
+
+        The freed last row is zeroed, so it is clean when reused, and the
+        removed view is left without a row."""
+        last = self.count - 1
+        self.objects[row].row = None
+        moved = self.objects.pop()
+        for name in ARRAY_COLUMNS:
+            array = getattr(self, '_' + name)
+            if row != last:
+                array[row] = array[last]
+            array[last] = 0
+        if row != last:
+            self.objects[row] = moved
+            moved.row = row
+        self.count -= 1
+        return None
+
+    # Views trimmed to the filled rows
+    @property
+    def xy(self) -> np.ndarray:
+        return self._xy[:self.count]
+
+    @property
+    def velocity(self) -> np.ndarray:
+        return self._velocity[:self.count]
+
+    @property
+    def mass(self) -> np.ndarray:
+        return self._mass[:self.count]
+
+    @property
+    def charge(self) -> np.ndarray:
+        return self._charge[:self.count]
+
+    @property
+    def radius(self) -> np.ndarray:
+        return self._radius[:self.count]
+
+    @property
+    def isBall(self) -> np.ndarray:
+        return self._isBall[:self.count]
+
+    @property
+    def angle(self) -> np.ndarray:
+        return self._angle[:self.count]
+
+    @property
+    def omega(self) -> np.ndarray:
+        return self._omega[:self.count]
+
+    @property
+    def orbitRadius(self) -> np.ndarray:
+        return self._orbitRadius[:self.count]
+
+    @property
+    def centerOrbit(self) -> np.ndarray:
+        return self._centerOrbit[:self.count]
+
+    @property
+    def acceleration(self) -> np.ndarray:
+        return self._acceleration[:self.count]
+
+    @property
+    def previousLapse(self) -> np.ndarray:
+        return self._previousLapse[:self.count]
+
+    @property
+    def level(self) -> np.ndarray:
+        return self._level[:self.count]
+
+def _column(name: str, doc: str) -> property:
+    """Attribute stored in one ParticleArrays column at the view's row.
+
+    Two-wide columns return a NumPy row view, so xy_current[0] = x
+    writes straight into the arrays. Removed views have no row, and
+    reading or writing them raises ValueError instead of touching the
+    row of another object."""
+    def get(view):
+        if view.row is None:
+            raise ValueError(f'Removed {view.name} has no {name}')
+        return getattr(view.particles, '_' + name)[view.row]
+
+    def set(view, value):
+        if view.row is None:
+            raise ValueError(f'Removed {view.name} has no {name}')
+        getattr(view.particles, '_' + name)[view.row] = value
+    return property(get, set, doc = doc)
+
+def _setting(name: str) -> property:
+    """World setting shared by all views of one ParticleArrays."""
+    def get(view):
+        return view.particles.settings.get(name,
+            physics_core.WORLD_SETTINGS[name])
+
+    def set(view, value):
+        view.particles.settings[name] = value
+    return property(get, set)
+
+class ParticleView(physics_core.PhysicalProperty,
+        physics_core.KineticStatus):
+    """A ball or satellite that lives in one row of ParticleArrays.
+
+    Has the attribute names of Ball and Satellite but no lists and no
+    per-instance dict. Row views of vectors move with the arrays, so do
+    not keep them across adding objects.
+
+    A ball takes about 390 bytes: 130 in the arrays, 72 for the view and
+    the rest for its row, ids and registry entries. That is under a third
+    of a ball with a dict, not a tenth, because every ball keeps a view
+    and a registry entry so objects, menus and scenes work unchanged."""
+    __slots__ = ('particles', 'row', 'objectId', 'kindIndex', 'sourceIndex')
+
+    xy_current = _column('xy', 'Position.')
+    # The arrays hold finished steps only, next and current are the same
+    XY_next = xy_current
+    velocity0 = _column('velocity', 'Velocity.')
+    velocity1 = velocity0
+    mass = _column('mass', 'Mass.')
+    charge = _column('charge', 'Charge.')
+    radius = _column('radius', 'Radius.')
+    acceleration = _column('acceleration', 'Acceleration of the last step.')
+    previousLapse = _column('previousLapse', 'Time lapse of the last step.')
+
+    # World settings are the same for every row, so they are kept once
+    forceSolver = _setting('forceSolver')
+    collisionGrid = _setting('collisionGrid')
+    fieldSampler = _setting('fieldSampler')
+    profiler = _setting('profiler')
+    integrator = _setting('integrator')
+    collisionEvents = _setting('collisionEvents')
+    updateOrder = _setting('updateOrder')
+    diagnostics = _setting('diagnostics')
+
+    def __init__(self, particles: "ParticleArrays", xy_current: list,
+            radius: float, mass: float, charge: float, isBall: bool):
+        self.particles = particles
+        self.fill_row(xy_current, radius, mass, charge, isBall)
+        self.objectId = None
+        self.init_shape()
+
+    def fill_row(self, xy_current: list, radius: float, mass: float,
+            charge: float, isBall: bool) -> None:
+        """Takes the next row of the arrays and fills it, at rest."""
+        particles = self.particles
+        self.row = particles.append_row()
+        particles.objects.append(self)
+        particles._isBall[self.row] = isBall
+        self.xy_current = xy_current
+        self.velocity0 = 0
+        self.radius = radius
+        self.mass = mass
+        self.charge = charge
+        self.acceleration = 0
+        self.previousLapse = 0
+        return None
+
+    @classmethod
+    def of_row(cls, particles: "ParticleArrays", row: int) -> "ParticleView":
+        """View of a row that is already filled, for adding in bulk."""
+        view = cls.__new__(cls)
+        view.particles = particles
+        view.row = row
+        view.objectId = None
+        view.init_shape()
+        return view
+
+    def init_shape(self) -> None:
+        """Sets up drawing state, nothing to draw in the physics core."""
+        return None
+
+    def hide_shape(self) -> None:
+        """Nothing to hide in the physics core."""
+        return None
+
+    def shape_state(self) -> tuple:
+        """What the circle needs to be drawn: x, y, radius and color."""
+        x, y = self.xy_current.tolist()
+        return (x, y, float(self.radius), self.chargeColor)
+
+    def sync_shape(self, threshold: float = 0, state: tuple = None) -> bool:
+        """Nothing to draw in the physics core."""
+        return False
+
+class BallView(ParticleView):
+    """Ball stored in ParticleArrays."""
+    __slots__ = ()
+    name = 'Ball'
+
+    def __init__(self, particles: "ParticleArrays", xy_current: list,
+            radius: float, mass: float, charge: float):
+        ParticleView.__init__(self, particles, xy_current, radius, mass,
+            charge, True)
+
+class SatelliteView(ParticleView):
+    """Satellite stored in ParticleArrays, orbiting centerOrbit."""
+    __slots__ = ()
+    name = 'Satellite'
+
+    omega = _column('omega', 'Angular speed in rad / sec.')
+    angle = _column('angle', 'Orbital angle in rad.')
+    orbitRadius = _column('orbitRadius', 'Orbit radius.')
+    centerOrbit = _column('centerOrbit', 'Orbit center.')
+
+    def __init__(self, particles: "ParticleArrays", centerOrbit: list,
+            radius: float, mass: float, charge: float, omega: float,
+            orbitRadius: float, angle: float):
+        ParticleView.__init__(self, particles, [centerOrbit[0]
+            + orbitRadius * math.cos(angle), centerOrbit[1] + orbitRadius
+            * math.sin(angle)], radius, mass, charge, False)
+        self.omega = omega
+        self.angle = angle
+        self.orbitRadius = orbitRadius
+        self.centerOrbit = centerOrbit
+
+def boundary_collision(boundary: physics_core.Boundary, xy: np.ndarray,
+        velocity: np.ndarray, radius: np.ndarray, timeLapse) -> tuple:
+    """Vectorized Boundary.collision() for many balls at once.
+
+    timeLapse is one float or an (N, 1) array with one per ball."""
+    timeLapse = np.broadcast_to(timeLapse, (len(xy), 1))
+    low = np.array(boundary.xy1, dtype = float)
+    high = np.array(boundary.xy2, dtype = float)
+    reflectVelocity = velocity.copy()
+    XY_next = xy.copy()
+
+    # Same wall order as Boundary.collision(), a later wall wins
+    for axis in range(2):
+        flipped = velocity.copy()
+        flipped[:, axis] = -flipped[:, axis]
+        walls = [(xy[:, axis] - low[axis] < radius, low[axis] + radius),
+            (high[axis] - xy[:, axis] < radius, high[axis] - radius)]
+        for hit, wall in walls:
+            reflectVelocity[hit] = flipped[hit]
+            XY_next[hit, axis] = wall[hit]
+            XY_next[hit] += reflectVelocity[hit] * timeLapse[hit]
+
+    # All the objects should stay inside the boundary
+    XY_next = np.clip(XY_next, low + radius[:, None], high - radius[:, None])
+    return XY_next, reflectVelocity
+
+class ArrayWorld(physics_core.World):
+    """World that steps balls and satellites as NumPy arrays.
+
+    Forces come from one batched pairwise computation per step instead of
+    per-object loops. Balls and satellites are views into the arrays.
+    Balls always step two-phase, whatever the update order: every ball
+    moves from the positions the balls had at the start of the step.
+    Satellites follow their orbits first."""
+    satelliteClass = SatelliteView
+    ballClass = BallView
+
+    def __init__(self, xy1: list, xy2: list, clock = time.time):
+        physics_core.World.__init__(self, xy1, xy2, clock)
+        self.particles = ParticleArrays()
+        self.timeStamp = physics_core.TimeStamp(clock)
+        # Imported here, field_sampling itself imports this module
+        import field_sampling
+        self.meterSampler = field_sampling.FieldSampler()
+
+    def add_satellite(self, radius: float, mass: float, charge: float,
+            omega: float, orbitRadius: float, angle: float) -> SatelliteView:
+        """Adds a satellite orbiting the playground center."""
+        satellite = self.satelliteClass(self.particles,
+            self.centerPlayground, radius, mass, charge, omega, orbitRadius,
+            angle)
+        return self.add_object(satellite)
+
+    def add_ball(self, xy_current: list, radius: float, mass: float,
+            charge: float) -> BallView:
+        """Adds a free-moving ball."""
+        ball = self.ballClass(self.particles, xy_current, radius, mass,
+            charge)
+        return self.add_object(ball)
+
+    def remove_object(self, obj) -> None:
+        """Takes obj out of the world and frees its row of the arrays.
+
+        The last row moves into the gap, with its view. obj keeps no row
+        until respawn_ball() gives it a new one."""
+        self.particles.remove_row(obj.row)
+        physics_core.World.remove_object(self, obj)
+        return None
+
+    def respawn_ball(self, ball: BallView, xy_current: list, radius: float,
+            mass: float, charge: float) -> BallView:
+        """Adds a removed ball back in a new row, see World.respawn_ball()."""
+        ball.fill_row(xy_current, radius, mass, charge, True)
+        return self.add_object(ball)
+
+    def add_rows(self, viewClass: type, n: int, columns: dict) -> list:
+        """Fills n new rows from columns and adds a view of each.
+
+        columns maps ParticleArrays column names to one value or one per
+        row. Views share their world settings through the arrays, so they
+        are copied onto the first view only."""
+        particles = self.particles
+        start = particles.append_rows(n)
+        rows = slice(start, start + n)
+        particles._isBall[rows] = viewClass.name == 'Ball'
+        for name, values in columns.items():
+            getattr(particles, '_' + name)[rows] = values
+        views = [viewClass.of_row(particles, row)
+            for row in range(start, start + n)]
+        particles.objects.extend(views)
+        if views:
+            for name, value in self.objectSettings.items():
+                setattr(views[0], name, value)
+        for view in views:
+            self.objs.add(view)
+        return views
+
+    def add_balls(self, xy, radius, mass, charge, velocity = None) -> list:
+        """Adds one ball per row of xy in one pass, see World.add_balls()."""
+        xy = np.asarray(xy, dtype = float).reshape(-1, 2)
+        columns = {'xy': xy, 'radius': radius, 'mass': mass,
+            'charge': charge}
+        if velocity is not None:
+            columns['velocity'] = velocity
+        return self.add_rows(self.ballClass, len(xy), columns)
+
+    def add_satellites(self, radius, mass, charge, omega, orbitRadius,
+            angle) -> list:
+        """Adds one satellite per value in one pass, see add_balls()."""
+        angle = np.asarray(angle, dtype = float).reshape(-1)
+        orbitRadius = np.broadcast_to(np.asarray(orbitRadius, dtype = float),
+            angle.shape)
+        center = np.array(self.centerPlayground, dtype = float)
+        xy = center + orbitRadius[:, None] * np.stack([np.cos(angle),
+            np.sin(angle)], axis = 1)
+        return self.add_rows(self.satelliteClass, len(angle), {'xy': xy,
+            'radius': radius, 'mass': mass, 'charge': charge,
+            'omega': omega, 'orbitRadius': orbitRadius, 'angle': angle,
+            'centerOrbit': center})
+
+    def step(self, dt: float = None) -> None:
+        """Moves every ball and satellite, then the other objects.
+
+        Field meters are filled here, drawing is left to RenderSync."""
+        if dt is not None and self.blockTimesteps is not None:
+            self.step_blocks(dt)
+        else:
+            if dt is not None:
+                self.clock.advance(dt)
+            self.step_particles(self.timeStamp.time_lapse())
+            self.step_others()
+        if self.diagnostics is not None:
+            self.diagnostics.after_step(self)
+        return None
+
+    def step_others(self) -> None:
+        """Fills the field meters and steps the other objects."""
+        prof = self.profiler
+        if prof is not None:
+            start = prof.clock()
+        # Meters always come from the arrays, the views are slow to loop over
+        sampler = self.fieldSampler
+        if sampler is None:
+            sampler = self.meterSampler
+        sampler.prepare(self.objs, self.particles)
+        sampler.update_meters()
+        if prof is not None:
+            start = prof.lap('World prepare', start)
+
+        registry = self.objs
+        for objects in (registry.boundaries, registry.others):
+            for obj in objects:
+                obj.movement(registry)
+                obj.update(registry)
+                if prof is not None:
+                    start = prof.lap(obj.name + ' update', start)
+        return None
+
+    def step_blocks(self, dt: float) -> None:
+        """Step of dt with block timesteps, see BlockTimesteps.
+
+        The level of every ball is kept in the level column. Balls that
+        are not due act as sources at their last positions, a first order
+        error."""
+        blocks = self.blockTimesteps
+        p = self.particles
+        substeps = 1 << blocks.maxLevel
+        balls = np.flatnonzero(p.isBall)
+        levels = p.level[balls].astype(np.int64)
+        pending = 0
+        for substep in range(1, substeps + 1):
+            pending += dt / substeps
+            due = substep % (substeps >> levels) == 0
+            last = substep == substeps
+            if not due.any() and not last:
+                continue
+            self.clock.advance(pending)
+            pending = 0
+
+            active = balls[due]
+            before = p.acceleration[active]
+            hadLapse = p.previousLapse[active] > 0
+            self.step_particles(self.timeStamp.time_lapse(), active,
+                dt / (1 << levels[due]))
+
+            # Acceleration and jerk after the move pick the next level
+            acceleration = np.hypot(p.acceleration[active, 0],
+                p.acceleration[active, 1])
+            jerk = np.hypot(*(p.acceleration[active] - before).T) \
+                / np.maximum(p.previousLapse[active], 1e-12)
+            wanted = np.maximum(blocks.levels_for(acceleration, jerk, dt),
+                blocks.coarsest_level(substep))
+            levels[due] = np.where(hadLapse, wanted, levels[due])
+            blocks.forceEvaluations += len(active)
+            blocks.substeps += 1
+        p.level[balls] = levels
+        blocks.simulatedTime += dt
+        self.step_others()
+        return None
+
+    def ball_forces(self, ballXY: np.ndarray, balls: np.ndarray) -> tuple:
+        """Forces on the balls from every ball and satellite."""
+        p = self.particles
+        if self.forceSolver is not None:
+            return self.solver_forces(ballXY, balls)
+        return pairwise_forces(ballXY, p.mass[balls], p.charge[balls], p.xy,
+            p.mass, p.charge)
+
+    def solver_forces(self, ballXY: np.ndarray, balls: np.ndarray) -> tuple:
+        """Forces on the balls from a solver such as Barnes-Hut.
+
+        Solvers with particle_forces() work on the arrays directly."""
+        p = self.particles
+        if hasattr(self.forceSolver, 'particle_forces'):
+            return self.forceSolver.particle_forces(p, ballXY, balls,
+                self.boundary)
+        bodies = list(zip(range(p.count), p.xy[:, 0].tolist(),
+            p.xy[:, 1].tolist(), p.mass.tolist(), p.charge.tolist()))
+        self.forceSolver.build(bodies, self.boundary.xy1, self.boundary.xy2)
+
+        gForce = np.zeros((len(balls), 2))
+        eForce = np.zeros((len(balls), 2))
+        for k, i in enumerate(balls.tolist()):
+            gForce[k], eForce[k] = self.forceSolver.forces_at(ballXY[k, 0],
+                ballXY[k, 1], p.mass[i], p.charge[i], i)
+        return gForce, eForce
+
+    def step_particles(self, t: float, balls: np.ndarray = None,
+            ballLapse: np.ndarray = None) -> None:
+        """Advances the arrays by t seconds.
+
+        With balls, only those rows move, each by its own ballLapse.
+        Satellites always move by t."""
+        p = self.particles
+        if p.count == 0:
+            return None
+        prof = self.profiler
+        if prof is not None:
+            start = prof.clock()
+        if balls is None:
+            balls = np.flatnonzero(p.isBall)
+            ballLapse = np.full(len(balls), t)
+        lapse = ballLapse[:, None]
+        satellites = np.flatnonzero(~p.isBall)
+        if self.collisionEvents is not None:
+            startXY = p.xy.copy()
+
+        # Satellites first, they follow their circular orbit
+        p.angle[satellites] += t * p.omega[satellites]
+        p.xy[satellites, 0] = p.centerOrbit[satellites, 0] \
+            + p.orbitRadius[satellites] * np.cos(p.angle[satellites])
+        p.xy[satellites, 1] = p.centerOrbit[satellites, 1] \
+            + p.orbitRadius[satellites] * np.sin(p.angle[satellites])
+        if len(balls) == 0:
+            return None
+
+        ballXY = p.xy[balls]
+        gForce, eForce = self.ball_forces(ballXY, balls)
+        if prof is not None:
+            start = prof.lap('Particles force', start)
+        acceleration = (gForce + eForce) / p.mass[balls, None]
+        if self.integrator == 'verlet':
+            # Same velocity Verlet update as Ball.movement()
+            velocity0 = p.velocity[balls] + (acceleration
+                - p.acceleration[balls]) * p.previousLapse[balls, None] / 2
+            XY_next = ballXY + velocity0 * lapse \
+                + acceleration * lapse * lapse / 2
+            velocity1 = velocity0 + acceleration * lapse
+        else:
+            # Euler step from the summed forces
+            velocity0 = p.velocity[balls]
+            velocity1 = velocity0 + acceleration * lapse
+            XY_next = ballXY + velocity1 * lapse
+        p.acceleration[balls] = acceleration
+        p.previousLapse[balls] = ballLapse
+
+        if self.collisionEvents is not None:
+            XY_next, velocity1 = self.event_collisions(startXY, XY_next,
+                velocity1, balls, t)
+            p.xy[balls] = XY_next
+            p.velocity[balls] = velocity1
+            if self.diagnostics is not None:
+                self.diagnostics.collisions += self.collisionEvents.collisions
+                self.diagnostics.wallBounces += \
+                    self.collisionEvents.wallBounces
+            if prof is not None:
+                prof.count('Collision events', self.collisionEvents.events)
+                prof.lap('Collision events', start)
+            return None
+
+        # Ball-ball and ball-satellite collisions, last partner wins
+        partner = self.collision_partners(XY_next, balls)
+        hit = partner >= 0
+        if hit.any():
+            other = partner[hit]
+            massSelf = p.mass[balls[hit]]
+            massOther = p.mass[other]
+            massSum = massSelf + massOther
+            velocity1[hit] = ((massSelf - massOther) / massSum)[:, None] \
+                * velocity0[hit] + (2 * massOther / massSum)[:, None] \
+                * p.velocity[other]
+            XY_next[hit] = ballXY[hit] + velocity1[hit] * lapse[hit]
+        if prof is not None:
+            start = prof.lap('Particles collision', start)
+            prof.count('Ball collisions', int(hit.sum()))
+
+        XY_next, reflectVelocity = boundary_collision(self.boundary, XY_next,
+            velocity1, p.radius[balls], lapse)
+        if self.diagnostics is not None:
+            self.diagnostics.collisions += int(hit.sum())
+            self.diagnostics.wallBounces += int((reflectVelocity
+                != velocity1).any(axis = 1).sum())
+        velocity1 = reflectVelocity
+        p.xy[balls] = XY_next
+        p.velocity[balls] = velocity1
+        if prof is not None:
+            prof.lap('Particles boundary', start)
+        return None
+
+    def event_collisions(self, startXY: np.ndarray, XY_next: np.ndarray,
+            velocity1: np.ndarray, balls: np.ndarray, t: float) -> tuple:
+        """Bounces the ball paths at their exact collision times.
+
+        startXY are the positions before this step, satellites have
+        already moved to theirs at the end of it."""
+        p = self.particles
+        endXY = p.xy.copy()
+        endXY[balls] = XY_next
+        endVelocity = p.velocity.copy()
+        endVelocity[balls] = velocity1
+        boxes = [(obj.xy1[0], obj.xy1[1], obj.xy2[0], obj.xy2[1])
+            for obj in self.objs.boundaries]
+        changed = self.collisionEvents.resolve(startXY.tolist(),
+            endXY.tolist(), p.radius.tolist(), p.mass.tolist(),
+            p.isBall.tolist(), boxes, t, endVelocity.tolist())
+        if changed:
+            # Rows of the balls in XY_next and velocity1
+            position = np.full(p.count, -1)
+            position[balls] = np.arange(len(balls))
+            for i, (xy, velocity) in changed.items():
+                XY_next[position[i]] = xy
+                velocity1[position[i]] = velocity
+        return XY_next, velocity1
+
+    def collision_partners(self, XY_next: np.ndarray, balls: np.ndarray,
+            memoryBudget: int = 2**20) -> np.ndarray:
+        """Index of the last particle each ball overlaps, or -1.
+
+        Without a collision grid balls are checked in blocks, sized so
+        the temporaries stay under memoryBudget bytes."""
+        p = self.particles
+        if self.collisionGrid is not None:
+            return self.grid_collision_partners(XY_next, balls)
+        partner = np.full(len(balls), -1)
+        # About five float64 temporaries per (ball, particle) pair
+        blockSize = max(1, memoryBudget // (40 * max(p.count, 1)))
+        for start in range(0, len(balls), blockSize):
+            stop = min(start + blockSize, len(balls))
+            dX = XY_next[start:stop, 0][:, None] - p.xy[:, 0][None, :]
+            dY = XY_next[start:stop, 1][:, None] - p.xy[:, 1][None, :]
+            radiusSum = p.radius[balls[start:stop], None] + p.radius[None, :]
+            # Squared distances avoid a square root per pair
+            overlap = dX * dX + dY * dY < radiusSum * radiusSum
+            # A ball never collides with itself
+            overlap[np.arange(stop - start), balls[start:stop]] = False
+            last = p.count - 1 - np.argmax(overlap[:, ::-1], axis = 1)
+            partner[start:stop] = np.where(overlap.any(axis = 1), last, -1)
+        return partner
+
+    def grid_collision_partners(self, XY_next: np.ndarray,
+            balls: np.ndarray) -> np.ndarray:
+        """collision_partners() with the collision grid as broad phase.
+
+        The cells are sized for the balls. Bodies too big for them, like
+        satellites among many small balls, are checked against every
+        ball directly instead of making every cell crowded."""
+        p = self.particles
+        grid = self.collisionGrid
+        grid.maxRadius = float(p.radius.max())
+        if grid.fixedCellSize is not None:
+            grid.cellSize = grid.fixedCellSize
+        else:
+            grid.cellSize = max(2 * float(p.radius[balls].max()), 1)
+        big = 2 * p.radius > grid.cellSize
+        small = np.flatnonzero(~big)
+
+        partner = np.full(len(balls), -1)
+        candidatePairs = 0
+        if len(small) > 0:
+            rows, cols = grid_candidate_pairs(XY_next, p.xy[small],
+                grid.cellSize)
+            cols = small[cols]
+            notSelf = cols != balls[rows]
+            rows = rows[notSelf]
+            cols = cols[notSelf]
+            candidatePairs += len(rows)
+
+            # Narrow phase on the candidates only
+            dXY = XY_next[rows] - p.xy[cols]
+            radiusSum = p.radius[balls[rows]] + p.radius[cols]
+            hit = (dXY * dXY).sum(axis = 1) < radiusSum * radiusSum
+            np.maximum.at(partner, rows[hit], cols[hit])
+
+        # Every ball against each big body
+        ballRadius = p.radius[balls]
+        for other in np.flatnonzero(big).tolist():
+            dXY = XY_next - p.xy[other]
+            radiusSum = ballRadius + p.radius[other]
+            hit = ((dXY * dXY).sum(axis = 1) < radiusSum * radiusSum) \
+                & (balls != other)
+            partner[hit] = np.maximum(partner[hit], other)
+            candidatePairs += len(balls)
+        # Big balls against every body, the grid misses their far pairs
+        for row in np.flatnonzero(big[balls]).tolist():
+            dXY = p.xy - XY_next[row]
+            radiusSum = p.radius + ballRadius[row]
+            hit = (dXY * dXY).sum(axis = 1) < radiusSum * radiusSum
+            hit[balls[row]] = False
+            if hit.any():
+                partner[row] = max(partner[row], int(hit.nonzero()[0][-1]))
+            candidatePairs += p.count
+        grid.bodies = p.count
+        grid.queries = len(balls)
+        grid.candidatePairs = candidatePairs
+        return partner
@@ -0,0 +1,261 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Particle-mesh solver for the gravitational and electric pseudo
+         forces. Mass and charge are spread onto a mesh over the boundary
+         box and convolved with the 1/d kernel by FFT, so a step costs
+         O(N + M log M) for N bodies on M mesh nodes.
+"""
+
+import numpy as np
+from field_sampling import FieldSampler
+from particle_arrays import grid_candidate_pairs
+from physics_core import objects_of_kind
+
+def unit_kernel(nX: int, nY: int, cellX: float, cellY: float) -> tuple:
+    """Unit vectors r / |r| for every node offset r, 0 at r = 0.
+
+    The arrays are 2 nX x 2 nY, negative offsets wrap around, so an FFT
+    product gives the free-space convolution of an nX x nY mesh."""
+    offsetX = np.arange(2 * nX)
+    offsetX = np.where(offsetX < nX, offsetX, offsetX - 2 * nX) * cellX
+    offsetY = np.arange(2 * nY)
+    offsetY = np.where(offsetY < nY, offsetY, offsetY - 2 * nY) * cellY
+    dX, dY = np.meshgrid(offsetX, offsetY, indexing = 'ij')
+    d = np.sqrt(dX * dX + dY * dY)
+    unitX = np.divide(dX, d, out = np.zeros_like(d), where = d > 0)
+    unitY = np.divide(dY, d, out = np.zeros_like(d), where = d > 0)
+    return unitX, unitY
+
+class SolvedMesh:
+    """Everything one solve() leaves for reading the field back.
+
+    The sources with their cloud-in-cell nodes, the mesh box and the
+    field per unit mass and charge at every node. A mesh is never changed
+    once published, so another thread can read it while the next one is
+    being solved."""
+    def __init__(self, resolution: int, origin: np.ndarray,
+            cell: np.ndarray, unitX: np.ndarray, unitY: np.ndarray,
+            srcXY: np.ndarray, srcMass: np.ndarray, srcCharge: np.ndarray):
+        self.resolution = resolution
+        self.origin = origin
+        self.cell = cell
+        self.unitX = unitX
+        self.unitY = unitY
+        self.srcXY = srcXY
+        self.srcMass = srcMass
+        self.srcCharge = srcCharge
+        self.srcNodes = None
+        self.gNodes = None
+        self.eNodes = None
+
+class MeshSolver:
+    """Approximates g_force() and e_force() on a mesh.
+
+    The force of the 1/d laws has the same size at any distance, so the
+    field at a point is a sum of unit vectors weighted by mass or charge.
+    Bodies are spread onto the mesh nodes with cloud-in-cell weights, the
+    sum is one FFT convolution per component, and forces are read back
+    with the same weights. resolution is the number of nodes per side.
+    With shortRange > 0, pairs closer than shortRange pixels are summed
+    exactly instead of through the mesh. Set with World.set_force_solver().
+    Each solve() builds a new SolvedMesh and swaps it in with a single
+    assignment, so the field can be sampled from another thread.
+    """
+    def __init__(self, resolution: int = 64, shortRange: float = 0):
+        self.resolution = resolution
+        self.shortRange = shortRange
+        self.kernelKey = None
+        self.forcesOf = {}
+        # Mesh of the last solve(), None before the first
+        self.mesh = None
+
+        # Counters for the last step
+        self.bodies = 0
+        self.shortRangePairs = 0
+
+    def stats(self) -> dict:
+        """Mesh size, bodies and short-range pairs of the last step."""
+        return {'resolution': self.resolution, 'bodies': self.bodies,
+            'shortRangePairs': self.shortRangePairs}
+
+    def prepare(self, objects: list, boundary: "Boundary") -> None:
+        """Solves the mesh and the forces on every ball and meter."""
+        bodies = objects_of_kind(objects, 'sources')
+        xy = np.array([obj.xy_current for obj in bodies],
+            dtype = float).reshape(-1, 2)
+        mass = np.array([obj.mass for obj in bodies], dtype = float)
+        charge = np.array([obj.charge for obj in bodies], dtype = float)
+        self.solve(xy, mass, charge, boundary.xy1, boundary.xy2)
+
+        # Balls feel every source but themselves, meters feel them all
+        balls = [i for i, obj in enumerate(bodies) if obj.name == 'Ball']
+        meters = objects_of_kind(objects, 'meters')
+        points = np.concatenate([xy[balls], np.array([obj.xy_current
+            for obj in meters], dtype = float).reshape(-1, 2)])
+        pointSource = np.array(balls + [-1] * len(meters), dtype = np.int64)
+        gField, eField = self.fields_at(points, pointSource)
+
+        self.forcesOf = {}
+        targets = [bodies[i] for i in balls] + list(meters)
+        for obj, g, e in zip(targets, gField.tolist(), eField.tolist()):
+            self.forcesOf[id(obj)] = ([obj.mass * g[0], obj.mass * g[1]],
+                [obj.charge * e[0], obj.charge * e[1]])
+        return None
+
+    def forces(self, obj: "Ball | PointForceField") -> tuple:
+        """Gravity and electric force on obj from the last prepare()."""
+        if id(obj) in self.forcesOf:
+            return self.forcesOf[id(obj)]
+        # Added since prepare(), read the mesh without short-range terms
+        gField, eField = self.fields_at(np.array([obj.xy_current],
+            dtype = float), np.array([-1]))
+        return ([obj.mass * gField[0, 0], obj.mass * gField[0, 1]],
+            [obj.charge * eField[0, 0], obj.charge * eField[0, 1]])
+
+    def particle_forces(self, particles: "ParticleArrays",
+            ballXY: np.ndarray, balls: np.ndarray,
+            boundary: "Boundary") -> tuple:
+        """Forces on every ball of an ArrayWorld, as (N, 2) arrays."""
+        self.solve(particles.xy, particles.mass, particles.charge,
+            boundary.xy1, boundary.xy2)
+        gField, eField = self.fields_at(ballXY, balls)
+        return particles.mass[balls, None] * gField, \
+            particles.charge[balls, None] * eField
+
+    def cell_weights(self, xy: np.ndarray, mesh: SolvedMesh) -> tuple:
+        """Cloud-in-cell nodes and weights, both (N, 4), of points xy."""
+        n = mesh.resolution
+        position = (xy - mesh.origin) / mesh.cell
+        # Points outside the box use the nearest edge cell
+        position = np.clip(position, 0, n - 1)
+        corner = np.minimum(position.astype(np.int64), n - 2)
+        fraction = position - corner
+        nodeX = corner[:, 0, None] + np.array([0, 1, 0, 1])[None, :]
+        nodeY = corner[:, 1, None] + np.array([0, 0, 1, 1])[None, :]
+        weightX = np.stack([1 - fraction[:, 0], fraction[:, 0]], axis = 1)
+        weightY = np.stack([1 - fraction[:, 1], fraction[:, 1]], axis = 1)
+        weights = weightX[:, [0, 1, 0, 1]] * weightY[:, [0, 0, 1, 1]]
+        return nodeX, nodeY, weights
+
+    def solve(self, xy: np.ndarray, mass: np.ndarray, charge: np.ndarray,
+            xy1: list, xy2: list) -> None:
+        """Deposits the sources and convolves them with the kernel.
+
+        The new mesh is built aside and published once complete."""
+        n = self.resolution
+        origin = np.array(xy1, dtype = float)
+        cell = (np.array(xy2, dtype = float) - origin) / (n - 1)
+        key = (n, cell[0], cell[1])
+        if key != self.kernelKey:
+            self.kernelKey = key
+            self.unitX, self.unitY = unit_kernel(n, n, cell[0], cell[1])
+            self.unitHat = [np.fft.rfft2(self.unitX),
+                np.fft.rfft2(self.unitY)]
+
+        # Copies, the arrays of an ArrayWorld change during the step
+        mesh = SolvedMesh(n, origin, cell, self.unitX, self.unitY,
+            xy.copy(), mass.copy(), charge.copy())
+        self.bodies = len(xy)
+        nodeX, nodeY, weights = self.cell_weights(xy, mesh)
+        mesh.srcNodes = (nodeX, nodeY, weights)
+        index = (nodeX * n + nodeY).ravel()
+
+        # Field per unit mass and charge at every node
+        gNodes = []
+        eNodes = []
+        for values, fields, sign in ((mass, gNodes, -1),
+                (charge, eNodes, 1)):
+            density = np.bincount(index, (weights * values[:, None]).ravel(),
+                n * n).reshape(n, n)
+            densityHat = np.fft.rfft2(density, s = (2 * n, 2 * n))
+            for kernelHat in self.unitHat:
+                field = np.fft.irfft2(densityHat * kernelHat,
+                    s = (2 * n, 2 * n))[:n, :n]
+                fields.append(sign * field)
+        mesh.gNodes = gNodes
+        mesh.eNodes = eNodes
+        self.mesh = mesh
+        return None
+
+    def fields_at(self, points: np.ndarray, pointSource: np.ndarray) -> tuple:
+        """Gravity and electric field per unit mass and charge at points.
+
+        pointSource is the source row of each point, or -1, so a body
+        never adds an exact term for itself. Its own mesh term cancels.
+        The mesh is read once, so a solve() on another thread cannot mix
+        two meshes. Before the first solve() the field is zero."""
+        mesh = self.mesh
+        gField = np.zeros((len(points), 2))
+        eField = np.zeros((len(points), 2))
+        if mesh is None:
+            return gField, eField
+        nodeX, nodeY, weights = self.cell_weights(points, mesh)
+        for axis in range(2):
+            gField[:, axis] = (mesh.gNodes[axis][nodeX, nodeY]
+                * weights).sum(axis = 1)
+            eField[:, axis] = (mesh.eNodes[axis][nodeX, nodeY]
+                * weights).sum(axis = 1)
+        self.shortRangePairs = 0
+        if self.shortRange > 0 and len(points) and len(mesh.srcXY):
+            self.short_range(mesh, points, pointSource,
+                (nodeX, nodeY, weights), gField, eField)
+        return gField, eField
+
+    def short_range(self, mesh: SolvedMesh, points: np.ndarray,
+            pointSource: np.ndarray, pointNodes: tuple, gField: np.ndarray,
+            eField: np.ndarray) -> None:
+        """Swaps the mesh term of close pairs for the exact unit vector."""
+        rows, cols = grid_candidate_pairs(points, mesh.srcXY,
+            self.shortRange)
+        dXY = mesh.srcXY[cols] - points[rows]
+        d2 = (dXY * dXY).sum(axis = 1)
+        near = (cols != pointSource[rows]) \
+            & (d2 < self.shortRange * self.shortRange)
+        rows, cols, dXY, d2 = rows[near], cols[near], dXY[near], d2[near]
+        self.shortRangePairs = len(rows)
+        if len(rows) == 0:
+            return None
+
+        # Exact unit vector from each point to its source
+        d = np.sqrt(d2)
+        exact = np.divide(dXY, d[:, None], out = np.zeros_like(dXY),
+            where = d[:, None] > 0)
+
+        # What the mesh gave for the same pair, node weights times kernel
+        size = 2 * mesh.resolution
+        nodeX, nodeY, weights = pointNodes
+        srcX, srcY, srcWeights = mesh.srcNodes
+        offsetX = (srcX[cols][:, None, :] - nodeX[rows][:, :, None]) % size
+        offsetY = (srcY[cols][:, None, :] - nodeY[rows][:, :, None]) % size
+        pairWeights = weights[rows][:, :, None] * srcWeights[cols][:, None, :]
+        meshTerm = np.stack([(mesh.unitX[offsetX, offsetY]
+            * pairWeights).sum(axis = (1, 2)), (mesh.unitY[offsetX, offsetY]
+            * pairWeights).sum(axis = (1, 2))], axis = 1)
+
+        correction = exact - meshTerm
+        for axis in range(2):
+            gField[:, axis] += np.bincount(rows, correction[:, axis]
+                * mesh.srcMass[cols], len(points))
+            eField[:, axis] -= np.bincount(rows, correction[:, axis]
+                * mesh.srcCharge[cols], len(points))
+        return None
+
+    def sample_field(self, points: np.ndarray) -> tuple:
+        """Field at an (M, 2) array of points from the last solve()."""
+        points = np.asarray(points, dtype = float).reshape(-1, 2)
+        return self.fields_at(points, np.full(len(points), -1))
+
+class MeshFieldSampler(FieldSampler):
+    """Fills the field meters from a MeshSolver's mesh.
+
+    Set with World.set_field_sampler() next to the solver, the meters
+    then cost one interpolation each. In the array engine the mesh is
+    the one the balls used, from the start of the step."""
+    def __init__(self, solver: MeshSolver):
+        FieldSampler.__init__(self)
+        self.solver = solver
+
+    def sample_field(self, points: np.ndarray) -> tuple:
+        """Field at an (M, 2) array of points from the solver's mesh."""
+        return self.solver.sample_field(points)
@@ -0,0 +1,1220 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Graphics-free physics core for the satellite and ball simulation.
+         Imported by lab01_final.py for drawing, or used on its own to step
+         the physics in batch jobs and tests with run_headless().
+"""
+
+import time
+import math
+
+def dist(xy1: float, xy2: float) -> float:
+    """Calculate distance between two points."""
+    return math.sqrt((xy1[0] - xy2[0])**2 + (xy1[1] - xy2[1])**2)
+
+def as_list(values) -> list:
+    """values as a plain list, NumPy arrays included."""
+    if hasattr(values, 'tolist'):
+        return values.tolist()
+    return list(values)
+
+class SimulationClock:
+    """Deterministic clock for headless runs.
+
+    Stands in for time.time() so every object sees the same time lapse."""
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, dt: float) -> float:
+        """Move the clock forward by dt seconds."""
+        self.now += dt
+        return self.now
+
+# Registry collection that holds each object name
+OBJECT_KINDS = {'Boundary': 'boundaries', 'Field': 'meters',
+    'Satellite': 'satellites', 'Ball': 'balls'}
+
+class ObjectRegistry:
+    """World objects kept in one dense list per kind.
+
+    Every object gets a stable integer objectId. Balls and satellites
+    are also kept together in sources, the list the force and collision
+    loops walk. Objects store their own list positions in kindIndex and
+    sourceIndex, so add and remove are O(1). remove swaps the last object
+    of each list into the gap, so order is only kept until a removal."""
+    def __init__(self):
+        self.boundaries = []
+        self.meters = []
+        self.satellites = []
+        self.balls = []
+        self.sources = []
+        self.others = []
+        self.byId = {}
+        self.nextId = 0
+
+    def add(self, obj) -> int:
+        """Adds obj, gives it an objectId and returns the id."""
+        obj.objectId = self.nextId
+        self.nextId += 1
+        self.byId[obj.objectId] = obj
+        kind = OBJECT_KINDS.get(obj.name, 'others')
+        collection = getattr(self, kind)
+        obj.kindIndex = len(collection)
+        collection.append(obj)
+        if kind == 'balls' or kind == 'satellites':
+            obj.sourceIndex = len(self.sources)
+            self.sources.append(obj)
+        return obj.objectId
+
+    def remove(self, obj) -> None:
+        """Removes obj by moving the last object of each list into its slot."""
+        kind = OBJECT_KINDS.get(obj.name, 'others')
+        self.swap_remove(getattr(self, kind), obj, 'kindIndex')
+        if kind == 'balls' or kind == 'satellites':
+            self.swap_remove(self.sources, obj, 'sourceIndex')
+        del self.byId[obj.objectId]
+        return None
+
+    def swap_remove(self, collection: list, obj, indexName: str) -> None:
+        """Fills the slot of obj with the last object of collection."""
+        i = getattr(obj, indexName)
+        last = collection.pop()
+        if last is not obj:
+            collection[i] = last
+            setattr(last, indexName, i)
+        return None
+
+    def get(self, objectId: int):
+        """The object with objectId, or None."""
+        return self.byId.get(objectId)
+
+    def __len__(self) -> int:
+        return len(self.byId)
+
+    def __iter__(self):
+        """Boundaries, meters, balls and satellites, then anything else.
+
+        Each kind is in order of addition until something is removed.
+        remove() moves the last object of a list into the gap."""
+        yield from self.boundaries
+        yield from self.meters
+        yield from self.sources
+        yield from self.others
+
+def objects_of_kind(objects, kind: str) -> list:
+    """One kind list of a registry, or the same filtered from a plain list.
+
+    kind is a registry list name such as 'balls' or 'sources'."""
+    if isinstance(objects, ObjectRegistry):
+        return getattr(objects, kind)
+    if kind == 'sources':
+        return [obj for obj in objects
+            if obj.name == 'Ball' or obj.name == 'Satellite']
+    return [obj for obj in objects
+        if OBJECT_KINDS.get(obj.name, 'others') == kind]
+
+# Attributes World.apply_setting() copies onto objects, with defaults
+WORLD_SETTINGS = {'forceSolver': None, 'collisionGrid': None,
+    'fieldSampler': None, 'profiler': None, 'integrator': 'euler',
+    'collisionEvents': None, 'updateOrder': 'sequential',
+    'diagnostics': None}
+
+# Instance attributes shared by balls and satellites. Vectors stay two
+# element lists, the per-element physics loops run fastest on them, so
+# a ball takes about 900 bytes. The array engine has no per-coordinate
+# lists, see particle_arrays.ParticleView
+BODY_SLOTS = ('xy_current', 'XY_next', 'mass', 'charge', 'velocity0',
+    'velocity1', 'xyGForce', 'xyEForce', 'radius', 'objectId', 'kindIndex',
+    'sourceIndex') \
+    + tuple(WORLD_SETTINGS)
+
+class TimeStamp:
+    """Measures time passed.
+
+    Each individual object (e.g., satellite, ball) has a timestamp."""
+    __slots__ = ('clock', 'timeStamp', 'timeLapse')
+
+    def __init__(self, clock = time.time):
+        self.clock = clock
+        self.timeStamp = clock()
+        self.timeLapse = 0
+
+    def time_lapse(self) -> float:
+        """Calculates and resets time passed."""
+        currentTime = self.clock()
+        self.timeLapse = (currentTime - self.timeStamp)
+        self.timeStamp = currentTime
+        return self.timeLapse
+
+class Point:
+    """Updates object location.
+
+    Helpful for calculating kinetics involving forces or collisions."""
+    __slots__ = ()
+
+    def __init__(self, xy_parameter: list):
+        self.xy_current = [0, 0]
+        self.XY_next = [0, 0]
+        # Current or previous graph point
+        self.xy_current[0] = xy_parameter[0]
+        self.xy_current[1] = xy_parameter[1]
+        # For calculation and new point
+        self.XY_next[0] = xy_parameter[0]
+        self.XY_next[1] = xy_parameter[1]
+
+    def update_point(self) -> None:
+        """Current point is updated based on calculated point."""
+        self.xy_current[0] = self.XY_next[0]
+        self.xy_current[1] = self.XY_next[1]
+        return None
+
+    def copy_point(self) -> None:
+        """Copy current point to new point for calculation purpose."""
+        self.XY_next[0] = self.xy_current[0]
+        self.XY_next[1] = self.xy_current[1]
+        return None
+
+class GravitationalForce:
+    """For gravity force vector calculation."""
+    __slots__ = ()
+
+    def __init__(self, mass: float):
+        self.xyGForce = [0, 0]
+        self.mass = mass
+
+    def g_force(self, objects: "Ball | Satellite") -> list:
+        """Calculating gravity force vector based on object's mass."""
+        self.xyGForce = [0, 0]
+        vector = [0, 0]
+
+        for obj in objects_of_kind(objects, 'sources'):
+            # Avoids force from itself
+            if obj is self:
+                continue
+            d = dist(self.xy_current, obj.xy_current)
+            if d == 0:
+                continue
+            vector[0] = obj.xy_current[0] - self.xy_current[0]
+            vector[1] = obj.xy_current[1] - self.xy_current[1]
+
+            # Pseudo gravitational force formula with  d instead of d^2
+            # for visual exaggeration
+            force = self.mass * obj.mass / d
+            self.xyGForce[0] += vector[0] * force
+            self.xyGForce[1] += vector[1] * force
+        return self.xyGForce
+
+class ElectricForce:
+    """For electric force calculation."""
+    __slots__ = ()
+
+    def __init__(self, charge: float):
+        self.charge = charge
+        self.xyEForce = [0, 0]
+
+    def e_force(self, objects: list) -> list:
+        """Calculates & returns electric force vector from objects."""
+        self.xyEForce = [0, 0]
+        vector = [0, 0]
+
+        # Forces from physical objects only
+        for obj in objects_of_kind(objects, 'sources'):
+            # Avoid force from itself
+            if obj is self:
+                continue
+            d = dist(self.xy_current, obj.xy_current)
+            if d == 0:
+                continue
+            vector[0] = self.xy_current[0] - obj.xy_current[0]
+            vector[1] = self.xy_current[1] - obj.xy_current[1]
+
+            # Pseudo electric force formula with d instead of d^2
+            # for visual exaggeration
+            force = self.charge * obj.charge / d
+            self.xyEForce[0] += vector[0] * force
+            self.xyEForce[1] += vector[1] * force
+        return self.xyEForce
+
+class ForceCollector:
+    """Sums gravity and electric force on an object.
+
+    A world can set forceSolver to replace the direct g_force() and
+    e_force() loops, e.g. with a Barnes-Hut tree."""
+    __slots__ = ()
+    forceSolver = None
+
+    def collect_forces(self, objects: list) -> None:
+        """Fills xyGForce and xyEForce from objects or the solver."""
+        if self.forceSolver is None:
+            self.g_force(objects)
+            self.e_force(objects)
+        else:
+            self.xyGForce, self.xyEForce = self.forceSolver.forces(self)
+        return None
+
+class Boundary:
+    """Boundary of app object.
+
+    Detects object collision with boundaries.
+    Sets vector for ricochet."""
+    def __init__(self, xy1: list, xy2: list):
+        # Boundary defined by two points xy1 and xy2, xy1 < xy2
+        self.name = 'Boundary'
+        self.xy1 = [0, 0]
+        self.xy2 = [0, 0]
+        self.xy1[0] = xy1[0]
+        self.xy1[1] = xy1[1]
+        self.xy2[0] = xy2[0]
+        self.xy2[1] = xy2[1]
+
+    def collision(self, xy_current, xyVelocity: list,
+            radius: float, timeLapse: float) -> list:
+        reflectVelocity = [0, 0]
+        reflectVelocity[0] = xyVelocity[0]
+        reflectVelocity[1] = xyVelocity[1]
+        XY_next = [0, 0]
+        XY_next[0] = xy_current[0]
+        XY_next[1] = xy_current[1]
+
+        # Change velocity direction with elastic collision to wall
+        if xy_current[0] - self.xy1[0] < radius:
+            reflectVelocity = [-xyVelocity[0], xyVelocity[1]]
+            XY_next[0] = self.xy1[0] + radius
+            XY_next[0] += reflectVelocity[0] * timeLapse
+            XY_next[1] += reflectVelocity[1] * timeLapse
+
+        if self.xy2[0] - xy_current[0] < radius:
+            reflectVelocity = [-xyVelocity[0], xyVelocity[1]]
+            XY_next[0] = self.xy2[0] - radius
+            XY_next[0] += reflectVelocity[0] * timeLapse
+            XY_next[1] += reflectVelocity[1] * timeLapse
+
+        if xy_current[1] - self.xy1[1] < radius:
+            reflectVelocity = [xyVelocity[0], -xyVelocity[1]]
+            XY_next[1] = self.xy1[1] + radius
+            XY_next[0] += reflectVelocity[0] * timeLapse
+            XY_next[1] += reflectVelocity[1] * timeLapse
+
+        if self.xy2[1] - xy_current[1] < radius:
+            reflectVelocity = [xyVelocity[0], -xyVelocity[1]]
+            XY_next[1] = self.xy2[1] - radius
+            XY_next[0] += reflectVelocity[0] * timeLapse
+            XY_next[1] += reflectVelocity[1] * timeLapse
+
+        # All the objects should stay inside the boundary
+        if XY_next[0] - self.xy1[0] < radius:
+            XY_next[0] = self.xy1[0] + radius
+        if self.xy2[0] - XY_next[0] < radius:
+            XY_next[0] = self.xy2[0] - radius
+        if XY_next[1] - self.xy1[1] < radius:
+            XY_next[1] = self.xy1[1] + radius
+        if self.xy2[1] - XY_next[1] < radius:
+            XY_next[1] = self.xy2[1] - radius
+
+        return [XY_next, reflectVelocity]
+
+    def movement(self, objects: list) -> None:
+        """Boundary does not move.
+
+        Returns nothing for compatability in onStep()."""
+        return None
+
+    def update(self, objects: list) -> None:
+        """Boundary does not move.
+
+        Returns nothing for compatability in onStep()."""
+        return None
+
+class PhysicalProperty:
+    """Defines physical characteristics of object."""
+    __slots__ = ()
+
+    def __init__(self, mass: float, charge: float):
+        self.mass = mass
+        self.charge = charge
+
+    @property
+    def weight(self) -> float:
+        """Same as mass, kept for older scenes."""
+        return self.mass
+
+    @property
+    def chargeColor(self) -> str:
+        """Blue for positive, red for negative and black for no charge."""
+        if self.charge > 0:
+            return 'blue'
+        elif self.charge < 0:
+            return 'red'
+        return 'black'
+
+class KineticStatus:
+    """To calculate object kinetic factors."""
+    __slots__ = ()
+
+    def __init__(self):
+        # Need current and future velocity in case of collision
+        self.velocity0 = [0, 0]
+        self.velocity1 = [0, 0]
+
+    @property
+    def energy(self) -> list:
+        """Kinetic energy along x and y, from the current velocity."""
+        return [self.mass * self.velocity0[0]**2 / 2,
+            self.mass * self.velocity0[1]**2 / 2]
+
+    @property
+    def momentum(self) -> list:
+        """Momentum vector from the current velocity."""
+        return [self.mass * self.velocity0[0], self.mass * self.velocity0[1]]
+
+    def kinetic_status_update(self):
+        # Copy calculated velocity to current velocity
+        self.velocity0[0] = self.velocity1[0]
+        self.velocity0[1] = self.velocity1[1]
+
+class OrbitalEngine:
+    """Sets satellite orbit variables"""
+    __slots__ = ()
+    # Unused defaults, satellites use omega and orbitRadius
+    # In rad / sec
+    omegaOrbit = 0.1
+    radiusOrbit = 400
+    directionOrbit = 1
+
+    def __init__(self):
+        self.centerOrbit = [0, 0]
+
+class PhysicalObject(PhysicalProperty, GravitationalForce, ElectricForce,
+        ForceCollector, KineticStatus):
+    """Creates physical object with kinetic & electrical properties.
+
+    Subclasses list their attributes in __slots__, so balls and
+    satellites carry no per-instance dict."""
+    __slots__ = ()
+
+    def __init__(self, mass: float, charge: float):
+        PhysicalProperty.__init__(self, mass, charge)
+        KineticStatus.__init__(self)
+        GravitationalForce.__init__(self, mass)
+        ElectricForce.__init__(self, charge)
+        self.objectId = None
+
+        # Solver, broad phase, timers etc. until the world sets them
+        for name, value in WORLD_SETTINGS.items():
+            setattr(self, name, value)
+
+    def shape_state(self) -> tuple:
+        """What the circle needs to be drawn: x, y, radius and color.
+
+        Radius and color are part of it, so a ball respawned with another
+        charge between two renders is redrawn in its new color."""
+        return (self.xy_current[0], self.xy_current[1], self.radius,
+            self.chargeColor)
+
+# Classes for actual moving objects
+class Ball(TimeStamp, Point, PhysicalObject):
+    """For ball(s) in app object.
+
+    integrator = 'euler' updates velocity then position from it.
+    integrator = 'verlet' uses velocity Verlet, which keeps energy stable
+    at much larger time steps."""
+    __slots__ = BODY_SLOTS + ('acceleration', 'previousLapse')
+    name = 'Ball'
+
+    def __init__(self, xy_current: list, radius: float, mass: float,
+            charge: float, clock = time.time):
+        TimeStamp.__init__(self, clock)
+        Point.__init__(self, xy_current)
+        PhysicalObject.__init__(self, mass, charge)
+        self.radius = radius
+        # Acceleration and time lapse of the last step, for Verlet
+        self.acceleration = [0, 0]
+        self.previousLapse = 0
+
+    def movement(self, objects: list) -> None:
+        """Calculate ball velocity based on gravity & electric force."""
+        t = self.time_lapse()
+
+        # From xy to XY for calculation
+        self.copy_point()
+
+        # Collect force
+        self.collect_forces(objects)
+
+        # Total force from G and E
+        tXForce = self.xyGForce[0] + self.xyEForce[0]
+        tYForce = self.xyGForce[1] + self.xyEForce[1]
+
+        # Acceleration from force
+        tXAcc = tXForce / self.mass
+        tYAcc = tYForce / self.mass
+
+        if self.integrator == 'verlet':
+            # Finish last step's velocity with the average acceleration
+            # Formula: v = v0 + (A0 + A1) / 2 * dt
+            self.velocity0[0] += (tXAcc - self.acceleration[0]) \
+                * self.previousLapse / 2
+            self.velocity0[1] += (tYAcc - self.acceleration[1]) \
+                * self.previousLapse / 2
+
+            # Formula: x = x0 + v * dt + A / 2 * dt^2
+            self.XY_next[0] = self.xy_current[0] + self.velocity0[0] * t \
+                + tXAcc * t * t / 2
+            self.XY_next[1] = self.xy_current[1] + self.velocity0[1] * t \
+                + tYAcc * t * t / 2
+
+            # Predicted velocity, corrected at the next step
+            self.velocity1[0] = self.velocity0[0] + tXAcc * t
+            self.velocity1[1] = self.velocity0[1] + tYAcc * t
+        else:
+            # Calculate next position
+            # Formula: A = dv/dt
+            self.velocity1[0] = self.velocity0[0] + tXAcc * t
+            self.velocity1[1] = self.velocity0[1] + tYAcc * t
+
+            # Formula: v = dx/dt
+            self.XY_next[0] = self.xy_current[0] + self.velocity1[0] * t
+            self.XY_next[1] = self.xy_current[1] + self.velocity1[1] * t
+
+        self.acceleration[0] = tXAcc
+        self.acceleration[1] = tYAcc
+        self.previousLapse = t
+        return None
+
+    def update(self, objects: list) -> None:
+        """Updating ball position based on nearby forces
+
+        Or object collisions. With collision events the world has
+        already bounced XY_next and velocity1, in two-phase order it
+        has checked them against the snapshot before any update."""
+        if self.collisionEvents is None and \
+                self.updateOrder == 'sequential':
+            self.check_collision(objects, self.radius)
+
+        # Finalize object movement after collision
+        self.update_point()
+        self.kinetic_status_update()
+        if self.collisionGrid is not None:
+            self.collisionGrid.move(self)
+        return None
+
+    def sync_shape(self, threshold: float = 0, state: tuple = None) -> bool:
+        """Nothing to draw in the physics core.
+
+        Drawable subclasses move their shapes here when the object moved
+        more than threshold pixels, and return True if they did. state is
+        a shape_state() snapshot, the live attributes by default."""
+        return False
+
+    def hide_shape(self) -> None:
+        """Nothing to hide in the physics core.
+
+        Drawable subclasses hide their shapes here once the ball has been
+        removed from the world."""
+        return None
+
+    def check_collision(self, objects: list, radius = 1) -> None:
+        prof = self.profiler
+        if prof is not None:
+            start = prof.clock()
+            collisions = 0
+        diag = self.diagnostics
+        collided = False
+
+        # A collision grid narrows the search to nearby objects
+        if self.collisionGrid is None:
+            others = objects_of_kind(objects, 'sources')
+            boundaries = objects_of_kind(objects, 'boundaries')
+        else:
+            others = self.collisionGrid.neighbours(self)
+            boundaries = self.collisionGrid.boundaries
+        if prof is not None:
+            start = prof.lap('Ball collision broad', start)
+            prof.count('Ball collision candidates', len(others))
+
+        # Check ball and satellites
+        for obj in others:
+            # Exclude itself
+            if obj is self:
+                continue
+            # If center of two are closer
+            # Than the sum of radii at new position XY
+            if dist(self.XY_next, obj.xy_current) < self.radius + obj.radius:
+                # Prepare metrics for momemtum calculation
+                massDiff = self.mass - obj.mass
+                massSum = self.mass + obj.mass
+
+                # Velocity after collision
+                self.velocity1[0] = massDiff / massSum \
+                    * self.velocity0[0] + 2 * obj.mass \
+                    * obj.velocity0[0] / massSum
+                self.velocity1[1] = massDiff / massSum \
+                    * self.velocity0[1] + 2 * obj.mass \
+                    * obj.velocity0[1]/ massSum
+
+                # Re-calculate position with reflected velocity
+                self.XY_next[0] = self.xy_current[0] + \
+                    self.velocity1[0] * self.timeLapse
+                self.XY_next[1] = self.xy_current[1] + \
+                    self.velocity1[1] * self.timeLapse
+                collided = True
+                if prof is not None:
+                    collisions += 1
+        if prof is not None:
+            start = prof.lap('Ball collision narrow', start)
+            prof.count('Ball collisions', collisions)
+        if diag is not None and collided:
+            diag.collisions += 1
+
+        # Check if ball should bounce at the boundary with a new position
+        for obj in boundaries:
+            [xyUpdate, velocityUpdate] = obj.collision(self.XY_next,
+                self.velocity1, radius, self.timeLapse)
+            if diag is not None and velocityUpdate != self.velocity1:
+                diag.wallBounces += 1
+
+            self.XY_next[0] = xyUpdate[0]
+            self.XY_next[1] = xyUpdate[1]
+            self.velocity1[0] = velocityUpdate[0]
+            self.velocity1[1] = velocityUpdate[1]
+        if prof is not None:
+            prof.lap('Ball boundary', start)
+        return None
+
+class Satellite(TimeStamp, Point, OrbitalEngine, PhysicalObject):
+    """For moving satellites in ring.
+
+    The satellite orbits around the point it is created at."""
+    __slots__ = BODY_SLOTS + ('omega', 'orbitRadius', 'angle', 'centerOrbit')
+    name = 'Satellite'
+
+    def __init__(self, xy_current: list, radius: float, mass: float,
+            charge: float, omega: float, orbitRadius: float, angle: float,
+            clock = time.time):
+        TimeStamp.__init__(self, clock)
+        Point.__init__(self, xy_current)
+        OrbitalEngine.__init__(self)
+        PhysicalObject.__init__(self, mass, charge)
+        self.radius = radius
+        self.omega = omega
+        self.orbitRadius = orbitRadius
+        self.angle = angle
+        self.centerOrbit[0] = xy_current[0]
+        self.centerOrbit[1] = xy_current[1]
+
+        # Orbit around center
+        self.xy_current[0] = self.centerOrbit[0] + self.orbitRadius \
+            * math.cos(self.angle)
+        self.xy_current[1] = self.centerOrbit[1] + self.orbitRadius \
+            * math.sin(self.angle)
+        self.copy_point()
+
+    def movement(self, objects: "Satellite") -> None:
+        """Circular satellite movement."""
+        t = self.time_lapse()
+
+        # From xy to XY for calculation
+        self.copy_point()
+
+        # Angular rotation by timeLapse
+        self.angle += t * self.omega
+        self.XY_next[0] = self.centerOrbit[0] + self.orbitRadius \
+            * math.cos(self.angle)
+        self.XY_next[1] = self.centerOrbit[1] + self.orbitRadius \
+            * math.sin(self.angle)
+        return None
+
+    def update(self, objects: list) -> None:
+        """Updating satellite position to update nearby vector field points."""
+        self.update_point()
+        if self.collisionGrid is not None:
+            self.collisionGrid.move(self)
+        return None
+
+    def sync_shape(self, threshold: float = 0, state: tuple = None) -> bool:
+        """Nothing to draw in the physics core."""
+        return False
+
+    def hide_shape(self) -> None:
+        """Nothing to hide in the physics core."""
+        return None
+
+class PointForceField(Point, GravitationalForce, ElectricForce,
+        ForceCollector):
+    """For calculating field vectors.
+
+    xyGForce = gravity force
+    xyEForce = electrical force"""
+    # Batched sampler that fills all meters at once, set by the world
+    fieldSampler = None
+    # Phase timers, set by the world
+    profiler = None
+
+    def __init__(self, xy_current: list):
+        self.name = 'Field'
+        Point.__init__(self, xy_current)
+        GravitationalForce.__init__(self, 1)
+        ElectricForce.__init__(self, 1)
+
+    def movement(self, objects: list) -> None:
+        """Collects sum of forces from objects."""
+        if self.fieldSampler is None:
+            self.collect_forces(objects)
+        return None
+
+    def update(self, objects: list) -> None:
+        """Field meters do not move, RenderSync redraws their vectors."""
+        return None
+
+    def shape_state(self) -> tuple:
+        """Gravity x, y and electric x, y of the force vectors."""
+        return (self.xyGForce[0], self.xyGForce[1], self.xyEForce[0],
+            self.xyEForce[1])
+
+    def sync_shape(self, threshold: float = 0, state: tuple = None) -> bool:
+        """Nothing to draw in the physics core."""
+        return False
+
+class World:
+    """Holds the playground and every simulated object.
+
+    Subclasses can swap the object classes, e.g. for drawable versions."""
+    boundaryClass = Boundary
+    fieldClass = PointForceField
+    satelliteClass = Satellite
+    ballClass = Ball
+
+    def __init__(self, xy1: list, xy2: list, clock = time.time):
+        self.clock = clock
+        self.centerPlayground = [(xy1[0] + xy2[0]) / 2,
+            (xy1[1] + xy2[1]) / 2]
+        self.forceSolver = None
+        self.collisionGrid = None
+        self.integrator = 'euler'
+        self.fieldSampler = None
+        self.profiler = None
+        self.collisionEvents = None
+        self.blockTimesteps = None
+        self.updateOrder = 'sequential'
+        self.diagnostics = None
+        # Objects removed so far, RenderSync hides their shapes
+        self.removals = 0
+        # World-wide attributes copied onto every object
+        self.objectSettings = {}
+        self.objs = ObjectRegistry()
+        self.boundary = self.add_object(self.boundaryClass(xy1, xy2))
+
+    def apply_setting(self, name: str, value) -> None:
+        """Sets an attribute on the world, its objects and later objects."""
+        setattr(self, name, value)
+        self.objectSettings[name] = value
+        for obj in self.objs:
+            setattr(obj, name, value)
+        return None
+
+    def set_force_solver(self, solver) -> None:
+        """Uses solver for the forces on every object, None for direct sums.
+
+        The solver needs prepare(objects, boundary) and forces(obj)."""
+        self.apply_setting('forceSolver', solver)
+        return None
+
+    def set_collision_grid(self, grid) -> None:
+        """Uses grid as collision broad phase, None to check every pair.
+
+        The grid needs rebuild(objects), move(obj), neighbours(ball)
+        and a boundaries list."""
+        self.apply_setting('collisionGrid', grid)
+        return None
+
+    def set_field_sampler(self, sampler) -> None:
+        """Fills all field meters with one batched call, None for per meter.
+
+        The sampler needs prepare(objects) and update_meters()."""
+        self.apply_setting('fieldSampler', sampler)
+        return None
+
+    def set_profiler(self, profiler) -> None:
+        """Times every phase of a step with profiler, None to switch off."""
+        self.apply_setting('profiler', profiler)
+        return None
+
+    def set_integrator(self, integrator: str) -> None:
+        """Picks 'euler' (the original scheme) or 'verlet' for the balls."""
+        if integrator not in ('euler', 'verlet'):
+            raise ValueError(f'Unknown integrator: {integrator}')
+        self.apply_setting('integrator', integrator)
+        return None
+
+    def set_diagnostics(self, diagnostics) -> None:
+        """Records energy, momentum and collisions after every step.
+
+        diagnostics needs after_step(world) and collisions and
+        wallBounces counters, see diagnostics.SystemDiagnostics."""
+        self.apply_setting('diagnostics', diagnostics)
+        return None
+
+    def set_update_order(self, order: str) -> None:
+        """Picks 'sequential' (the original order) or 'two-phase'.
+
+        Sequential moves and updates one object after another, so later
+        objects see earlier ones at their new positions. Two-phase
+        computes every force and collision from the positions at the
+        start of the step and commits them all afterwards."""
+        if order not in ('sequential', 'two-phase'):
+            raise ValueError(f'Unknown update order: {order}')
+        self.apply_setting('updateOrder', order)
+        return None
+
+    def set_collision_events(self, collider) -> None:
+        """Finds exact collision times with collider, None for overlaps.
+
+        The collider needs resolve(start, end, radius, mass, isBall,
+        boxes, t, velocity), see collision_events.EventCollider."""
+        if collider is not None and self.blockTimesteps is not None:
+            raise ValueError('Collision events need one step for all balls,'
+                ' switch off block timesteps first')
+        self.apply_setting('collisionEvents', collider)
+        return None
+
+    def set_block_timesteps(self, blocks) -> None:
+        """Steps balls with their own power-of-two dt, None for one dt.
+
+        blocks is a block_timesteps.BlockTimesteps. Only step(dt) with a
+        SimulationClock uses it."""
+        if blocks is not None and self.collisionEvents is not None:
+            raise ValueError('Block timesteps cannot be combined with'
+                ' collision events')
+        self.blockTimesteps = blocks
+        return None
+
+    def add_object(self, obj):
+        """Adds any object to the world and returns it."""
+        for name, value in self.objectSettings.items():
+            setattr(obj, name, value)
+        self.objs.add(obj)
+        return obj
+
+    def remove_object(self, obj) -> None:
+        """Takes a ball or satellite out of the world.
+
+        Its shape is hidden at the next render. A removed ball can come
+        back with respawn_ball(), e.g. from a ball_lifecycle.BallPool."""
+        self.objs.remove(obj)
+        self.removals += 1
+        return None
+
+    def add_field_grid(self, nCol: int, nRow: int) -> None:
+        """Adds nCol x nRow evenly spaced field meters."""
+        width = self.boundary.xy2[0] - self.boundary.xy1[0]
+        height = self.boundary.xy2[1] - self.boundary.xy1[1]
+        for i in range(nCol):
+            for j in range(nRow):
+                tX = self.boundary.xy1[0] + ( i + 1 ) / ( nCol + 1 ) * width
+                tY = self.boundary.xy1[1] + ( j + 1 ) / ( nRow + 1 ) * height
+                self.add_object(self.fieldClass([tX, tY]))
+        return None
+
+    def add_satellite(self, radius: float, mass: float, charge: float,
+            omega: float, orbitRadius: float, angle: float) -> "Satellite":
+        """Adds a satellite orbiting the playground center."""
+        satellite = self.satelliteClass(self.centerPlayground, radius, mass,
+            charge, omega, orbitRadius, angle, self.clock)
+        return self.add_object(satellite)
+
+    def add_ball(self, xy_current: list, radius: float, mass: float,
+            charge: float) -> "Ball":
+        """Adds a free-moving ball."""
+        ball = self.ballClass(xy_current, radius, mass, charge, self.clock)
+        return self.add_object(ball)
+
+    def respawn_ball(self, ball: "Ball", xy_current: list, radius: float,
+            mass: float, charge: float) -> "Ball":
+        """Adds a removed ball back as a new ball at xy_current.
+
+        Only the physics state is reset, so a drawable ball keeps its
+        shape and no new object is made."""
+        Ball.__init__(ball, xy_current, radius, mass, charge, self.clock)
+        return self.add_object(ball)
+
+    def add_balls(self, xy, radius, mass, charge, velocity = None) -> list:
+        """Adds one ball per row of xy and returns them.
+
+        The other arguments hold one value per ball, velocity one (vx, vy)
+        per ball or None for balls at rest. Lists and NumPy arrays both
+        work, the array engine adds them all in one pass."""
+        xy, radius, mass, charge = (as_list(values)
+            for values in (xy, radius, mass, charge))
+        balls = [self.add_ball(*values)
+            for values in zip(xy, radius, mass, charge)]
+        if velocity is not None:
+            for ball, (vX, vY) in zip(balls, as_list(velocity)):
+                ball.velocity0[0] = ball.velocity1[0] = vX
+                ball.velocity0[1] = ball.velocity1[1] = vY
+        return balls
+
+    def add_satellites(self, radius, mass, charge, omega, orbitRadius,
+            angle) -> list:
+        """Adds one satellite per value, like add_balls()."""
+        columns = (as_list(values) for values in (radius, mass, charge,
+            omega, orbitRadius, angle))
+        return [self.add_satellite(*values) for values in zip(*columns)]
+
+    def properties_changed(self) -> None:
+        """Called after the menu changes mass, charge or omega.
+
+        Objects read their own attributes, so nothing to do here."""
+        return None
+
+    def step(self, dt: float = None) -> None:
+        """Moves and updates every object once.
+
+        With a SimulationClock, dt advances the clock before stepping."""
+        if dt is not None and self.blockTimesteps is not None:
+            self.step_blocks(dt)
+        else:
+            if dt is not None:
+                self.clock.advance(dt)
+            self.step_objects(self.objs)
+        if self.diagnostics is not None:
+            self.diagnostics.after_step(self)
+        return None
+
+    def step_objects(self, objects: list, sampleField: bool = True) -> None:
+        """Moves and updates objects, forces come from every object."""
+        prof = self.profiler
+        if prof is not None:
+            start = prof.clock()
+
+        if self.forceSolver is not None:
+            self.forceSolver.prepare(self.objs, self.boundary)
+        if self.collisionGrid is not None:
+            self.collisionGrid.rebuild(self.objs)
+        if prof is not None:
+            start = prof.lap('World prepare', start)
+        if self.fieldSampler is not None and sampleField:
+            self.fieldSampler.prepare(self.objs)
+            self.fieldSampler.update_meters()
+            if prof is not None:
+                start = prof.lap('Field sampler', start)
+
+        if self.collisionEvents is not None:
+            self.step_events()
+        elif self.updateOrder == 'two-phase':
+            self.step_two_phase(objects)
+        elif prof is None:
+            for obj in objects:
+                obj.movement(self.objs)
+                obj.update(self.objs)
+        else:
+            # Same loop, timed by object type
+            for obj in objects:
+                obj.movement(self.objs)
+                start = prof.lap(obj.name + ' movement', start)
+                obj.update(self.objs)
+                start = prof.lap(obj.name + ' update', start)
+        return None
+
+    def step_blocks(self, dt: float) -> None:
+        """Step of dt with block timesteps, see BlockTimesteps.
+
+        Satellites move on every substep that moves a ball, field meters
+        and other objects once at the end. Balls that are not due act as
+        sources at their last positions, a first order error."""
+        blocks = self.blockTimesteps
+        substeps = 1 << blocks.maxLevel
+        balls = list(objects_of_kind(self.objs, 'balls'))
+        levels = [blocks.levels.get(ball.objectId, 0) for ball in balls]
+        fixed = list(objects_of_kind(self.objs, 'boundaries')) \
+            + list(objects_of_kind(self.objs, 'satellites'))
+        pending = 0
+        for substep in range(1, substeps + 1):
+            pending += dt / substeps
+            active = [i for i in range(len(balls))
+                if substep % (substeps >> levels[i]) == 0]
+            last = substep == substeps
+            if not active and not last:
+                continue
+            self.clock.advance(pending)
+            pending = 0
+
+            # Acceleration before the move, for the jerk
+            before = [(list(balls[i].acceleration), balls[i].previousLapse)
+                for i in active]
+            objects = fixed + [balls[i] for i in active]
+            if last:
+                objects += list(objects_of_kind(self.objs, 'meters')) \
+                    + list(objects_of_kind(self.objs, 'others'))
+            self.step_objects(objects, last)
+
+            coarsest = blocks.coarsest_level(substep)
+            for i, (acceleration, lapse) in zip(active, before):
+                ball = balls[i]
+                if lapse <= 0:
+                    # No earlier acceleration to compare with yet
+                    continue
+                jerk = dist(ball.acceleration, acceleration) \
+                    / ball.previousLapse
+                wanted = blocks.level_for(math.hypot(ball.acceleration[0],
+                    ball.acceleration[1]), jerk, dt)
+                levels[i] = max(wanted, coarsest)
+            blocks.forceEvaluations += len(active)
+            blocks.substeps += 1
+        blocks.simulatedTime += dt
+        blocks.levels = {ball.objectId: level
+            for ball, level in zip(balls, levels)}
+        return None
+
+    def step_two_phase(self, objects: list) -> None:
+        """Step with a frozen snapshot: move all, collide all, update all.
+
+        Nothing is committed before every force and collision is known,
+        so the result does not depend on the order of the objects."""
+        prof = self.profiler
+        if prof is not None:
+            start = prof.clock()
+        for obj in objects:
+            obj.movement(self.objs)
+        if prof is not None:
+            start = prof.lap('World movement', start)
+        for obj in objects:
+            if obj.name == 'Ball':
+                obj.check_collision(self.objs, obj.radius)
+        if prof is not None:
+            start = prof.lap('World collision', start)
+        for obj in objects:
+            obj.update(self.objs)
+        if prof is not None:
+            start = prof.lap('World update', start)
+        return None
+
+    def step_events(self) -> None:
+        """Step with collision events: move all, bounce, then update all.
+
+        Every object moves from the positions at the start of the step,
+        so the collider sees all paths at once."""
+        prof = self.profiler
+        if prof is not None:
+            start = prof.clock()
+        for obj in self.objs:
+            obj.movement(self.objs)
+        if prof is not None:
+            start = prof.lap('World movement', start)
+
+        bodies = objects_of_kind(self.objs, 'sources')
+        if bodies:
+            t = max(obj.timeLapse for obj in bodies)
+            boxes = [(obj.xy1[0], obj.xy1[1], obj.xy2[0], obj.xy2[1])
+                for obj in objects_of_kind(self.objs, 'boundaries')]
+            changed = self.collisionEvents.resolve(
+                [obj.xy_current for obj in bodies],
+                [obj.XY_next for obj in bodies],
+                [obj.radius for obj in bodies], [obj.mass for obj in bodies],
+                [obj.name == 'Ball' for obj in bodies], boxes, t,
+                [obj.velocity1 for obj in bodies])
+            for i, (xy, velocity) in changed.items():
+                bodies[i].XY_next[0], bodies[i].XY_next[1] = xy
+                bodies[i].velocity1[0], bodies[i].velocity1[1] = velocity
+            if self.diagnostics is not None:
+                self.diagnostics.collisions += self.collisionEvents.collisions
+                self.diagnostics.wallBounces += \
+                    self.collisionEvents.wallBounces
+            if prof is not None:
+                prof.count('Collision events', self.collisionEvents.events)
+                start = prof.lap('Collision events', start)
+
+        for obj in self.objs:
+            obj.update(self.objs)
+        if prof is not None:
+            start = prof.lap('World update', start)
+        return None
+
+class FixedStepper:
+    """Runs a world with a fixed dt, whatever the frame rate.
+
+    Real time between frames goes into an accumulator and is spent in
+    whole dt steps. At most maxSubsteps run per frame so one slow frame
+    cannot snowball; time beyond that is dropped. A renderer, such as
+    RenderSync, gets one frame() call after the physics steps. Monitors,
+    such as a trajectory recorder, get after_step(world) after every
+    physics step."""
+    def __init__(self, world: World, dt: float, maxSubsteps: int = 8,
+            realClock = time.perf_counter, renderer = None):
+        self.world = world
+        self.renderer = renderer
+        self.monitors = []
+        self.dt = dt
+        self.maxSubsteps = maxSubsteps
+        self.realClock = realClock
+        self.lastTime = realClock()
+        self.accumulator = 0
+        self.droppedTime = 0
+
+    def frame(self) -> int:
+        """Steps the world for the real time since the last frame.
+
+        Returns the number of physics steps taken."""
+        currentTime = self.realClock()
+        self.accumulator += currentTime - self.lastTime
+        self.lastTime = currentTime
+
+        steps = 0
+        while self.accumulator >= self.dt and steps < self.maxSubsteps:
+            self.world.step(self.dt)
+            for monitor in self.monitors:
+                monitor.after_step(self.world)
+            self.accumulator -= self.dt
+            steps += 1
+
+        # Drop what could not be caught up
+        if self.accumulator >= self.dt:
+            self.droppedTime += self.accumulator
+            self.accumulator = 0
+        if self.renderer is not None:
+            self.renderer.frame()
+        if self.world.profiler is not None:
+            self.world.profiler.count('Physics steps', steps)
+            self.world.profiler.end_frame()
+        return steps
+
+class RenderSync:
+    """Pushes object state to the shapes, separately from the physics.
+
+    Renders at most rate times per second (None for every frame), so
+    physics can run at 240 Hz while drawing at 30 Hz. Shapes that moved
+    threshold pixels or less are left alone. With a source, such as a
+    SimulationThread, shapes are drawn from source.latest() snapshots
+    instead of the live objects."""
+    def __init__(self, world: World, rate: float = None,
+            threshold: float = 0, realClock = time.perf_counter,
+            source = None):
+        self.world = world
+        self.rate = rate
+        self.threshold = threshold
+        self.realClock = realClock
+        self.source = source
+        self.lastSnapshot = None
+        self.nextRender = realClock()
+        # Balls and satellites drawn at the last render, and how many
+        # objects the world had removed by then
+        self.shown = []
+        self.removals = 0
+
+    def frame(self) -> bool:
+        """Renders if it is time to, returns True if it did."""
+        if self.rate is None:
+            self.render()
+            return True
+        interval = 1 / self.rate
+        currentTime = self.realClock()
+        # A quarter interval of slack, so frame jitter does not skip renders
+        if currentTime + interval / 4 < self.nextRender:
+            return False
+        self.nextRender += interval
+        if self.nextRender < currentTime:
+            self.nextRender = currentTime + interval
+        self.render()
+        return True
+
+    def render(self) -> None:
+        """Syncs the shapes of every ball, satellite and field meter."""
+        prof = self.world.profiler
+        if prof is not None:
+            start = prof.clock()
+        pushed = 0
+        if self.source is None:
+            objects = self.world.objs
+            sources = objects_of_kind(objects, 'sources')
+            self.hide_removed(sources, self.world.removals)
+            for kind in ('sources', 'meters'):
+                for obj in objects_of_kind(objects, kind):
+                    pushed += obj.sync_shape(self.threshold)
+        else:
+            # Nothing to do until the source publishes a new snapshot
+            snapshot = self.source.latest()
+            if snapshot is not None and snapshot is not self.lastSnapshot:
+                self.lastSnapshot = snapshot
+                self.hide_removed([obj for obj, state in snapshot.states],
+                    snapshot.removals)
+                for obj, state in snapshot.states:
+                    pushed += obj.sync_shape(self.threshold, state)
+        if prof is not None:
+            prof.lap('Render', start)
+            prof.count('Shapes pushed', pushed)
+        return None
+
+    def hide_removed(self, objects: list, removals: int) -> None:
+        """Hides shapes drawn last time whose objects are gone.
+
+        Only compares the two lists when the world removed something, a
+        ball removed and respawned in between stays shown."""
+        if removals != self.removals:
+            self.removals = removals
+            current = set(objects)
+            for obj in self.shown:
+                if obj not in current:
+                    obj.hide_shape()
+        self.shown = list(objects)
+        return None
+
+def populate_default_scene(world: World, radiusBall = 5, radiusSatellite = 10,
+        massBall = 0.1, massSatellite = 5, chargeBall = 0.5,
+        chargeSatellite = 5, omegaBall = 0.2, nColMeter = 12,
+        nRowMeter = 12, orbitRadii = (300, 280, 320)) -> World:
+    """Adds the field meters, three satellites and four balls of the lab.
+
+    Field meters only feed the display, so nColMeter = 0 leaves them out."""
+    world.add_field_grid(nColMeter, nRowMeter)
+
+    # Add three satellites
+    world.add_satellite(radiusSatellite, massSatellite, 0*chargeSatellite,
+        omegaBall, orbitRadii[0], 0)
+    world.add_satellite(radiusSatellite, massSatellite, chargeSatellite,
+        -omegaBall, orbitRadii[1], math.pi/3)
+    world.add_satellite(radiusSatellite, massSatellite, -chargeSatellite,
+        omegaBall, orbitRadii[2], math.pi/2)
+
+    # Add four balls
+    center = world.centerPlayground
+    world.add_ball([center[0] - 100, center[1] - 100], radiusBall, massBall,
+        0*chargeBall)
+    world.add_ball([center[0] + 100, center[1] + 100], radiusBall, massBall,
+        0*chargeBall)
+    world.add_ball([center[0], center[1] + 150], radiusBall, massBall,
+        chargeBall)
+    world.add_ball([center[0], center[1] - 150], radiusBall, massBall,
+        -chargeBall)
+    return world
+
+def default_world(clock = None, fieldMeters = True) -> World:
+    """Creates the 720 x 720 playground from setup() in lab01_final.py."""
+    if clock is None:
+        clock = SimulationClock()
+    world = World([0, 0], [720, 720], clock)
+    if fieldMeters:
+        return populate_default_scene(world)
+    return populate_default_scene(world, nColMeter = 0, nRowMeter = 0)
+
+def run_headless(steps: int, dt: float, world: World = None) -> World:
+    """Steps the physics with a fixed dt and no rendering.
+
+    Without a world, the default scene is used minus its field meters."""
+    if world is None:
+        world = default_world(fieldMeters = False)
+    for i in range(steps):
+        world.step(dt)
+        if world.profiler is not None:
+            world.profiler.end_frame()
+    return world
+
+if __name__ == '__main__':
+    nSteps = 1000
+    startTime = time.perf_counter()
+    run_headless(nSteps, 1/30)
+    elapsed = time.perf_counter() - startTime
+    print(f'{nSteps} steps in {elapsed:.3f} s '
+          f'({nSteps / elapsed:.0f} steps/sec)')
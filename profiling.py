@@ -0,0 +1,105 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Low-overhead per-phase timers and counters for the physics step,
+         with rolling percentiles and CSV/JSON export.
+"""
+
+import csv
+import json
+import time
+from collections import deque
+
+class PhaseProfiler:
+    """Collects time per phase and counters per frame.
+
+    Objects call lap() or add() while a frame runs. end_frame() moves the
+    frame totals into rolling windows of the last `window` frames.
+    Setting no profiler on the world (None) turns all of it off."""
+    def __init__(self, window: int = 300, clock = time.perf_counter):
+        self.window = window
+        self.clock = clock
+        self.frameTimes = {}
+        self.frameCounts = {}
+        self.times = {}
+        self.counts = {}
+        self.frames = 0
+
+    def add(self, phase: str, seconds: float) -> None:
+        """Adds seconds to phase for the current frame."""
+        self.frameTimes[phase] = self.frameTimes.get(phase, 0) + seconds
+        return None
+
+    def lap(self, phase: str, start: float) -> float:
+        """Adds the time since start to phase and returns the clock now."""
+        now = self.clock()
+        self.frameTimes[phase] = self.frameTimes.get(phase, 0) + now - start
+        return now
+
+    def count(self, counter: str, n: int = 1) -> None:
+        """Adds n to counter for the current frame."""
+        self.frameCounts[counter] = self.frameCounts.get(counter, 0) + n
+        return None
+
+    def end_frame(self) -> None:
+        """Closes the current frame, phases without time this frame get 0."""
+        for totals, history in ((self.frameTimes, self.times),
+                (self.frameCounts, self.counts)):
+            for name in totals:
+                if name not in history:
+                    history[name] = deque(maxlen = self.window)
+            for name, values in history.items():
+                values.append(totals.get(name, 0))
+        self.frameTimes = {}
+        self.frameCounts = {}
+        self.frames += 1
+        return None
+
+    def percentile(self, values: deque, percent: float) -> float:
+        """Nearest-rank percentile of the values."""
+        if not values:
+            return 0
+        ordered = sorted(values)
+        rank = max(0, min(len(ordered) - 1,
+            round(percent / 100 * len(ordered)) - 1))
+        return ordered[rank]
+
+    def summary(self) -> list:
+        """One row per phase and counter over the rolling window.
+
+        Times are in milliseconds per frame."""
+        rows = []
+        for kind, history, scale in (('time_ms', self.times, 1000),
+                ('count', self.counts, 1)):
+            for name, values in sorted(history.items()):
+                rows.append({'name': name, 'kind': kind,
+                    'frames': len(values),
+                    'mean': scale * sum(values) / max(len(values), 1),
+                    'p50': scale * self.percentile(values, 50),
+                    'p95': scale * self.percentile(values, 95),
+                    'p99': scale * self.percentile(values, 99)})
+        return rows
+
+    def overlay_lines(self, maxLines: int = 8) -> list:
+        """Short text lines for the slowest phases, for the screen overlay."""
+        rows = [row for row in self.summary() if row['kind'] == 'time_ms']
+        rows.sort(key = lambda row: row['mean'], reverse = True)
+        return [f"{row['name']}: p50 {row['p50']:.2f} p95 {row['p95']:.2f} ms"
+            for row in rows[:maxLines]]
+
+    def export_csv(self, path: str) -> None:
+        """Writes summary() as a CSV file."""
+        rows = self.summary()
+        with open(path, 'w', newline = '') as file:
+            writer = csv.DictWriter(file, fieldnames = ['name', 'kind',
+                'frames', 'mean', 'p50', 'p95', 'p99'])
+            writer.writeheader()
+            writer.writerows(rows)
+        return None
+
+    def export_json(self, path: str) -> None:
+        """Writes summary() as a JSON file."""
+        with open(path, 'w') as file:
+            json.dump({'frames': self.frames, 'window': self.window,
+                'phases': self.summary()}, file, indent = 2)
+        return None
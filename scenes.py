@@ -0,0 +1,158 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Scene files. Balls, satellites and field meters are stored as
+         columns, in JSON for small hand-written scenes or NumPy .npz for
+         large ones, and added to a world in bulk in one pass per kind.
+"""
+
+import json
+import numpy as np
+from physics_core import objects_of_kind
+
+VERSION = 1
+# Columns per kind with their width, 2 for vectors
+BALL_COLUMNS = {'xy': 2, 'radius': 1, 'mass': 1, 'charge': 1,
+    'velocity': 2}
+SATELLITE_COLUMNS = {'radius': 1, 'mass': 1, 'charge': 1, 'omega': 1,
+    'orbitRadius': 1, 'angle': 1}
+# Columns that may be left out, with their value
+OPTIONAL_COLUMNS = {'velocity': 0.0}
+
+def kind_arrays(kind: str, columns: dict, widths: dict) -> dict:
+    """columns of one kind as float arrays of the same length.
+
+    A single value, like "radius": 5 in JSON, is used for every row. The
+    number of rows comes from the first column with one value per row,
+    a kind without any has none."""
+    arrays = {}
+    count = None
+    for name, width in widths.items():
+        if columns and name not in columns and name not in OPTIONAL_COLUMNS:
+            raise ValueError(f'Scene {kind} have no {name} column')
+        values = np.asarray(columns.get(name, OPTIONAL_COLUMNS.get(name,
+            0.0)), dtype = float)
+        if values.ndim == (2 if width > 1 else 1) and count is None:
+            count = len(values)
+        arrays[name] = values
+    count = count or 0
+    for name, width in widths.items():
+        shape = (count, width) if width > 1 else (count,)
+        try:
+            arrays[name] = np.broadcast_to(arrays[name], shape)
+        except ValueError:
+            raise ValueError(f'Scene {kind} column {name} has shape'
+                f' {arrays[name].shape}, expected {shape}') from None
+    return arrays
+
+def scene_arrays(scene: dict) -> dict:
+    """scene with every kind as float arrays, checked and broadcast.
+
+    A scene has an optional boundary [[x1, y1], [x2, y2]], an optional
+    meterGrid [nCol, nRow] and meters list of points, and balls and
+    satellites as dicts of the columns in BALL_COLUMNS and
+    SATELLITE_COLUMNS."""
+    if scene.get('version', VERSION) != VERSION:
+        raise ValueError(f'Not a version {VERSION} scene')
+    arrays = {'version': VERSION,
+        'meters': np.asarray(scene.get('meters', []),
+            dtype = float).reshape(-1, 2),
+        'balls': kind_arrays('balls', scene.get('balls', {}), BALL_COLUMNS),
+        'satellites': kind_arrays('satellites', scene.get('satellites', {}),
+            SATELLITE_COLUMNS)}
+    for name in ('boundary', 'meterGrid'):
+        if scene.get(name) is not None:
+            arrays[name] = np.asarray(scene[name], dtype = float)
+    return arrays
+
+def load_scene(path: str) -> dict:
+    """Reads a .json or .npz scene file as scene_arrays()."""
+    if path.endswith('.npz'):
+        scene = {'balls': {}, 'satellites': {}}
+        with np.load(path) as file:
+            for key in file.files:
+                kind, dot, name = key.partition('.')
+                if dot:
+                    scene[kind][name] = file[key]
+                else:
+                    scene[key] = file[key]
+        scene['version'] = int(scene.get('version', VERSION))
+    else:
+        with open(path) as file:
+            scene = json.load(file)
+    return scene_arrays(scene)
+
+def save_scene(scene: dict, path: str) -> None:
+    """Writes scene to path, as .npz arrays or else as JSON.
+
+    JSON keeps small scenes readable and editable, .npz stores large ones
+    compactly with columns saved as e.g. balls.xy."""
+    scene = scene_arrays(scene)
+    if path.endswith('.npz'):
+        columns = {f'{kind}.{name}': values for kind in ('balls',
+            'satellites') for name, values in scene[kind].items()}
+        for name in ('version', 'boundary', 'meterGrid', 'meters'):
+            if name in scene:
+                columns[name] = scene[name]
+        # A file object, so numpy does not add its own extension
+        with open(path, 'wb') as file:
+            np.savez(file, **columns)
+        return None
+    plain = {name: scene[name].tolist() if hasattr(scene[name], 'tolist')
+        else scene[name] for name in scene if name not in ('balls',
+        'satellites')}
+    for kind in ('balls', 'satellites'):
+        plain[kind] = {name: values.tolist()
+            for name, values in scene[kind].items()}
+    with open(path, 'w') as file:
+        file.write(json.dumps(plain, separators = (',', ':')))
+    return None
+
+def world_scene(world: "World") -> dict:
+    """The balls, satellites and meters of world as a scene.
+
+    Only what the scene format holds is kept: positions, velocities and
+    the properties of every body, not clocks or integrator state, see
+    checkpoints.py for those."""
+    balls = objects_of_kind(world.objs, 'balls')
+    satellites = objects_of_kind(world.objs, 'satellites')
+    return scene_arrays({'boundary': [list(world.boundary.xy1),
+            list(world.boundary.xy2)],
+        'meters': [list(obj.xy_current)
+            for obj in objects_of_kind(world.objs, 'meters')],
+        'balls': {name: [list(value) if width > 1 else value
+                for value in (getattr(obj, attribute) for obj in balls)]
+            for name, width, attribute in (('xy', 2, 'xy_current'),
+                ('radius', 1, 'radius'), ('mass', 1, 'mass'),
+                ('charge', 1, 'charge'), ('velocity', 2, 'velocity0'))},
+        'satellites': {name: [getattr(obj, name) for obj in satellites]
+            for name in SATELLITE_COLUMNS}})
+
+def populate_scene(world: "World", scene: dict, meters: bool = True
+        ) -> "World":
+    """Adds every meter, satellite and ball of scene to world.
+
+    Each kind is added with one bulk call, which the array engine fills
+    in one vectorized pass. Satellites orbit the world center. A scene
+    boundary has to match the world's. meters = False leaves the field
+    meters out, e.g. for the raster field display."""
+    scene = scene_arrays(scene)
+    if 'boundary' in scene and scene['boundary'].tolist() \
+            != [list(world.boundary.xy1), list(world.boundary.xy2)]:
+        raise ValueError(f'Scene boundary {scene["boundary"].tolist()} does'
+            ' not match the world')
+    if meters:
+        if 'meterGrid' in scene:
+            nCol, nRow = scene['meterGrid'].astype(int).tolist()
+            world.add_field_grid(nCol, nRow)
+        for xy in scene['meters'].tolist():
+            world.add_object(world.fieldClass(xy))
+
+    satellites = scene['satellites']
+    world.add_satellites(satellites['radius'], satellites['mass'],
+        satellites['charge'], satellites['omega'],
+        satellites['orbitRadius'], satellites['angle'])
+    balls = scene['balls']
+    world.add_balls(balls['xy'], balls['radius'], balls['mass'],
+        balls['charge'], balls['velocity'])
+    return world
@@ -0,0 +1,114 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Runs the physics on a worker thread. The worker publishes a
+         snapshot of every shape after each frame and takes world changes
+         from a command queue, so drawing and input never wait for physics.
+"""
+
+import queue
+import threading
+import time
+import physics_core
+from physics_core import objects_of_kind
+
+class Snapshot:
+    """Drawable state of the world after one frame of physics.
+
+    states holds (object, object.shape_state()) for every ball,
+    satellite and field meter, removals the number of objects the world
+    had removed. A snapshot is never changed once published."""
+    def __init__(self, steps: int, simulationTime: float, states: list,
+            removals: int = 0):
+        self.steps = steps
+        self.time = simulationTime
+        self.states = states
+        self.removals = removals
+
+class SimulationThread:
+    """Steps a world with a FixedStepper on its own thread.
+
+    Double-buffered: the worker builds the next snapshot while the render
+    side reads the last one, then swaps it in with a single assignment.
+    Anything that changes the world must go through submit(), the worker
+    runs it between steps."""
+    def __init__(self, world: physics_core.World, dt: float,
+            maxSubsteps: int = 8, realClock = time.perf_counter):
+        self.world = world
+        self.stepper = physics_core.FixedStepper(world, dt, maxSubsteps,
+            realClock)
+        self.commands = queue.SimpleQueue()
+        self.snapshot = None
+        self.steps = 0
+        self.error = None
+        self.running = False
+        self.thread = None
+
+    def start(self) -> None:
+        """Publishes the starting state and starts the worker."""
+        self.publish()
+        # Time spent setting up is not owed to the physics
+        self.stepper.lastTime = self.stepper.realClock()
+        self.running = True
+        self.thread = threading.Thread(target = self.run, name = 'physics',
+            daemon = True)
+        self.thread.start()
+        return None
+
+    def stop(self, timeout: float = None) -> None:
+        """Asks the worker to finish and waits for it."""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout)
+        return None
+
+    def submit(self, function, *args) -> None:
+        """Queues function(*args) to run on the worker between steps."""
+        self.commands.put((function, args))
+        return None
+
+    def latest(self) -> Snapshot:
+        """The last published snapshot.
+
+        Raises RuntimeError once the worker has stopped on an error."""
+        if self.error is not None:
+            raise RuntimeError('Simulation thread stopped') from self.error
+        return self.snapshot
+
+    def run_commands(self) -> int:
+        """Runs every queued command, returns how many ran."""
+        count = 0
+        while True:
+            try:
+                function, args = self.commands.get_nowait()
+            except queue.Empty:
+                return count
+            function(*args)
+            count += 1
+
+    def publish(self) -> None:
+        """Swaps in a snapshot of the current state."""
+        states = []
+        for kind in ('sources', 'meters'):
+            for obj in objects_of_kind(self.world.objs, kind):
+                states.append((obj, obj.shape_state()))
+        self.snapshot = Snapshot(self.steps, self.world.clock(), states,
+            self.world.removals)
+        return None
+
+    def run(self) -> None:
+        """Worker loop: commands, physics steps, snapshot, sleep."""
+        try:
+            while self.running:
+                changed = self.run_commands()
+                steps = self.stepper.frame()
+                self.steps += steps
+                if steps > 0 or changed > 0:
+                    self.publish()
+                # Sleep until the next step is due
+                time.sleep(max(self.stepper.dt - self.stepper.accumulator,
+                    0))
+        except Exception as error:
+            self.error = error
+            self.running = False
+        return None
@@ -0,0 +1,107 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Uniform grid (spatial hash) broad phase for ball collisions.
+         Balls only run the distance check against balls and satellites
+         in their own and adjacent cells.
+"""
+
+import math
+from physics_core import objects_of_kind
+
+class SpatialHash:
+    """Buckets balls and satellites into square cells.
+
+    The cell size defaults to 2 x the largest radius, so any overlapping
+    pair is in the same or an adjacent cell."""
+    def __init__(self, cellSize: float = None):
+        self.fixedCellSize = cellSize
+        self.cellSize = cellSize if cellSize is not None else 1
+        self.maxRadius = 0
+        self.cells = {}
+        self.cellOf = {}
+        self.order = {}
+        self.boundaries = []
+
+        # Counters for the last step
+        self.bodies = 0
+        self.queries = 0
+        self.candidatePairs = 0
+
+    def cell_key(self, xy: list) -> tuple:
+        """Cell coordinates that contain the point xy."""
+        return (math.floor(xy[0] / self.cellSize),
+            math.floor(xy[1] / self.cellSize))
+
+    def rebuild(self, objects: list) -> None:
+        """Buckets every ball and satellite at its current position.
+
+        Also resets the pair counters for a new step."""
+        self.cells = {}
+        self.cellOf = {}
+        self.order = {}
+        self.boundaries = objects_of_kind(objects, 'boundaries')
+        bodies = objects_of_kind(objects, 'sources')
+
+        self.maxRadius = max([obj.radius for obj in bodies], default = 0)
+        if self.fixedCellSize is not None:
+            self.cellSize = self.fixedCellSize
+        else:
+            self.cellSize = max(2 * self.maxRadius, 1)
+
+        for i, obj in enumerate(bodies):
+            # Insertion order keeps collision results the same as a full scan
+            self.order[id(obj)] = i
+            self.insert(obj)
+        self.bodies = len(bodies)
+        self.queries = 0
+        self.candidatePairs = 0
+        return None
+
+    def insert(self, obj: "Ball | Satellite") -> None:
+        """Adds obj to the cell of its current position."""
+        key = self.cell_key(obj.xy_current)
+        self.cells.setdefault(key, []).append(obj)
+        self.cellOf[id(obj)] = key
+        return None
+
+    def move(self, obj: "Ball | Satellite") -> None:
+        """Moves obj to a new cell after its position was updated."""
+        oldKey = self.cellOf.get(id(obj))
+        if oldKey is None:
+            return None
+        key = self.cell_key(obj.xy_current)
+        if key != oldKey:
+            cell = self.cells[oldKey]
+            cell.remove(obj)
+            if not cell:
+                del self.cells[oldKey]
+            self.cells.setdefault(key, []).append(obj)
+            self.cellOf[id(obj)] = key
+        return None
+
+    def neighbours(self, ball: "Ball") -> list:
+        """Balls and satellites that could overlap ball at XY_next.
+
+        Returned in the same order as the world's object list."""
+        reach = ball.radius + self.maxRadius
+        low = self.cell_key([ball.XY_next[0] - reach, ball.XY_next[1] - reach])
+        high = self.cell_key([ball.XY_next[0] + reach,
+            ball.XY_next[1] + reach])
+        candidates = []
+        for i in range(low[0], high[0] + 1):
+            for j in range(low[1], high[1] + 1):
+                for obj in self.cells.get((i, j), ()):
+                    if obj is not ball:
+                        candidates.append(obj)
+        candidates.sort(key = lambda obj: self.order[id(obj)])
+        self.queries += 1
+        self.candidatePairs += len(candidates)
+        return candidates
+
+    def stats(self) -> dict:
+        """Pair counts of the last step, to compare against all pairs."""
+        return {'bodies': self.bodies, 'queries': self.queries,
+            'candidatePairs': self.candidatePairs,
+            'allPairs': self.queries * max(self.bodies - 1, 0),
+            'cellSize': self.cellSize}
@@ -0,0 +1,291 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Headless parameter sweeps over the lab scene. Runs a grid or a
+         random sample of setup() parameters as seeded simulations on a
+         process pool and streams one summary line per run to a JSON
+         Lines file, so an interrupted sweep can resume where it stopped.
+
+Usage:
+    python3 sweeps.py run --grid chargeSatellite=1,5,10 --grid balls=4,40
+    python3 sweeps.py run --random 50 --range massBall=0.05:0.5 --resume
+    python3 sweeps.py summary sweep.jsonl
+"""
+
+import argparse
+import concurrent.futures
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+import physics_core
+import spatial_hash
+
+# Swept parameters and their setup() defaults. orbitScale multiplies the
+# three orbit radii, balls is the total ball count, at least the lab's 4.
+PARAMETERS = {'chargeSatellite': 5, 'chargeBall': 0.5, 'massBall': 0.1,
+    'massSatellite': 5, 'omegaBall': 0.2, 'orbitScale': 1.0, 'balls': 4}
+ORBIT_RADII = (300, 280, 320)
+
+def parse_values(text: str) -> tuple:
+    """'name=1,2,3' as ('name', [1.0, 2.0, 3.0])."""
+    name, values = text.split('=', 1)
+    if name not in PARAMETERS:
+        raise argparse.ArgumentTypeError(f'Unknown parameter: {name}')
+    return name, [float(value) for value in values.split(',')]
+
+def parse_range(text: str) -> tuple:
+    """'name=low:high' as ('name', low, high)."""
+    name, values = parse_values(text.replace(':', ','))
+    if len(values) != 2:
+        raise argparse.ArgumentTypeError(f'Expected name=low:high: {text}')
+    return name, values[0], values[1]
+
+def make_runs(grid: list, ranges: list, samples: int, seed: int,
+        repeats: int) -> list:
+    """Every run of the sweep, with its parameters and seed.
+
+    Grid values are combined in full. With samples, each run draws the
+    range parameters uniformly. Each point runs repeats times."""
+    rng = random.Random(seed)
+    names = [name for name, values in grid]
+    points = [dict(zip(names, values))
+        for values in itertools.product(*[values for name, values in grid])]
+    if samples:
+        sampled = []
+        for point in points:
+            for i in range(samples):
+                drawn = dict(point)
+                for name, low, high in ranges:
+                    drawn[name] = rng.uniform(low, high)
+                sampled.append(drawn)
+        points = sampled
+
+    runs = []
+    for point in points:
+        for repeat in range(repeats):
+            params = dict(PARAMETERS)
+            params.update(point)
+            params['balls'] = int(params['balls'])
+            run = {'params': params, 'seed': seed + len(runs)}
+            run['id'] = run_id(run)
+            runs.append(run)
+    return runs
+
+def run_id(run: dict) -> str:
+    """Stable name of a run, used to skip finished runs on resume."""
+    params = ','.join(f'{name}={run["params"][name]:g}'
+        for name in sorted(run['params']))
+    return f'{params};seed={run["seed"]}'
+
+def make_world(params: dict, seed: int, engine: str) -> physics_core.World:
+    """The lab scene with the run's parameters and seeded extra balls."""
+    rng = random.Random(seed)
+    if engine == 'arrays':
+        # NumPy is only needed for the array engine
+        import particle_arrays
+        world = particle_arrays.ArrayWorld([0, 0], [720, 720],
+            physics_core.SimulationClock())
+    else:
+        world = physics_core.World([0, 0], [720, 720],
+            physics_core.SimulationClock())
+    world.set_collision_grid(spatial_hash.SpatialHash())
+    physics_core.populate_default_scene(world,
+        massBall = params['massBall'],
+        massSatellite = params['massSatellite'],
+        chargeBall = params['chargeBall'],
+        chargeSatellite = params['chargeSatellite'],
+        omegaBall = params['omegaBall'], nColMeter = 0, nRowMeter = 0,
+        orbitRadii = [radius * params['orbitScale']
+            for radius in ORBIT_RADII])
+
+    # Balls beyond the lab's four, like clicks at random spots
+    for i in range(params['balls'] - 4):
+        world.add_ball([rng.uniform(10, 710), rng.uniform(10, 710)], 5,
+            params['massBall'], params['chargeBall'] * rng.choice([-1, 0, 1]))
+    return world
+
+def run_simulation(run: dict, steps: int, dt: float, engine: str,
+        trapDistance: float, sampleEvery: int) -> dict:
+    """Runs one simulation and summarizes it.
+
+    A ball is trapped when its mean distance to the nearest satellite
+    over the second half of the run is under trapDistance. It escaped
+    when it ever went further from the center than the outermost orbit
+    plus two satellite radii."""
+    startTime = time.perf_counter()
+    params = run['params']
+    world = make_world(params, run['seed'], engine)
+    balls = list(physics_core.objects_of_kind(world.objs, 'balls'))
+    satellites = list(physics_core.objects_of_kind(world.objs, 'satellites'))
+    center = world.centerPlayground
+    escapeDistance = max(ORBIT_RADII) * params['orbitScale'] + 20
+
+    escaped = [False] * len(balls)
+    nearestSum = [0] * len(balls)
+    samples = 0
+    for step in range(1, steps + 1):
+        world.step(dt)
+        if step % sampleEvery != 0:
+            continue
+        for i, ball in enumerate(balls):
+            if physics_core.dist(ball.xy_current, center) > escapeDistance:
+                escaped[i] = True
+            if step > steps / 2:
+                nearestSum[i] += min(physics_core.dist(ball.xy_current,
+                    satellite.xy_current) for satellite in satellites)
+        if step > steps / 2:
+            samples += 1
+
+    trapped = [total / max(samples, 1) < trapDistance
+        for total in nearestSum]
+    speeds = [math.hypot(ball.velocity1[0], ball.velocity1[1])
+        for ball in balls]
+    seconds = time.perf_counter() - startTime
+    return {'id': run['id'], 'params': params, 'seed': run['seed'],
+        'engine': engine, 'steps': steps, 'dt': dt,
+        'trappedFraction': sum(trapped) / max(len(balls), 1),
+        'escapedFraction': sum(escaped) / max(len(balls), 1),
+        'meanSpeed': sum(speeds) / max(len(speeds), 1),
+        'seconds': seconds, 'stepsPerSecond': steps / seconds}
+
+def limit_memory(memoryMB: int) -> None:
+    """Caps the address space of a worker process, where supported."""
+    try:
+        import resource
+    except ImportError:
+        # No resource module on Windows, workers run without a cap
+        return None
+    limit = memoryMB * 2**20
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    return None
+
+def run_safely(run: dict, *settings) -> dict:
+    """run_simulation(), with a failure turned into a result line."""
+    try:
+        return run_simulation(run, *settings)
+    except MemoryError:
+        return {'id': run['id'], 'params': run['params'],
+            'seed': run['seed'], 'error': 'memory cap exceeded'}
+    except Exception as error:
+        return {'id': run['id'], 'params': run['params'],
+            'seed': run['seed'], 'error': repr(error)}
+
+def finished_ids(output: str) -> set:
+    """Ids of the runs already in the results file."""
+    done = set()
+    if not os.path.exists(output):
+        return done
+    with open(output) as file:
+        for line in file:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # Last line cut off by the interruption
+                continue
+            if 'error' not in result:
+                done.add(result['id'])
+    return done
+
+def run_sweep(runs: list, output: str, resume: bool, workers: int,
+        memoryMB: int, *settings) -> int:
+    """Runs the sweep on a process pool, appending results as they finish.
+
+    Returns the number of runs that failed."""
+    if resume:
+        done = finished_ids(output)
+        runs = [run for run in runs if run['id'] not in done]
+        print(f'{len(done)} runs already done', flush = True)
+    elif os.path.exists(output):
+        os.remove(output)
+
+    failures = 0
+    # Fresh workers every few runs keep worker memory flat. Python before
+    # 3.11 has no max_tasks_per_child, there only --memory-mb caps them.
+    recycle = {'max_tasks_per_child': 8} \
+        if sys.version_info >= (3, 11) else {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers = workers,
+            initializer = limit_memory, initargs = (memoryMB,),
+            **recycle) as pool, open(output, 'a') as file:
+        futures = [pool.submit(run_safely, run, *settings) for run in runs]
+        for count, future in enumerate(
+                concurrent.futures.as_completed(futures), 1):
+            result = future.result()
+            file.write(json.dumps(result) + '\n')
+            file.flush()
+            failures += 'error' in result
+            status = result.get('error') or \
+                f"trapped {result['trappedFraction']:.2f} " \
+                f"escaped {result['escapedFraction']:.2f}"
+            print(f'{count}/{len(runs)} {result["id"]}: {status}',
+                flush = True)
+    return failures
+
+def summary(output: str) -> None:
+    """Mean trapped and escaped fractions for every parameter value."""
+    with open(output) as file:
+        results = [json.loads(line) for line in file if line.strip()]
+    results = [result for result in results if 'error' not in result]
+    print(f'{len(results)} finished runs')
+    for name in PARAMETERS:
+        values = sorted({result['params'][name] for result in results})
+        if len(values) < 2:
+            continue
+        for value in values:
+            rows = [result for result in results
+                if result['params'][name] == value]
+            trapped = sum(row['trappedFraction'] for row in rows) / len(rows)
+            escaped = sum(row['escapedFraction'] for row in rows) / len(rows)
+            print(f'{name:>16} = {value:<10g} runs {len(rows):4} '
+                f'trapped {trapped:.3f} escaped {escaped:.3f}')
+    return None
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description = 'Headless parameter sweeps over the lab scene.')
+    commands = parser.add_subparsers(dest = 'command', required = True)
+
+    run = commands.add_parser('run', help = 'run a sweep')
+    run.add_argument('--grid', type = parse_values, action = 'append',
+        default = [], help = 'name=v1,v2,... all combinations are run')
+    run.add_argument('--range', type = parse_range, action = 'append',
+        default = [], help = 'name=low:high sampled uniformly')
+    run.add_argument('--random', type = int, default = 0,
+        help = 'random samples per grid point')
+    run.add_argument('--repeats', type = int, default = 1,
+        help = 'runs per point, each with its own seed')
+    run.add_argument('--output', default = 'sweep.jsonl')
+    run.add_argument('--resume', action = 'store_true',
+        help = 'skip runs already in the output file')
+    run.add_argument('--seed', type = int, default = 2024)
+    run.add_argument('--steps', type = int, default = 1200)
+    run.add_argument('--dt', type = float, default = 1 / 120)
+    run.add_argument('--engine', choices = ('objects', 'arrays'),
+        default = 'objects')
+    run.add_argument('--trap-distance', type = float, default = 60)
+    run.add_argument('--sample-every', type = int, default = 10)
+    run.add_argument('--workers', type = int, default = os.cpu_count())
+    run.add_argument('--memory-mb', type = int, default = 2048,
+        help = 'address space cap per worker process')
+
+    report = commands.add_parser('summary', help = 'summarize a results file')
+    report.add_argument('output')
+
+    args = parser.parse_args()
+    if args.command == 'summary':
+        summary(args.output)
+        return 0
+    if args.range and not args.random:
+        parser.error('--range needs --random')
+    runs = make_runs(args.grid, args.range, args.random, args.seed,
+        args.repeats)
+    failures = run_sweep(runs, args.output, args.resume, args.workers,
+        args.memory_mb, args.steps, args.dt, args.engine,
+        args.trap_distance, args.sample_every)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
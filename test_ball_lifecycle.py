@@ -0,0 +1,116 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Tests of the ball pool, culling and packed array rows, run with
+         pytest.
+"""
+
+import numpy as np
+import pytest
+import physics_core
+import particle_arrays
+import ball_lifecycle
+
+ENGINES = [physics_core.World, particle_arrays.ArrayWorld]
+
+class FakeClock:
+    """World time that only moves when a test says so."""
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.mark.parametrize('worldClass', ENGINES)
+def test_spawn_reuses_retired_balls(worldClass):
+    world = worldClass([0, 0], [720, 720], physics_core.SimulationClock())
+    pool = ball_lifecycle.BallPool(world)
+    first = pool.spawn([100, 100], 5, 0.1, 0)
+    pool.spawn([200, 100], 5, 0.1, 0)
+    objectId = first.objectId
+    pool.retire(first)
+    assert first not in world.objs.balls
+
+    ball = pool.spawn([300, 400], 3, 0.5, -0.5, [10, -20])
+    assert ball is first
+    assert ball.objectId != objectId
+    assert not pool.alive(ball, objectId)
+    assert list(ball.xy_current) == [300, 400]
+    assert list(ball.velocity0) == [10, -20]
+    assert (ball.radius, ball.mass, ball.charge) == (3, 0.5, -0.5)
+    # Drawn with its new radius and color, not the retired ball's
+    assert ball.shape_state() == (300, 400, 3, 'red')
+    assert pool.stats() == {'balls': 2, 'free': 0, 'spawned': 3,
+        'reused': 1, 'retired': 1}
+
+@pytest.mark.parametrize('worldClass', ENGINES)
+def test_cull_retires_old_balls_and_balls_outside(worldClass):
+    clock = FakeClock()
+    world = worldClass([0, 0], [720, 720], clock)
+    pool = ball_lifecycle.BallPool(world, lifetime = 2,
+        region = [[50, 50], [670, 670]], capacity = 1)
+    old = pool.spawn([100, 100], 5, 0.1, 0)
+    clock.now = 1
+    young = pool.spawn([200, 100], 5, 0.1, 0)
+    edge = world.add_ball([20, 360], 5, 0.1, 0)
+    assert pool.cull() == 1
+    assert pool.free == [edge]
+
+    clock.now = 2
+    assert pool.cull() == 1
+    assert old not in world.objs.balls and young in world.objs.balls
+    # The free list is full, so the old ball is dropped
+    assert pool.free == [edge]
+
+    # A ball retired and spawned again starts a new lifetime
+    assert pool.spawn([300, 300], 5, 0.1, 0) is edge
+    pool.retire(young)
+    assert pool.spawn([300, 300], 5, 0.1, 0) is young
+    clock.now = 3.5
+    assert pool.cull() == 0
+    clock.now = 4
+    assert pool.cull() == 2
+    assert pool.stats() == {'balls': 0, 'free': 1, 'spawned': 4,
+        'reused': 2, 'retired': 5}
+
+@pytest.mark.parametrize('worldClass', ENGINES)
+def test_retire_at_picks_the_closest_ball(worldClass):
+    world = worldClass([0, 0], [720, 720], physics_core.SimulationClock())
+    world.add_satellite(10, 5, 5, 0.2, 0, 0)
+    pool = ball_lifecycle.BallPool(world)
+    far = pool.spawn([100, 100], 10, 0.1, 0)
+    near = pool.spawn([108, 100], 10, 0.1, 0)
+    # The satellite sits at the center and is never picked
+    assert not pool.retire_at([360, 360])
+    assert pool.retire_at([105, 100])
+    assert pool.free == [near]
+    assert pool.retire_at([95, 100])
+    assert pool.free == [near, far]
+
+def test_array_rows_stay_packed_after_removals():
+    world = particle_arrays.ArrayWorld([0, 0], [720, 720],
+        physics_core.SimulationClock())
+    pool = ball_lifecycle.BallPool(world)
+    balls = [pool.spawn([10 + i, 20], 1, 0.1, 0) for i in range(6)]
+    particles = world.particles
+    pool.retire(balls[1])
+    # The last row moves into the freed one
+    assert particles.count == 5
+    assert balls[5].row == 1
+    assert particles.objects == [balls[0], balls[5], balls[2], balls[3],
+        balls[4]]
+    assert particles.xy[:, 0].tolist() == [10, 15, 12, 13, 14]
+    assert not particles._xy[5].any()
+    # The retired view has no row, so it cannot touch the moved ball's
+    assert balls[1].row is None
+    with pytest.raises(ValueError):
+        balls[1].xy_current[0] = 500
+    with pytest.raises(ValueError):
+        balls[1].charge
+    assert particles.xy[1].tolist() == [15, 20]
+
+    respawned = pool.spawn([99, 98], 2, 0.3, 0)
+    assert respawned is balls[1] and respawned.row == 5
+    for ball in particles.objects:
+        assert np.array_equal(particles.xy[ball.row], ball.xy_current)
+    assert particles.radius[5] == 2
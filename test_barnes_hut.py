@@ -0,0 +1,81 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Tests of the Barnes-Hut quadtree force solver, run with pytest.
+"""
+
+import math
+import random
+import pytest
+import physics_core
+import barnes_hut
+
+def make_world(nBalls: int, seed: int = 0) -> physics_core.World:
+    rng = random.Random(seed)
+    world = physics_core.World([0, 0], [720, 720],
+        physics_core.SimulationClock())
+    physics_core.populate_default_scene(world, nColMeter = 4, nRowMeter = 4)
+    for i in range(nBalls):
+        world.add_ball([rng.uniform(10, 710), rng.uniform(10, 710)], 3,
+            rng.uniform(0.05, 1), rng.choice([-0.5, 0, 0.5]))
+    return world
+
+def solver_error(theta: float) -> float:
+    """Largest force error of a solver over every ball and meter."""
+    world = make_world(200)
+    solver = barnes_hut.BarnesHutSolver(theta)
+    solver.prepare(world.objs, world.boundary)
+    worst = 0
+    for obj in world.objs.balls + world.objs.meters:
+        gForce, eForce = solver.forces(obj)
+        gExpected = obj.g_force(world.objs)
+        eExpected = obj.e_force(world.objs)
+        for force, expected in ((gForce, gExpected), (eForce, eExpected)):
+            size = math.hypot(*expected)
+            error = math.hypot(force[0] - expected[0],
+                force[1] - expected[1])
+            worst = max(worst, error / size if size > 0 else error)
+    return worst
+
+def test_theta_zero_is_the_direct_sum():
+    assert solver_error(0) < 1e-12
+
+def test_small_theta_stays_close():
+    assert solver_error(0.3) < 0.05
+
+def test_world_steps_like_direct_sums_at_theta_zero():
+    direct = make_world(50, seed = 1)
+    tree = make_world(50, seed = 1)
+    # Both sum the forces from the positions at the start of the step
+    direct.set_update_order('two-phase')
+    tree.set_update_order('two-phase')
+    tree.set_force_solver(barnes_hut.BarnesHutSolver(0))
+    for i in range(30):
+        direct.step(1 / 120)
+        tree.step(1 / 120)
+    for obj, other in zip(direct.objs.sources, tree.objs.sources):
+        assert physics_core.dist(obj.xy_current, other.xy_current) < 1e-9
+
+def test_bodies_on_one_spot_do_not_split_forever():
+    solver = barnes_hut.BarnesHutSolver(0.5, leafSize = 2, maxDepth = 10)
+    bodies = [(i, 100.0, 100.0, 1.0, 1.0) for i in range(20)]
+    solver.build(bodies + [('far', 500.0, 500.0, 2.0, -1.0)], [0, 0],
+        [720, 720])
+    gForce, eForce = solver.forces_at(100, 500, 1, 1)
+    d = 400
+    # 20 unit masses straight up and 2 to the right, all 400 away
+    assert math.isclose(gForce[0], 2 * 400 / d)
+    assert math.isclose(gForce[1], -20 * 400 / d)
+
+def test_cells_holding_the_point_are_always_opened():
+    # With theta this large the root would be summarized with the body
+    # in it, or divide by zero where the summary sits on the body
+    solver = barnes_hut.BarnesHutSolver(3, leafSize = 1)
+    solver.build([('a', 100, 100, 1, 1), ('b', 110, 100, 1, 1)], [0, 0],
+        [720, 720])
+    assert solver.forces_at(100, 100, 1, 1, 'a') == ([1, 0], [-1, 0])
+    solver.build([('a', 90, 100, 1, 1), ('b', 100, 100, 1, 1),
+        ('c', 110, 100, 1, 1)], [0, 0], [720, 720])
+    assert solver.forces_at(100, 100, 1, 1, 'b') == ([0, 0], [0, 0])
+    with pytest.raises(ValueError):
+        barnes_hut.BarnesHutSolver(-1)
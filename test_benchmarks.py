@@ -0,0 +1,73 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Tests of the benchmark runner and baseline comparison, run with
+         pytest.
+"""
+
+import json
+import benchmarks
+
+SMALL = {'engine': 'arrays', 'balls': 10, 'satellites': 3, 'meters': 2}
+
+def write_report(path, results: list) -> str:
+    with open(path, 'w') as file:
+        json.dump({'meta': {}, 'results': results}, file)
+    return str(path)
+
+def test_case_names_are_unique_in_a_suite():
+    for cases in benchmarks.SUITES.values():
+        names = [benchmarks.case_name(case) for case in cases]
+        assert len(names) == len(set(names))
+    assert benchmarks.case_name(dict(SMALL, solver = 'mesh')) == \
+        'arrays-b10-s3-m2-mesh'
+
+def test_scenes_are_seeded():
+    first = benchmarks.make_world(SMALL, 7)
+    second = benchmarks.make_world(SMALL, 7)
+    assert len(first.objs.balls) == 10
+    assert len(first.objs.meters) == 4
+    assert [list(ball.xy_current) for ball in first.objs.balls] == \
+        [list(ball.xy_current) for ball in second.objs.balls]
+
+def test_run_case_measures_a_small_scene():
+    for engine in ('objects', 'arrays'):
+        result = benchmarks.run_case(dict(SMALL, engine = engine), 1,
+            1 / 120, 0.01, 3)
+        assert 1 <= result['steps'] <= 3
+        assert result['stepsPerSecond'] > 0
+        assert result['peakMemoryMB'] > 0
+        assert result['phasesMs']
+
+def test_a_case_over_its_caps_becomes_an_error():
+    result = benchmarks.run_limited(SMALL, 4096, 60, 1, 1 / 120, 0.01, 2)
+    assert 'error' not in result
+    # Far more than one second of CPU time
+    big = dict(SMALL, balls = 20000, meters = 0)
+    result = benchmarks.run_limited(big, 4096, 1, 1, 1 / 120, 10, 200)
+    assert result == {'name': 'arrays-b20000-s3-m0',
+        'error': 'time cap exceeded or process killed'}
+
+def test_run_safely_reports_running_out_of_memory(monkeypatch):
+    def run_case(*args):
+        raise MemoryError
+    monkeypatch.setattr(benchmarks, 'run_case', run_case)
+    assert benchmarks.run_safely(SMALL, 1, 1 / 120, 0.01, 2) == \
+        {'name': 'arrays-b10-s3-m2', 'error': 'memory cap exceeded'}
+
+def test_compare_flags_regressions(tmp_path):
+    baseline = write_report(tmp_path / 'baseline.json', [
+        {'name': 'same', 'stepsPerSecond': 100, 'peakMemoryMB': 10},
+        {'name': 'slower', 'stepsPerSecond': 100, 'peakMemoryMB': 10},
+        {'name': 'bigger', 'stepsPerSecond': 100, 'peakMemoryMB': 10},
+        {'name': 'broken', 'stepsPerSecond': 100, 'peakMemoryMB': 10},
+        {'name': 'fixed', 'error': 'memory cap exceeded'}])
+    current = write_report(tmp_path / 'current.json', [
+        {'name': 'same', 'stepsPerSecond': 95, 'peakMemoryMB': 10.5},
+        {'name': 'slower', 'stepsPerSecond': 50, 'peakMemoryMB': 10},
+        {'name': 'bigger', 'stepsPerSecond': 100, 'peakMemoryMB': 20},
+        {'name': 'broken', 'error': 'memory cap exceeded'},
+        {'name': 'fixed', 'stepsPerSecond': 100, 'peakMemoryMB': 10},
+        {'name': 'new', 'stepsPerSecond': 100, 'peakMemoryMB': 10}])
+    assert benchmarks.compare(current, baseline, 0.1) == 3
+    assert benchmarks.compare(baseline, baseline, 0.1) == 0
@@ -0,0 +1,80 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Tests of block timesteps for the balls, run with pytest.
+"""
+
+import random
+import numpy as np
+import pytest
+import physics_core
+import particle_arrays
+import block_timesteps
+import collision_events
+
+def make_world(worldClass: type, blocks = None) -> physics_core.World:
+    world = worldClass([0, 0], [720, 720], physics_core.SimulationClock())
+    physics_core.populate_default_scene(world, nColMeter = 0, nRowMeter = 0)
+    rng = random.Random(0)
+    for i in range(20):
+        world.add_ball([rng.uniform(10, 710), rng.uniform(10, 710)], 3, 0.1,
+            rng.choice([-0.5, 0, 0.5]))
+    if blocks is not None:
+        world.set_block_timesteps(blocks)
+    for i in range(120):
+        world.step(1 / 60)
+    return world
+
+def largest_distance(world: physics_core.World,
+        other: physics_core.World) -> float:
+    return max(physics_core.dist(obj.xy_current, otherObj.xy_current)
+        for obj, otherObj in zip(world.objs.balls, other.objs.balls))
+
+def test_levels_follow_acceleration_and_jerk():
+    blocks = block_timesteps.BlockTimesteps(maxLevel = 6, eta = 0.01)
+    assert blocks.level_for(10, 0, 1 / 60) == 0
+    assert blocks.level_for(0, 5, 1 / 60) == 6
+    # Wanted step 0.01 x 10 / 30 = 1 / 300, so 1 / 60 is halved 3 times
+    assert blocks.level_for(10, 30, 1 / 60) == 3
+    assert blocks.level_for(10, 1e9, 1 / 60) == 6
+    acceleration = np.array([10, 0, 10, 10, 10.0])
+    jerk = np.array([0, 5, 30, 1e9, 1.0])
+    assert blocks.levels_for(acceleration, jerk, 1 / 60).tolist() == [
+        blocks.level_for(a, j, 1 / 60) for a, j in zip(acceleration, jerk)]
+
+def test_coarsest_level_lines_up_the_blocks():
+    blocks = block_timesteps.BlockTimesteps(maxLevel = 3)
+    assert [blocks.coarsest_level(substep) for substep in range(1, 9)] == \
+        [3, 2, 3, 1, 3, 2, 3, 0]
+
+@pytest.mark.parametrize('worldClass', [physics_core.World,
+    particle_arrays.ArrayWorld])
+def test_one_level_is_the_plain_step(worldClass):
+    plain = make_world(worldClass)
+    blocks = make_world(worldClass, block_timesteps.BlockTimesteps(0))
+    assert largest_distance(plain, blocks) < 1e-9
+
+@pytest.mark.parametrize('worldClass', [physics_core.World,
+    particle_arrays.ArrayWorld])
+def test_blocks_are_closer_to_fine_steps_for_less_work(worldClass):
+    plain = make_world(worldClass)
+    blocks = block_timesteps.BlockTimesteps(4)
+    adaptive = make_world(worldClass, blocks)
+    # A tiny eta puts every ball on the finest level
+    fine = block_timesteps.BlockTimesteps(4, eta = 1e-9)
+    finest = make_world(worldClass, fine)
+    assert largest_distance(adaptive, finest) < \
+        largest_distance(plain, finest) / 1.5
+    assert blocks.stats()['forceEvaluations'] < \
+        fine.stats()['forceEvaluations'] / 4
+    assert abs(blocks.stats()['simulatedTime'] - 2) < 1e-9
+
+def test_blocks_and_collision_events_do_not_mix():
+    world = physics_core.default_world()
+    world.set_block_timesteps(block_timesteps.BlockTimesteps())
+    with pytest.raises(ValueError):
+        world.set_collision_events(collision_events.EventCollider())
+    world = physics_core.default_world()
+    world.set_collision_events(collision_events.EventCollider())
+    with pytest.raises(ValueError):
+        world.set_block_timesteps(block_timesteps.BlockTimesteps())
@@ -0,0 +1,88 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Tests of world checkpoints, run with pytest.
+"""
+
+import json
+import os
+import random
+import pytest
+import physics_core
+import particle_arrays
+import spatial_hash
+import block_timesteps
+import checkpoints
+
+def make_world(worldClass: type, integrator: str, blocks: bool,
+        populate: bool = True) -> physics_core.World:
+    world = worldClass([0, 0], [720, 720], physics_core.SimulationClock())
+    world.set_collision_grid(spatial_hash.SpatialHash())
+    world.set_integrator(integrator)
+    if blocks:
+        world.set_block_timesteps(block_timesteps.BlockTimesteps(4))
+    if populate:
+        physics_core.populate_default_scene(world, nColMeter = 3,
+            nRowMeter = 3)
+        rng = random.Random(5)
+        for i in range(30):
+            world.add_ball([rng.uniform(10, 710), rng.uniform(10, 710)], 5,
+                0.1, 0.5 * rng.choice([-1, 0, 1]))
+    return world
+
+@pytest.mark.parametrize('worldClass', [physics_core.World,
+    particle_arrays.ArrayWorld])
+@pytest.mark.parametrize('integrator', ['euler', 'verlet'])
+@pytest.mark.parametrize('blocks', [False, True])
+def test_restored_run_continues_exactly(worldClass, integrator, blocks,
+        tmp_path):
+    path = str(tmp_path / 'checkpoint.json')
+    saved = make_world(worldClass, integrator, blocks)
+    for i in range(60):
+        saved.step(1 / 120)
+    rng = random.Random(1)
+    rng.random()
+    checkpoints.save_checkpoint(saved, path, rng, {'massBall': 0.1})
+    for i in range(60):
+        saved.step(1 / 120)
+
+    # The integrator comes from the checkpoint
+    restored = make_world(worldClass, 'euler', blocks, populate = False)
+    restoredRng = random.Random()
+    extra = checkpoints.restore_checkpoint(path, restored, restoredRng)
+    for i in range(60):
+        restored.step(1 / 120)
+    assert extra == {'massBall': 0.1}
+    assert restoredRng.random() == rng.random()
+    assert restored.clock.now == saved.clock.now
+    assert checkpoints.world_state(restored) == \
+        checkpoints.world_state(saved)
+
+def test_checkpoints_need_a_simulation_clock():
+    world = physics_core.World([0, 0], [720, 720])
+    with pytest.raises(ValueError):
+        checkpoints.world_state(world)
+
+def test_restore_needs_an_empty_matching_world(tmp_path):
+    path = str(tmp_path / 'checkpoint.json')
+    checkpoints.save_checkpoint(physics_core.default_world(), path)
+    with pytest.raises(ValueError):
+        checkpoints.restore_checkpoint(path, physics_core.default_world())
+    other = physics_core.World([0, 0], [500, 500],
+        physics_core.SimulationClock())
+    with pytest.raises(ValueError):
+        checkpoints.restore_checkpoint(path, other)
+
+def test_save_replaces_the_file_in_one_go(tmp_path):
+    path = str(tmp_path / 'checkpoint.json')
+    world = physics_core.default_world()
+    checkpoints.save_checkpoint(world, path)
+    world.step(1 / 60)
+    checkpoints.save_checkpoint(world, path)
+    assert not os.path.exists(path + '.tmp')
+    with open(path) as file:
+        assert json.load(file)['clock'] == world.clock.now
+    with open(path, 'w') as file:
+        json.dump({'version': 0}, file)
+    with pytest.raises(ValueError):
+        checkpoints.load_checkpoint(path)
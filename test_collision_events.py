@@ -0,0 +1,112 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Tests of continuous collision detection, run with pytest.
+"""
+
+import random
+import pytest
+import physics_core
+import particle_arrays
+import collision_events
+
+BOX = [(0, 0, 200, 200)]
+
+class AllPairs(collision_events.EventCollider):
+    """Reschedules a bounced ball against every body."""
+    def reschedule(self, i: int, now: float) -> None:
+        for j in range(len(self.position)):
+            if j != i:
+                self.schedule_pair(i, j, now)
+        self.schedule_walls(i, now)
+        return None
+
+def test_wall_bounce_keeps_the_integrator_velocity():
+    collider = collision_events.EventCollider()
+    changed = collider.resolve([[190, 100]], [[210, 100]], [5], [1],
+        [True], BOX, 1.0, [[30, 4]])
+    # Hits x = 195 after a quarter of the step, then comes back
+    xy, velocity = changed[0]
+    assert xy == pytest.approx([180, 100])
+    assert velocity == [-30, 4]
+    assert collider.wallBounces == 1
+    # Without velocities the ball ends with its path velocity
+    xy, velocity = collider.resolve([[190, 100]], [[210, 100]], [5], [1],
+        [True], BOX, 1.0)[0]
+    assert velocity == [-20, 0]
+
+def test_head_on_balls_swap_velocities():
+    collider = collision_events.EventCollider()
+    changed = collider.resolve([[50, 100], [150, 100]],
+        [[150, 100], [50, 100]], [5, 5], [1, 1], [True, True], BOX, 1.0,
+        [[100, 0], [-100, 0]])
+    # They meet at 95 and 105 half way, then go back where they came from
+    assert changed[0][0] == pytest.approx([40, 100])
+    assert changed[1][0] == pytest.approx([160, 100])
+    assert changed[0][1] == pytest.approx([-100, 0])
+    assert changed[1][1] == pytest.approx([100, 0])
+    assert collider.collisions == 2
+
+def test_satellites_keep_their_path():
+    collider = collision_events.EventCollider()
+    changed = collider.resolve([[50, 100], [100, 100]],
+        [[150, 100], [100, 100]], [5, 10], [1, 5], [True, False], BOX, 1.0)
+    assert list(changed) == [0]
+    assert changed[0][0][0] < 100 - 15
+
+def test_candidates_give_the_same_result_as_all_pairs():
+    for trial in range(20):
+        rng = random.Random(trial)
+        n = 36
+        # Balls apart on a grid, heading anywhere, and one satellite
+        start = [[20 + 32 * (i % 6) + rng.uniform(-4, 4),
+            20 + 32 * (i // 6) + rng.uniform(-4, 4)] for i in range(n)]
+        end = [[x + rng.uniform(-60, 60), y + rng.uniform(-60, 60)]
+            for x, y in start]
+        start[14] = [70, 100]
+        end[14] = [130, 100]
+        radius = [rng.choice([2, 4, 8]) for i in range(n)]
+        mass = [rng.choice([0.1, 1, 5]) for i in range(n)]
+        isBall = [i != 14 for i in range(n)]
+        velocity = [[rng.uniform(-9, 9), rng.uniform(-9, 9)]
+            for i in range(n)]
+        candidates = collision_events.EventCollider()
+        expected = AllPairs().resolve(start, end, radius, mass, isBall, BOX,
+            1.0, velocity)
+        assert candidates.resolve(start, end, radius, mass, isBall, BOX,
+            1.0, velocity) == expected
+        assert candidates.events < candidates.maxEvents
+        assert candidates.candidatePairs < n * (n - 1) / 2
+
+def test_light_satellites_push_heavy_balls_away():
+    collider = collision_events.EventCollider()
+    changed = collider.resolve([[50, 100], [100, 100]],
+        [[150, 100], [110, 100]], [5, 10], [5, 0.1], [True, False], BOX,
+        1.0)
+    # They touch after 35 / 90 s, the formula leaves the ball at
+    # (4.9 x 100 + 0.2 x 10) / 5.1, still faster than the satellite, so
+    # it bounces back off it
+    when = 35 / 90
+    speed = 2 * 10 - (4.9 * 100 + 0.2 * 10) / 5.1
+    xy, velocity = changed[0]
+    assert collider.events == 1
+    assert xy == pytest.approx([50 + 100 * when + speed * (1 - when), 100])
+    assert velocity == pytest.approx([speed, 0])
+
+@pytest.mark.parametrize('worldClass', [physics_core.World,
+    particle_arrays.ArrayWorld])
+def test_fast_balls_do_not_pass_through(worldClass):
+    world = worldClass([0, 0], [720, 720], physics_core.SimulationClock())
+    world.set_collision_events(collision_events.EventCollider())
+    left = world.add_ball([300, 360], 5, 0.1, 0)
+    right = world.add_ball([420, 360], 5, 0.1, 0)
+    wall = world.add_ball([600, 100], 5, 0.1, 0)
+    # Each would move 300 pixels in one step, far past the other
+    left.velocity0[0] = 9000
+    right.velocity0[0] = -9000
+    wall.velocity0[0] = 9000
+    world.step(1 / 30)
+    assert left.xy_current[0] < right.xy_current[0]
+    assert left.velocity0[0] < 0 < right.velocity0[0]
+    assert 5 <= wall.xy_current[0] <= 715
+    assert wall.velocity0[0] < 0
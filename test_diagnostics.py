@@ -0,0 +1,98 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Tests of the per-step system diagnostics, run with pytest.
+"""
+
+import itertools
+import math
+import numpy as np
+import pytest
+import physics_core
+import particle_arrays
+import diagnostics
+
+def test_potential_sums_every_pair_with_a_ball():
+    rng = np.random.default_rng(0)
+    xy = rng.uniform(0, 700, (40, 2))
+    mass = rng.uniform(0.1, 5, 40)
+    charge = rng.choice([-5.0, 0.0, 5.0], 40)
+    isBall = np.arange(40) >= 5
+    expected = sum((mass[i] * mass[j] - charge[i] * charge[j])
+        * math.dist(xy[i], xy[j])
+        for i, j in itertools.combinations(range(40), 2)
+        if isBall[i] or isBall[j])
+    for blockSize in (1, 7, 1024):
+        assert diagnostics.pseudo_potential(xy, mass, charge, isBall,
+            blockSize) == pytest.approx(expected, rel = 1e-12)
+    # Without isBall, satellite pairs count too
+    assert diagnostics.pseudo_potential(xy, mass, charge) > expected
+
+@pytest.mark.parametrize('worldClass', [physics_core.World,
+    particle_arrays.ArrayWorld])
+def test_records_hold_energy_and_momentum(worldClass):
+    world = physics_core.populate_default_scene(worldClass([0, 0],
+        [720, 720], physics_core.SimulationClock()), nColMeter = 0,
+        nRowMeter = 0)
+    diagnostic = diagnostics.SystemDiagnostics(potentialEvery = 2)
+    world.set_diagnostics(diagnostic)
+    for i in range(3):
+        world.step(1 / 60)
+    balls = world.objs.balls
+    record = diagnostic.latest()
+    assert record['time'] == pytest.approx(3 / 60)
+    assert record['kinetic'] == pytest.approx(sum(ball.mass
+        * (ball.velocity0[0]**2 + ball.velocity0[1]**2) / 2
+        for ball in balls), rel = 1e-12)
+    assert record['momentumX'] == pytest.approx(sum(ball.mass
+        * ball.velocity0[0] for ball in balls), rel = 1e-12)
+    # The potential is only summed every other step
+    potential = diagnostic.column('potential')
+    assert np.isnan(potential[1]) and not np.isnan(potential[2])
+    assert diagnostic.history().shape == (3, len(diagnostics.FIELDS))
+
+def test_ring_buffer_and_csv_keep_every_step(tmp_path):
+    path = tmp_path / 'diagnostics.csv'
+    world = physics_core.default_world(fieldMeters = False)
+    with diagnostics.SystemDiagnostics(capacity = 8, path = str(path),
+            flushEvery = 3) as diagnostic:
+        world.set_diagnostics(diagnostic)
+        for i in range(20):
+            world.step(1 / 60)
+        times = diagnostic.column('time')
+        assert len(times) == 8
+        assert times == pytest.approx(np.arange(13, 21) / 60)
+    rows = np.loadtxt(path, delimiter = ',', skiprows = 1)
+    assert rows.shape == (20, len(diagnostics.FIELDS))
+    assert rows[:, 0] == pytest.approx(np.arange(1, 21) / 60)
+
+def test_collisions_and_wall_bounces_are_counted():
+    world = physics_core.World([0, 0], [720, 720],
+        physics_core.SimulationClock())
+    diagnostic = diagnostics.SystemDiagnostics()
+    world.set_diagnostics(diagnostic)
+    # Both balls of the pair see each other where the step started
+    world.set_update_order('two-phase')
+    left = world.add_ball([100, 360], 5, 0.1, 0)
+    right = world.add_ball([112, 360], 5, 0.1, 0)
+    wall = world.add_ball([710, 100], 5, 0.1, 0)
+    left.velocity0[0] = 300
+    right.velocity0[0] = -300
+    wall.velocity0[0] = 600
+    world.step(1 / 60)
+    record = diagnostic.latest()
+    assert record['collisions'] == 2
+    assert record['wallBounces'] == 1
+    world.step(1 / 60)
+    assert diagnostic.latest()['collisions'] == 0
+
+def test_energy_drift_needs_two_potentials():
+    diagnostic = diagnostics.SystemDiagnostics(potentialEvery = 10)
+    world = physics_core.default_world(fieldMeters = False)
+    world.set_diagnostics(diagnostic)
+    world.step(1 / 60)
+    assert math.isnan(diagnostic.energy_drift())
+    for i in range(10):
+        world.step(1 / 60)
+    assert not math.isnan(diagnostic.energy_drift())
+    assert diagnostics.SystemDiagnostics().latest() == {}
@@ -0,0 +1,93 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Tests of the strip solver and the two-phase update order, run
+         with pytest.
+"""
+
+import random
+import numpy as np
+import pytest
+import physics_core
+import particle_arrays
+import domain_decomposition
+
+@pytest.fixture
+def solver():
+    solver = domain_decomposition.StripSolver(workers = 3, serialBelow = 1)
+    yield solver
+    solver.close()
+
+def make_world(worldClass: type, solver = None, order: str = 'two-phase',
+        reverse: bool = False) -> physics_core.World:
+    world = worldClass([0, 0], [720, 720], physics_core.SimulationClock())
+    if solver is not None:
+        world.set_force_solver(solver)
+    world.set_update_order(order)
+    physics_core.populate_default_scene(world, nColMeter = 4, nRowMeter = 4)
+    rng = random.Random(3)
+    balls = [([rng.uniform(10, 710), rng.uniform(10, 710)], 4, 0.1,
+        rng.choice([-0.5, 0, 0.5])) for i in range(150)]
+    for ball in reversed(balls) if reverse else balls:
+        world.add_ball(*ball)
+    return world
+
+def positions(world: physics_core.World) -> np.ndarray:
+    """Ball positions by where they started, whatever the order."""
+    return np.array(sorted(list(obj.xy_current)
+        for obj in world.objs.balls))
+
+@pytest.mark.parametrize('cutoff', [None, 150])
+def test_strips_sum_like_pairwise_forces(solver, cutoff):
+    rng = np.random.default_rng(0)
+    srcXY = rng.uniform(0, 720, (200, 2))
+    srcMass = rng.uniform(0.1, 5, 200)
+    srcCharge = rng.choice([-1.0, 0.0, 1.0], 200)
+    solver.cutoff = cutoff
+    forces = solver.solve(srcXY, srcMass, srcCharge, srcXY[:120],
+        srcMass[:120], srcCharge[:120])
+    expected = particle_arrays.pairwise_forces(srcXY[:120], srcMass[:120],
+        srcCharge[:120], srcXY, srcMass, srcCharge, cutoff = cutoff)
+    for force, expectedForce in zip(forces, expected):
+        assert np.allclose(force, expectedForce, rtol = 1e-12, atol = 1e-9)
+    assert solver.stats()['parallelSteps'] == 1
+
+@pytest.mark.parametrize('worldClass', [physics_core.World,
+    particle_arrays.ArrayWorld])
+def test_worlds_step_alike_with_and_without_strips(solver, worldClass):
+    direct = make_world(worldClass)
+    strips = make_world(worldClass, solver)
+    for i in range(10):
+        direct.step(1 / 120)
+        strips.step(1 / 120)
+    assert np.abs(positions(direct) - positions(strips)).max() < 1e-9
+    for obj, other in zip(direct.objs.meters, strips.objs.meters):
+        assert np.allclose(obj.xyGForce, other.xyGForce, rtol = 1e-12)
+    assert solver.stats()['parallelSteps'] == 10
+
+def test_close_stops_the_workers(solver):
+    xy = np.zeros((4, 2))
+    ones = np.ones(4)
+    solver.solve(xy, ones, ones, xy, ones, ones)
+    assert 'pool' in solver.resources
+    solver.close()
+    assert solver.resources == {}
+    # A later step starts a new pool
+    solver.solve(xy, ones, ones, xy, ones, ones)
+    assert 'pool' in solver.resources
+
+def test_two_phase_does_not_depend_on_the_object_order():
+    forward = make_world(physics_core.World)
+    backward = make_world(physics_core.World, reverse = True)
+    for i in range(10):
+        forward.step(1 / 120)
+        backward.step(1 / 120)
+    assert np.abs(positions(forward) - positions(backward)).max() < 1e-9
+    # The sequential order does
+    forward = make_world(physics_core.World, order = 'sequential')
+    backward = make_world(physics_core.World, order = 'sequential',
+        reverse = True)
+    for i in range(10):
+        forward.step(1 / 120)
+        backward.step(1 / 120)
+    assert np.abs(positions(forward) - positions(backward)).max() > 1e-6
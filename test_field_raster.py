@@ -0,0 +1,69 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Tests of the field raster display, run with pytest.
+"""
+
+import numpy as np
+import pytest
+import physics_core
+import field_sampling
+import field_raster
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_pixels_show_the_field_at_their_centers():
+    world = physics_core.default_world()
+    world.step(1 / 60)
+    sources = field_sampling.FieldSources.from_objects(world.objs)
+
+    def sample(points):
+        return field_sampling.sample_field(points, sources)
+
+    for quantity in field_raster.QUANTITIES:
+        raster = field_raster.FieldRaster(8, quantity)
+        vectors = raster.field(sample, world.boundary)
+        # Row 2, column 5 of 8 over 720 pixels
+        meter = physics_core.PointForceField([5.5 * 90, 2.5 * 90])
+        meter.collect_forces(world.objs)
+        expected = {'gravity': meter.xyGForce, 'electric': meter.xyEForce,
+            'total': np.add(meter.xyGForce, meter.xyEForce)}[quantity]
+        assert np.allclose(vectors[2, 5], expected, rtol = 1e-12)
+
+def test_colours_follow_direction_and_length():
+    vectors = np.array([[1.0, 0], [0, 2], [-1, 0], [0, -0.5], [0, 0]])
+    colours = field_raster.direction_colours(vectors, 1)
+    assert colours.tolist() == [[255, 0, 0], [127, 255, 0], [0, 255, 255],
+        [63, 0, 127], [0, 0, 0]]
+
+def test_image_is_scaled_to_a_percentile():
+    raster = field_raster.FieldRaster(16, 'gravity', scalePercentile = 50)
+    boundary = physics_core.Boundary([0, 0], [160, 160])
+
+    def sample(points):
+        gField = np.zeros_like(points)
+        # Longer to the right, all pointing up
+        gField[:, 1] = points[:, 0]
+        return gField, np.zeros_like(points)
+
+    image = raster.image(sample, boundary)
+    assert image.shape == (16, 16, 3) and image.dtype == np.uint8
+    # The right half is at or past the median length, so at full brightness
+    assert (image[:, 8:, :].max(axis = 2) == 255).all()
+    assert (image[:, :7, :].max(axis = 2) < 255).all()
+
+def test_images_are_due_at_the_rate():
+    clock = FakeClock()
+    raster = field_raster.FieldRaster(rate = 5, realClock = clock)
+    due = []
+    for i in range(100):
+        clock.now = i / 100
+        due.append(raster.due())
+    assert sum(due) == 5
+    with pytest.raises(ValueError):
+        field_raster.FieldRaster(quantity = 'magnetic')
@@ -0,0 +1,93 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Tests of the batched field sampler, run with pytest.
+"""
+
+import numpy as np
+import physics_core
+import field_sampling
+
+def meter_fields(world: physics_core.World) -> np.ndarray:
+    return np.array([meter.xyGForce + meter.xyEForce
+        for meter in world.objs.meters])
+
+def test_sample_field_matches_a_field_meter():
+    world = physics_core.default_world()
+    physics_core.run_headless(20, 1 / 60, world)
+    sources = field_sampling.FieldSources.from_objects(world.objs)
+    points = np.random.default_rng(0).uniform(0, 720, (50, 2))
+    gForce, eForce = field_sampling.sample_field(points, sources)
+    for point, g, e in zip(points, gForce, eForce):
+        meter = physics_core.PointForceField(point.tolist())
+        meter.collect_forces(world.objs)
+        assert np.allclose(g, meter.xyGForce, rtol = 1e-12, atol = 1e-12)
+        assert np.allclose(e, meter.xyEForce, rtol = 1e-12, atol = 1e-12)
+
+def test_sample_field_without_sources_is_zero():
+    sources = field_sampling.FieldSources(np.zeros((0, 2)), np.zeros(0),
+        np.zeros(0))
+    gForce, eForce = field_sampling.sample_field([[1, 2], [3, 4]], sources)
+    assert gForce.tolist() == [[0, 0], [0, 0]]
+    assert eForce.tolist() == [[0, 0], [0, 0]]
+
+def test_sampled_meters_match_meters_summed_one_by_one():
+    single = physics_core.default_world()
+    batched = physics_core.default_world()
+    batched.set_field_sampler(field_sampling.FieldSampler(memoryBudget = 1))
+    for i in range(30):
+        single.step(1 / 60)
+        batched.step(1 / 60)
+    assert np.allclose(meter_fields(batched), meter_fields(single),
+        rtol = 1e-12, atol = 1e-12)
+    for obj, other in zip(single.objs.sources, batched.objs.sources):
+        assert obj.xy_current == other.xy_current
+
+def test_sampler_follows_a_changed_meter_grid():
+    world = physics_core.default_world()
+    sampler = field_sampling.FieldSampler()
+    world.set_field_sampler(sampler)
+    world.step(1 / 60)
+    world.add_field_grid(2, 2)
+    world.step(1 / 60)
+    assert len(sampler.meterXY) == len(world.objs.meters) == 148
+    assert all(meter.xyGForce != [0, 0] for meter in world.objs.meters)
+
+def test_satellite_tables_stay_close_to_the_exact_field():
+    exact = physics_core.default_world()
+    tables = physics_core.default_world()
+    exact.set_field_sampler(field_sampling.FieldSampler())
+    tables.set_field_sampler(field_sampling.FieldSampler(
+        satelliteTables = True, nPhase = 1440))
+    worst = 0
+    for i in range(120):
+        exact.step(1 / 60)
+        tables.step(1 / 60)
+        expected = meter_fields(exact)
+        error = np.abs(meter_fields(tables) - expected).max()
+        worst = max(worst, error / np.abs(expected).max())
+    # See SatelliteFieldTable for the measured error
+    assert worst < 0.012
+
+def test_table_lookup_is_exact_on_a_phase():
+    points = np.array([[0.0, 0.0], [60.0, 20.0]])
+    table = field_sampling.SatelliteFieldTable([0, 0], 100, points, 4)
+    assert np.allclose(table.lookup(np.pi / 2), [[0, 1], [-0.6, 0.8]],
+        atol = 1e-6)
+    assert np.allclose(table.lookup(np.pi / 2 + 2 * np.pi),
+        table.lookup(np.pi / 2))
+
+def test_satellite_tables_follow_removed_and_changed_orbits():
+    world = physics_core.default_world()
+    sampler = field_sampling.FieldSampler(satelliteTables = True)
+    world.set_field_sampler(sampler)
+    world.step(1 / 60)
+    first, second, third = world.objs.satellites
+    table = sampler.tables[second.objectId]
+    world.remove_object(first)
+    third.orbitRadius = 200
+    world.step(1 / 60)
+    assert sorted(sampler.tables) == sorted([second.objectId,
+        third.objectId])
+    assert sampler.tables[second.objectId] is table
+    assert sampler.tables[third.objectId].key[2] == 200
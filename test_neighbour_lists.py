@@ -0,0 +1,88 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Tests of the short-range neighbour list solver, run with pytest.
+"""
+
+import math
+import random
+import numpy as np
+import physics_core
+import particle_arrays
+import neighbour_lists
+
+def crowded_world(worldClass: type, seed: int = 0) -> physics_core.World:
+    rng = random.Random(seed)
+    world = worldClass([0, 0], [720, 720], physics_core.SimulationClock())
+    physics_core.populate_default_scene(world, nColMeter = 6, nRowMeter = 6)
+    for i in range(150):
+        ball = world.add_ball([rng.uniform(10, 710), rng.uniform(10, 710)],
+            2, rng.uniform(0.05, 1), rng.choice([-0.5, 0, 0.5]))
+        ball.velocity0[0] = rng.uniform(-100, 100)
+        ball.velocity0[1] = rng.uniform(-100, 100)
+    return world
+
+def cutoff_forces(obj, sources: list, cutoff: float) -> tuple:
+    """g_force() and e_force() over the sources within cutoff."""
+    near = [other for other in sources
+        if physics_core.dist(other.xy_current, obj.xy_current) <= cutoff]
+    return obj.g_force(near), obj.e_force(near)
+
+def test_lists_give_every_source_within_the_cutoff():
+    world = crowded_world(physics_core.World)
+    solver = neighbour_lists.NeighbourListSolver(cutoff = 100, skin = 20)
+    world.set_force_solver(solver)
+    for i in range(60):
+        world.step(1 / 60)
+    # Lists from an earlier build still hold every source in range
+    solver.prepare(world.objs, world.boundary)
+    assert solver.rebuilds < solver.steps
+    for obj in world.objs.balls + world.objs.meters:
+        gForce, eForce = solver.forces(obj)
+        gExpected, eExpected = cutoff_forces(obj, world.objs.sources, 100)
+        assert np.allclose(gForce, gExpected, rtol = 1e-12, atol = 1e-12)
+        assert np.allclose(eForce, eExpected, rtol = 1e-12, atol = 1e-12)
+
+def test_lists_are_rebuilt_once_a_body_moves_half_the_skin():
+    world = physics_core.default_world(fieldMeters = False)
+    solver = neighbour_lists.NeighbourListSolver(cutoff = 100, skin = 20)
+    solver.prepare(world.objs, world.boundary)
+    ball = world.objs.balls[0]
+    ball.xy_current[0] += 9
+    solver.prepare(world.objs, world.boundary)
+    assert solver.rebuilds == 1
+    ball.xy_current[0] += 2
+    solver.prepare(world.objs, world.boundary)
+    assert solver.rebuilds == 2
+
+def test_a_cutoff_past_the_box_is_the_direct_sum():
+    direct = crowded_world(physics_core.World)
+    lists = crowded_world(physics_core.World)
+    lists.set_force_solver(neighbour_lists.NeighbourListSolver(
+        cutoff = 1100))
+    for i in range(30):
+        direct.step(1 / 60)
+        lists.step(1 / 60)
+    for obj, other in zip(direct.objs.sources, lists.objs.sources):
+        assert physics_core.dist(obj.xy_current, other.xy_current) < 1e-9
+    for obj, other in zip(direct.objs.meters, lists.objs.meters):
+        assert math.isclose(obj.xyGForce[0], other.xyGForce[0],
+            rel_tol = 1e-9, abs_tol = 1e-9)
+
+def test_array_lists_match_the_pairwise_cutoff():
+    world = crowded_world(particle_arrays.ArrayWorld)
+    solver = neighbour_lists.NeighbourListSolver(cutoff = 100, skin = 20)
+    world.set_force_solver(solver)
+    p = world.particles
+    balls = np.flatnonzero(p.isBall)
+    for i in range(30):
+        world.step(1 / 60)
+        ballXY = p.xy[balls]
+        gForce, eForce = solver.particle_forces(p, ballXY, balls,
+            world.boundary)
+        gExpected, eExpected = particle_arrays.pairwise_forces(ballXY,
+            p.mass[balls], p.charge[balls], p.xy, p.mass, p.charge,
+            cutoff = 100)
+        assert np.allclose(gForce, gExpected, rtol = 1e-9, atol = 1e-9)
+        assert np.allclose(eForce, eExpected, rtol = 1e-9, atol = 1e-9)
+    assert solver.rebuilds < solver.steps
@@ -0,0 +1,137 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Tests of the NumPy array engine and its batched forces, run with
+         pytest.
+"""
+
+import random
+import tracemalloc
+import numpy as np
+import physics_core
+import particle_arrays
+
+def make_world(worldClass: type) -> physics_core.World:
+    world = worldClass([0, 0], [720, 720], physics_core.SimulationClock())
+    return physics_core.populate_default_scene(world)
+
+def random_bodies(n: int, seed: int = 0) -> tuple:
+    rng = np.random.default_rng(seed)
+    return rng.uniform(0, 720, (n, 2)), rng.uniform(0.1, 5, n), \
+        rng.choice([-5.0, 0.0, 5.0], n)
+
+def direct_forces(xy: np.ndarray, mass: np.ndarray, charge: np.ndarray,
+        srcXY: np.ndarray, srcMass: np.ndarray,
+        srcCharge: np.ndarray) -> tuple:
+    """The g_force() and e_force() loops, one target at a time."""
+    gForce = np.zeros((len(xy), 2))
+    eForce = np.zeros((len(xy), 2))
+    for i in range(len(xy)):
+        for j in range(len(srcXY)):
+            vector = srcXY[j] - xy[i]
+            d = np.sqrt(vector @ vector)
+            if d > 0:
+                gForce[i] += vector * mass[i] * srcMass[j] / d
+                eForce[i] -= vector * charge[i] * srcCharge[j] / d
+    return gForce, eForce
+
+def test_pairwise_forces_match_the_direct_loops():
+    xy, mass, charge = random_bodies(40)
+    gForce, eForce = particle_arrays.pairwise_forces(xy, mass, charge,
+        xy, mass, charge)
+    gExpected, eExpected = direct_forces(xy, mass, charge, xy, mass, charge)
+    assert np.allclose(gForce, gExpected, rtol = 1e-12, atol = 1e-9)
+    assert np.allclose(eForce, eExpected, rtol = 1e-12, atol = 1e-9)
+
+def test_pairwise_forces_do_not_depend_on_the_memory_budget():
+    xy, mass, charge = random_bodies(300, seed = 1)
+    expected = particle_arrays.pairwise_forces(xy, mass, charge, xy, mass,
+        charge, memoryBudget = 2**30)
+    # Budgets down to one target per block
+    for budget in (2**20, 2**14, 1):
+        forces = particle_arrays.pairwise_forces(xy, mass, charge, xy,
+            mass, charge, memoryBudget = budget)
+        for force, expectedForce in zip(forces, expected):
+            assert np.allclose(force, expectedForce, rtol = 1e-12,
+                atol = 1e-9)
+
+def test_pairwise_forces_cutoff_skips_far_pairs():
+    xy = np.array([[0.0, 0.0], [10.0, 0.0], [100.0, 0.0]])
+    ones = np.ones(3)
+    gForce, eForce = particle_arrays.pairwise_forces(xy[:1], ones[:1],
+        ones[:1], xy, ones, ones, cutoff = 50)
+    assert gForce.tolist() == [[1.0, 0.0]]
+    assert eForce.tolist() == [[-1.0, 0.0]]
+
+def test_first_step_matches_the_object_engine():
+    objects = make_world(physics_core.World)
+    arrays = make_world(particle_arrays.ArrayWorld)
+    objects.step(1 / 120)
+    arrays.step(1 / 120)
+    for obj, view in zip(objects.objs.sources, arrays.objs.sources):
+        assert np.allclose(obj.xy_current, view.xy_current, rtol = 0,
+            atol = 1e-9)
+
+def test_meters_show_the_field_after_the_step():
+    world = make_world(particle_arrays.ArrayWorld)
+    world.step(1 / 120)
+    p = world.particles
+    meterXY = np.array([meter.xy_current for meter in world.objs.meters])
+    ones = np.ones(len(meterXY))
+    gExpected, eExpected = direct_forces(meterXY, ones, ones, p.xy, p.mass,
+        p.charge)
+    for meter, g, e in zip(world.objs.meters, gExpected, eExpected):
+        assert np.allclose(meter.xyGForce, g, rtol = 1e-9)
+        assert np.allclose(meter.xyEForce, e, rtol = 1e-9, atol = 1e-9)
+
+def test_long_run_stays_close_to_the_object_engine():
+    objects = make_world(physics_core.World)
+    arrays = make_world(particle_arrays.ArrayWorld)
+    for i in range(300):
+        objects.step(1 / 120)
+        arrays.step(1 / 120)
+    for obj, view in zip(objects.objs.sources, arrays.objs.sources):
+        assert physics_core.dist(obj.xy_current, view.xy_current) < 0.01
+
+def test_views_write_through_to_the_arrays():
+    world = particle_arrays.ArrayWorld([0, 0], [720, 720],
+        physics_core.SimulationClock())
+    balls = [world.add_ball([100 + i, 200], 5, 0.1, 0) for i in range(100)]
+    # Growing past the first capacity keeps every row
+    assert world.particles.capacity >= 100
+    balls[70].xy_current[0] = 555
+    balls[70].mass = 2.5
+    assert world.particles.xy[balls[70].row].tolist() == [555, 200]
+    assert world.particles.mass[balls[70].row] == 2.5
+    assert [ball.xy_current[0] for ball in balls[:3]] == [100, 101, 102]
+
+def test_balls_stay_inside_the_boundary():
+    world = make_world(particle_arrays.ArrayWorld)
+    rng = random.Random(2)
+    for i in range(200):
+        ball = world.add_ball([rng.uniform(10, 710), rng.uniform(10, 710)],
+            3, 0.1, 0)
+        ball.velocity0[0] = rng.uniform(-3000, 3000)
+        ball.velocity0[1] = rng.uniform(-3000, 3000)
+    for i in range(100):
+        world.step(1 / 60)
+    p = world.particles
+    balls = p.isBall
+    assert (p.xy[balls] >= p.radius[balls, None]).all()
+    assert (p.xy[balls] <= 720 - p.radius[balls, None]).all()
+
+def test_views_are_smaller_than_objects():
+    sizes = []
+    for worldClass in (physics_core.World, particle_arrays.ArrayWorld):
+        world = worldClass([0, 0], [720, 720],
+            physics_core.SimulationClock())
+        world.add_ball([1, 1], 1, 1, 0)
+        tracemalloc.start()
+        balls = [world.add_ball([i % 700, 5], 1, 0.1, 0)
+            for i in range(10000)]
+        sizes.append(tracemalloc.get_traced_memory()[0])
+        tracemalloc.stop()
+    assert sizes[1] < 0.6 * sizes[0]
+    for view in balls[:10]:
+        assert not hasattr(view, '__dict__')
+    assert balls[0].weight == balls[0].mass == 0.1
@@ -0,0 +1,105 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Tests of the particle-mesh force solver, run with pytest.
+"""
+
+import sys
+import threading
+import numpy as np
+import physics_core
+import field_sampling
+import particle_mesh
+
+def random_sources(n: int = 300, seed: int = 0) -> tuple:
+    rng = np.random.default_rng(seed)
+    return rng.uniform(0, 720, (n, 2)), rng.uniform(0.1, 5, n), \
+        rng.choice([-1.0, 1.0], n)
+
+def field_error(solver: particle_mesh.MeshSolver, points: np.ndarray,
+        sources: tuple) -> tuple:
+    """Largest error of the gravity and electric field at points."""
+    solver.solve(*sources, [0, 0], [720, 720])
+    gField, eField = solver.sample_field(points)
+    gExpected, eExpected = field_sampling.sample_field(points,
+        field_sampling.FieldSources(*sources))
+    return np.abs(gField - gExpected).max(), np.abs(eField - eExpected).max()
+
+def test_finer_meshes_are_closer_to_the_direct_sum():
+    sources = random_sources()
+    points = np.random.default_rng(1).uniform(0, 720, (200, 2))
+    gExact, eExact = field_sampling.sample_field(points,
+        field_sampling.FieldSources(*sources))
+    errors = [field_error(particle_mesh.MeshSolver(resolution), points,
+        sources) for resolution in (32, 64, 128)]
+    assert errors[0] > errors[1] > errors[2]
+    assert errors[2][0] < 0.005 * np.abs(gExact).max()
+    assert errors[2][1] < 0.05 * np.abs(eExact).max()
+
+def test_short_range_fixes_close_pairs():
+    sources = random_sources()
+    # Points a few pixels from a source, where the mesh is worst. The
+    # mesh only covers the box
+    points = np.clip(sources[0][:50] + np.random.default_rng(2).normal(0,
+        3, (50, 2)), 0, 720)
+    meshOnly = field_error(particle_mesh.MeshSolver(64), points, sources)
+    solver = particle_mesh.MeshSolver(64, shortRange = 20)
+    shortRange = field_error(solver, points, sources)
+    assert shortRange[0] < meshOnly[0] / 5
+    assert shortRange[1] < meshOnly[1] / 5
+    assert solver.stats()['shortRangePairs'] >= 50
+
+def test_a_body_does_not_feel_itself():
+    solver = particle_mesh.MeshSolver(64, shortRange = 20)
+    solver.solve(np.array([[300.0, 300.0]]), np.array([2.0]),
+        np.array([1.0]), [0, 0], [720, 720])
+    gField, eField = solver.fields_at(np.array([[300.0, 300.0]]),
+        np.array([0]))
+    assert np.abs(gField).max() < 1e-12
+    assert np.abs(eField).max() < 1e-12
+
+def test_sampling_is_zero_before_the_first_solve():
+    gField, eField = particle_mesh.MeshSolver().sample_field([[1, 2]])
+    assert gField.tolist() == [[0, 0]]
+    assert eField.tolist() == [[0, 0]]
+
+def test_sampling_while_another_thread_solves():
+    solver = particle_mesh.MeshSolver(32, shortRange = 20)
+    small = random_sources(100)
+    large = random_sources(400, seed = 1)
+    solver.solve(*small, [0, 0], [720, 720])
+    points = np.random.default_rng(3).uniform(0, 720, (50, 2))
+    stop = threading.Event()
+
+    def solve_forever():
+        # Meshes of two sizes, so mixing them would show
+        while not stop.is_set():
+            solver.solve(*large, [0, 0], [720, 720])
+            solver.solve(*small, [0, 0], [720, 720])
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    worker = threading.Thread(target = solve_forever)
+    worker.start()
+    try:
+        for i in range(500):
+            gField, eField = solver.sample_field(points)
+            assert np.isfinite(gField).all() and np.isfinite(eField).all()
+    finally:
+        stop.set()
+        worker.join()
+        sys.setswitchinterval(interval)
+
+def test_world_steps_close_to_direct_sums():
+    direct = physics_core.default_world()
+    mesh = physics_core.default_world()
+    solver = particle_mesh.MeshSolver(128, shortRange = 30)
+    mesh.set_force_solver(solver)
+    mesh.set_field_sampler(particle_mesh.MeshFieldSampler(solver))
+    for i in range(60):
+        direct.step(1 / 60)
+        mesh.step(1 / 60)
+    for obj, other in zip(direct.objs.sources, mesh.objs.sources):
+        assert physics_core.dist(obj.xy_current, other.xy_current) < 0.5
+    for obj, other in zip(direct.objs.meters, mesh.objs.meters):
+        assert physics_core.dist(obj.xyGForce, other.xyGForce) < 0.5
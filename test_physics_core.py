@@ -0,0 +1,266 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Tests of the graphics-free physics core, run with pytest.
+"""
+
+import math
+import subprocess
+import sys
+import pytest
+import physics_core
+
+def named(world: physics_core.World, *names: str) -> list:
+    return [obj for obj in world.objs if obj.name in names]
+
+def positions(world: physics_core.World) -> list:
+    return [list(obj.xy_current) for obj in named(world, 'Ball',
+        'Satellite')]
+
+def test_imports_without_graphics():
+    code = 'import sys, physics_core; print("cmu_graphics" in sys.modules)'
+    output = subprocess.run([sys.executable, '-c', code],
+        capture_output = True, text = True, check = True).stdout
+    assert output.strip() == 'False'
+
+def test_headless_runs_are_deterministic():
+    first = physics_core.run_headless(200, 1 / 60)
+    second = physics_core.run_headless(200, 1 / 60)
+    assert positions(first) == positions(second)
+    assert first.clock() == second.clock()
+
+def test_simulation_clock_gives_every_object_dt():
+    world = physics_core.default_world(fieldMeters = False)
+    world.step(1 / 30)
+    for obj in named(world, 'Ball', 'Satellite'):
+        assert obj.timeLapse == 1 / 30
+
+def test_balls_stay_inside_the_boundary():
+    world = physics_core.default_world(fieldMeters = False)
+    for ball in named(world, 'Ball'):
+        ball.velocity0[0] = ball.velocity1[0] = 2000
+    physics_core.run_headless(300, 1 / 60, world)
+    for ball in named(world, 'Ball'):
+        assert ball.radius <= ball.xy_current[0] <= 720 - ball.radius
+        assert ball.radius <= ball.xy_current[1] <= 720 - ball.radius
+
+def test_satellites_keep_their_orbit():
+    world = physics_core.run_headless(100, 1 / 60)
+    for satellite in named(world, 'Satellite'):
+        distance = physics_core.dist(satellite.xy_current,
+            satellite.centerOrbit)
+        assert abs(distance - satellite.orbitRadius) < 1e-9
+
+def test_field_meters_sum_every_source():
+    world = physics_core.default_world()
+    # Meters see the sources where they were at the start of the step
+    start = [(list(obj.xy_current), obj.mass)
+        for obj in named(world, 'Ball', 'Satellite')]
+    world.step(1 / 60)
+    meter = named(world, 'Field')[0]
+    x, y = meter.xy_current
+    gForce = [0, 0]
+    for xy, mass in start:
+        d = physics_core.dist(xy, meter.xy_current)
+        gForce[0] += mass * (xy[0] - x) / d
+        gForce[1] += mass * (xy[1] - y) / d
+    assert abs(meter.xyGForce[0] - gForce[0]) < 1e-9
+    assert abs(meter.xyGForce[1] - gForce[1]) < 1e-9
+
+class FakeClock:
+    """Real time that only moves when a test says so."""
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_fixed_stepper_spends_real_time_in_whole_steps():
+    world = physics_core.default_world(fieldMeters = False)
+    clock = FakeClock()
+    # Powers of two, so the accumulator adds up exactly
+    stepper = physics_core.FixedStepper(world, 1 / 64, realClock = clock)
+    clock.now = 3.5 / 64
+    assert stepper.frame() == 3
+    assert stepper.accumulator == 0.5 / 64
+    clock.now = 4 / 64
+    assert stepper.frame() == 1
+    assert world.clock() == 4 / 64
+
+def test_fixed_stepper_drops_time_it_cannot_catch_up():
+    world = physics_core.default_world(fieldMeters = False)
+    clock = FakeClock()
+    stepper = physics_core.FixedStepper(world, 1 / 100, maxSubsteps = 4,
+        realClock = clock)
+    clock.now = 1
+    assert stepper.frame() == 4
+    assert stepper.accumulator == 0
+    assert abs(stepper.droppedTime - 0.96) < 1e-9
+
+def energy_drift(integrator: str, dt: float) -> float:
+    """Energy drift of a ball circling a fixed satellite for 200 seconds."""
+    world = physics_core.World([0, 0], [10000, 10000],
+        physics_core.SimulationClock())
+    world.add_satellite(1, 1, 0, 0, 0, 0)
+    ball = world.add_ball([5030, 5040], 1, 1, 0)
+    # A unit force 50 from the centre keeps a speed of sqrt(50) circular
+    ball.velocity0[0] = -4 / 5 * math.sqrt(50)
+    ball.velocity0[1] = 3 / 5 * math.sqrt(50)
+    world.set_integrator(integrator)
+
+    def energy() -> float:
+        # The 1/d law pulls with a constant force, so the potential is d
+        return (ball.velocity0[0]**2 + ball.velocity0[1]**2) / 2 \
+            + physics_core.dist(ball.xy_current, [5000, 5000])
+    # Velocities are predicted at the end of a step, so both ends of the
+    # run are measured after a step
+    world.step(dt)
+    start = energy()
+    for i in range(round(200 / dt)):
+        world.step(dt)
+    return abs(energy() - start) / start
+
+def test_verlet_keeps_energy_better_than_euler():
+    assert energy_drift('verlet', 0.5) < energy_drift('euler', 0.5) / 100
+    assert energy_drift('verlet', 0.1) < 1e-8
+
+def test_unknown_settings_are_rejected():
+    world = physics_core.default_world(fieldMeters = False)
+    with pytest.raises(ValueError):
+        world.set_integrator('rk4')
+    with pytest.raises(ValueError):
+        world.set_update_order('random')
+
+def test_registry_keeps_one_list_per_kind():
+    world = physics_core.default_world()
+    objs = world.objs
+    assert len(objs.boundaries) == 1
+    assert len(objs.meters) == 144
+    assert len(objs.satellites) == 3
+    assert len(objs.balls) == 4
+    assert objs.sources == objs.satellites + objs.balls
+    assert len(objs) == 152
+    assert [obj.objectId for obj in objs] == \
+        sorted(obj.objectId for obj in objs)
+    assert physics_core.objects_of_kind(list(objs), 'sources') == \
+        objs.sources
+
+def test_registry_removal_swaps_in_the_last_object():
+    world = physics_core.default_world(fieldMeters = False)
+    objs = world.objs
+    first, second, third, fourth = objs.balls
+    ids = [ball.objectId for ball in objs.balls]
+    world.remove_object(second)
+    assert objs.balls == [first, fourth, third]
+    assert objs.get(second.objectId) is None
+    for kind in ('balls', 'sources'):
+        collection = getattr(objs, kind)
+        index = 'kindIndex' if kind == 'balls' else 'sourceIndex'
+        assert [getattr(obj, index) for obj in collection] == \
+            list(range(len(collection)))
+    # Ids are never reused
+    ball = world.add_ball([100, 100], 5, 0.1, 0)
+    assert ball.objectId not in ids
+    assert objs.get(ball.objectId) is ball
+
+def test_bodies_have_no_instance_dict():
+    world = physics_core.default_world()
+    for obj in world.objs.sources:
+        assert not hasattr(obj, '__dict__')
+        with pytest.raises(AttributeError):
+            obj.color = 'green'
+    ball = world.objs.balls[0]
+    ball.mass = 0.3
+    assert ball.weight == 0.3
+    assert [ball.chargeColor for ball in world.objs.balls] == \
+        ['black', 'black', 'blue', 'red']
+
+class DrawnBall(physics_core.Ball):
+    """A ball that remembers what it was asked to draw."""
+    __slots__ = ('drawn', 'hidden')
+
+    def __init__(self, *args):
+        physics_core.Ball.__init__(self, *args)
+        self.drawn = []
+        self.hidden = False
+
+    def sync_shape(self, threshold: float = 0, state: tuple = None) -> bool:
+        self.drawn.append(self.shape_state() if state is None else state)
+        self.hidden = False
+        return True
+
+    def hide_shape(self) -> None:
+        self.hidden = True
+        return None
+
+def drawn_world() -> physics_core.World:
+    world = physics_core.World([0, 0], [720, 720],
+        physics_core.SimulationClock())
+    world.ballClass = DrawnBall
+    for i in range(3):
+        world.add_ball([100 + 100 * i, 100], 5, 0.1, 0)
+    return world
+
+def test_render_sync_keeps_its_own_rate():
+    world = drawn_world()
+    clock = FakeClock()
+    sync = physics_core.RenderSync(world, rate = 30, realClock = clock)
+    stepper = physics_core.FixedStepper(world, 1 / 240, realClock = clock,
+        renderer = sync)
+    for i in range(240):
+        clock.now += 1 / 240
+        stepper.frame()
+    assert abs(world.clock() - 1) < 0.01
+    assert 29 <= len(world.objs.balls[0].drawn) <= 31
+
+def test_render_sync_hides_removed_balls():
+    world = drawn_world()
+    sync = physics_core.RenderSync(world)
+    sync.frame()
+    first, second, third = world.objs.balls
+    world.remove_object(second)
+    sync.frame()
+    assert second.hidden and not first.hidden and not third.hidden
+    # Removed and back before the next render, so never hidden
+    world.remove_object(first)
+    world.respawn_ball(first, [50, 50], 5, 0.1, 0)
+    sync.frame()
+    assert not first.hidden
+    assert first.drawn[-1] == (50, 50, 5, 'black')
+
+def test_render_sync_restyles_respawned_balls():
+    world = drawn_world()
+    sync = physics_core.RenderSync(world)
+    sync.render()
+    ball = world.objs.balls[0]
+    assert ball.drawn[-1] == (100, 100, 5, 'black')
+    # Retired and spawned with another radius and charge between renders
+    world.remove_object(ball)
+    world.respawn_ball(ball, [50, 50], 8, 0.1, -0.5)
+    sync.render()
+    assert ball.drawn[-1] == (50, 50, 8, 'red')
+
+def test_render_sync_draws_each_snapshot_once():
+    world = drawn_world()
+    ball = world.objs.balls[0]
+
+    class Snapshot:
+        def __init__(self, x: float):
+            self.states = [(ball, (x, 100))]
+            self.removals = 0
+
+    class Source:
+        snapshot = None
+
+        def latest(self):
+            return self.snapshot
+
+    source = Source()
+    sync = physics_core.RenderSync(world, source = source)
+    sync.frame()
+    source.snapshot = Snapshot(1)
+    sync.frame()
+    sync.frame()
+    source.snapshot = Snapshot(2)
+    sync.frame()
+    assert ball.drawn == [(1, 100), (2, 100)]
@@ -0,0 +1,69 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Tests of the phase profiler, run with pytest.
+"""
+
+import csv
+import json
+import physics_core
+import profiling
+
+class StepClock:
+    """A clock that moves one millisecond every time it is read."""
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self) -> float:
+        self.now += 0.001
+        return self.now
+
+def test_summary_gives_percentiles_per_frame():
+    profiler = profiling.PhaseProfiler(window = 4)
+    for i in range(6):
+        profiler.add('Ball movement', (i + 1) / 1000)
+        profiler.count('Collisions', i)
+        profiler.end_frame()
+    rows = {row['name']: row for row in profiler.summary()}
+    # Only the last four frames stay in the window
+    assert rows['Ball movement']['frames'] == 4
+    assert abs(rows['Ball movement']['mean'] - 4.5) < 1e-9
+    assert abs(rows['Ball movement']['p50'] - 4) < 1e-9
+    assert abs(rows['Ball movement']['p99'] - 6) < 1e-9
+    assert rows['Collisions']['kind'] == 'count'
+    assert rows['Collisions']['mean'] == 3.5
+
+def test_phases_missing_from_a_frame_count_as_zero():
+    profiler = profiling.PhaseProfiler()
+    profiler.add('Render', 0.002)
+    profiler.end_frame()
+    profiler.end_frame()
+    assert list(profiler.times['Render']) == [0.002, 0]
+    assert profiler.frames == 2
+
+def test_world_phases_are_timed():
+    world = physics_core.default_world()
+    profiler = profiling.PhaseProfiler(clock = StepClock())
+    world.set_profiler(profiler)
+    physics_core.run_headless(5, 1 / 60, world)
+    rows = {row['name']: row for row in profiler.summary()}
+    for phase in ('World prepare', 'Ball movement', 'Ball update',
+            'Satellite movement', 'Field movement'):
+        assert rows[phase]['frames'] == 5
+        assert rows[phase]['mean'] > 0
+    assert profiler.overlay_lines(3)[0].endswith(' ms')
+
+def test_export_writes_the_summary(tmp_path):
+    profiler = profiling.PhaseProfiler()
+    profiler.add('Render', 0.004)
+    profiler.end_frame()
+    profiler.export_csv(tmp_path / 'profile.csv')
+    profiler.export_json(tmp_path / 'profile.json')
+    with open(tmp_path / 'profile.csv', newline = '') as file:
+        rows = list(csv.DictReader(file))
+    with open(tmp_path / 'profile.json') as file:
+        data = json.load(file)
+    assert rows[0]['name'] == 'Render'
+    assert float(rows[0]['mean']) == 4
+    assert data['frames'] == 1
+    assert data['phases'] == profiler.summary()
@@ -0,0 +1,108 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Tests of the JSON and .npz scene files, run with pytest.
+"""
+
+import json
+import numpy as np
+import pytest
+import physics_core
+import particle_arrays
+import scenes
+
+def moving_world(worldClass: type) -> physics_core.World:
+    world = physics_core.populate_default_scene(worldClass([0, 0],
+        [720, 720], physics_core.SimulationClock()), nColMeter = 3,
+        nRowMeter = 2)
+    for i in range(3):
+        world.step(1 / 60)
+    return world
+
+def assert_same_scene(scene: dict, other: dict) -> None:
+    assert sorted(scene) == sorted(other)
+    for kind in ('balls', 'satellites'):
+        for name, values in scene[kind].items():
+            assert np.array_equal(values, other[kind][name]), (kind, name)
+    assert np.array_equal(scene['meters'], other['meters'])
+    return None
+
+@pytest.mark.parametrize('suffix', ['.json', '.npz'])
+@pytest.mark.parametrize('worldClass', [physics_core.World,
+    particle_arrays.ArrayWorld])
+def test_scene_files_round_trip(tmp_path, suffix, worldClass):
+    scene = scenes.world_scene(moving_world(worldClass))
+    path = str(tmp_path / ('scene' + suffix))
+    scenes.save_scene(scene, path)
+    loaded = scenes.load_scene(path)
+    assert_same_scene(scene, loaded)
+
+    world = scenes.populate_scene(worldClass([0, 0], [720, 720],
+        physics_core.SimulationClock()), loaded)
+    assert_same_scene(scene, scenes.world_scene(world))
+
+def test_bulk_adds_match_single_adds():
+    rng = np.random.default_rng(0)
+    xy = rng.uniform(10, 710, (50, 2))
+    radius = rng.choice([3.0, 5.0], 50)
+    mass = rng.uniform(0.05, 1, 50)
+    charge = rng.choice([-0.5, 0.0, 0.5], 50)
+    velocity = rng.uniform(-100, 100, (50, 2))
+    worlds = [worldClass([0, 0], [720, 720], physics_core.SimulationClock())
+        for worldClass in (physics_core.World, physics_core.World,
+        particle_arrays.ArrayWorld)]
+    # Satellites stand still, the array engine moves them before the balls
+    for world in worlds:
+        world.add_satellites([5, 10], [5, 2], [1, -1], [0, 0], [100, 200],
+            [0, 1])
+    for i in range(50):
+        ball = worlds[0].add_ball(xy[i].tolist(), radius[i], mass[i],
+            charge[i])
+        ball.velocity0[:] = velocity[i].tolist()
+        ball.velocity1[:] = velocity[i].tolist()
+    for world in worlds[1:]:
+        world.add_balls(xy, radius, mass, charge, velocity)
+    expected = scenes.world_scene(worlds[0])
+    for world in worlds[1:]:
+        assert_same_scene(expected, scenes.world_scene(world))
+    for world in worlds:
+        # Every ball sees the others where the step started, like arrays
+        world.set_update_order('two-phase')
+        world.step(1 / 60)
+    for world in worlds[1:]:
+        for obj, other in zip(worlds[0].objs.sources, world.objs.sources):
+            assert physics_core.dist(obj.xy_current, other.xy_current) \
+                < 1e-9
+
+def test_single_values_and_meter_grids(tmp_path):
+    path = str(tmp_path / 'scene.json')
+    with open(path, 'w') as file:
+        json.dump({'meterGrid': [4, 3], 'balls': {'xy': [[100, 100],
+            [200, 100], [300, 100]], 'radius': 5, 'mass': 0.1,
+            'charge': 0}}, file)
+    scene = scenes.load_scene(path)
+    assert scene['balls']['radius'].tolist() == [5, 5, 5]
+    assert scene['balls']['velocity'].tolist() == [[0, 0]] * 3
+    assert len(scene['satellites']['mass']) == 0
+
+    world = scenes.populate_scene(physics_core.World([0, 0], [720, 720],
+        physics_core.SimulationClock()), scene)
+    assert len(world.objs.balls) == 3
+    assert len(world.objs.meters) == 12
+    world = scenes.populate_scene(physics_core.World([0, 0], [720, 720],
+        physics_core.SimulationClock()), scene, meters = False)
+    assert len(world.objs.meters) == 0
+
+def test_bad_scenes_are_rejected():
+    with pytest.raises(ValueError, match = 'no mass'):
+        scenes.scene_arrays({'balls': {'xy': [[1, 1]], 'radius': 1,
+            'charge': 0}})
+    with pytest.raises(ValueError, match = 'shape'):
+        scenes.scene_arrays({'balls': {'xy': [[1, 1], [2, 2]],
+            'radius': [1, 2, 3], 'mass': 1, 'charge': 0}})
+    with pytest.raises(ValueError, match = 'version'):
+        scenes.scene_arrays({'version': 99})
+    with pytest.raises(ValueError, match = 'boundary'):
+        scenes.populate_scene(physics_core.World([0, 0], [720, 720],
+            physics_core.SimulationClock()),
+            {'boundary': [[0, 0], [500, 500]]})
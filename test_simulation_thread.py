@@ -0,0 +1,71 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Tests of the physics worker thread, run with pytest.
+"""
+
+import threading
+import time
+import pytest
+import physics_core
+import simulation_thread
+
+def wait_for(condition, timeout: float = 5) -> bool:
+    """Polls condition until it holds or timeout seconds pass."""
+    end = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > end:
+            return False
+        time.sleep(0.001)
+    return True
+
+def test_worker_publishes_snapshots():
+    world = physics_core.default_world()
+    worker = simulation_thread.SimulationThread(world, 1 / 240)
+    worker.start()
+    try:
+        first = worker.latest()
+        assert first.steps == 0
+        assert len(first.states) == 7 + 144
+        assert wait_for(lambda: worker.latest().steps >= 10)
+    finally:
+        worker.stop(5)
+    assert not worker.thread.is_alive()
+    last = worker.latest()
+    assert last.steps == worker.steps
+    # Published states are those of the world when the worker stopped
+    for obj, state in last.states:
+        assert state == obj.shape_state()
+
+def test_commands_run_on_the_worker():
+    world = physics_core.default_world(fieldMeters = False)
+    worker = simulation_thread.SimulationThread(world, 1 / 240)
+    threads = []
+
+    def spawn():
+        threads.append(threading.current_thread().name)
+        world.add_ball([360, 360], 5, 0.1, 0)
+
+    worker.start()
+    try:
+        worker.submit(spawn)
+        assert wait_for(lambda: len(worker.latest().states) == 8)
+    finally:
+        worker.stop(5)
+    assert threads == ['physics']
+    assert len(world.objs.balls) == 5
+
+def test_errors_on_the_worker_reach_the_reader():
+    world = physics_core.default_world(fieldMeters = False)
+    worker = simulation_thread.SimulationThread(world, 1 / 240)
+
+    def fail():
+        raise ValueError('bad command')
+
+    worker.start()
+    worker.submit(fail)
+    assert wait_for(lambda: worker.error is not None)
+    worker.stop(5)
+    with pytest.raises(RuntimeError) as error:
+        worker.latest()
+    assert isinstance(error.value.__cause__, ValueError)
@@ -0,0 +1,81 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Tests of the spatial hash collision broad phase, run with pytest.
+"""
+
+import random
+import numpy as np
+import pytest
+import physics_core
+import particle_arrays
+import spatial_hash
+
+def crowded_world(worldClass: type, seed: int,
+        radii: tuple = (3,)) -> physics_core.World:
+    """Many balls in a small box, so collisions happen every step."""
+    rng = random.Random(seed)
+    world = worldClass([0, 0], [200, 200], physics_core.SimulationClock())
+    for i in range(3):
+        world.add_satellite(rng.uniform(5, 20), 5, 5, 0.2,
+            rng.uniform(20, 80), rng.uniform(0, 2 * np.pi))
+    for i in range(150):
+        ball = world.add_ball([rng.uniform(5, 195), rng.uniform(5, 195)],
+            rng.choice(radii), 0.1, rng.choice([-0.5, 0, 0.5]))
+        velocity = [rng.uniform(-200, 200), rng.uniform(-200, 200)]
+        ball.velocity0[:] = velocity
+        if hasattr(world, 'particles'):
+            # The arrays took their copy when the ball was added
+            world.particles.velocity[-1] = velocity
+    return world
+
+@pytest.mark.parametrize('worldClass', [physics_core.World,
+    particle_arrays.ArrayWorld])
+def test_grid_steps_exactly_like_a_full_scan(worldClass):
+    full = crowded_world(worldClass, 1)
+    grid = crowded_world(worldClass, 1)
+    grid.set_collision_grid(spatial_hash.SpatialHash())
+    for i in range(40):
+        full.step(1 / 120)
+        grid.step(1 / 120)
+    for obj, other in zip(full.objs, grid.objs):
+        if obj.name not in ('Ball', 'Satellite'):
+            continue
+        assert list(obj.xy_current) == list(other.xy_current)
+        assert list(obj.velocity1) == list(other.velocity1)
+
+@pytest.mark.parametrize('cellSize', [None, 3, 40])
+def test_array_partners_match_brute_force(cellSize):
+    for seed in range(5):
+        world = crowded_world(particle_arrays.ArrayWorld, seed, (1, 2, 6))
+        p = world.particles
+        balls = np.flatnonzero(p.isBall)
+        rng = np.random.default_rng(seed)
+        XY_next = p.xy[balls] + rng.normal(0, 1, (len(balls), 2))
+        expected = world.collision_partners(XY_next, balls)
+        world.set_collision_grid(spatial_hash.SpatialHash(cellSize))
+        partners = world.collision_partners(XY_next, balls)
+        assert (partners == expected).all()
+        assert (expected >= 0).any()
+
+def test_candidate_pairs_cover_every_close_pair():
+    rng = np.random.default_rng(3)
+    queryXY = rng.uniform(0, 100, (200, 2))
+    pointXY = rng.uniform(0, 100, (300, 2))
+    rows, cols = particle_arrays.grid_candidate_pairs(queryXY, pointXY, 7)
+    found = set(zip(rows.tolist(), cols.tolist()))
+    d = np.linalg.norm(queryXY[:, None] - pointXY[None, :], axis = 2)
+    close = set(zip(*(d < 7).nonzero()))
+    assert close <= found
+    assert len(found) < len(queryXY) * len(pointXY) / 4
+
+def test_grid_checks_fewer_pairs_than_a_full_scan():
+    world = physics_core.default_world(fieldMeters = False)
+    for i in range(200):
+        world.add_ball([20 + 3.4 * i, 360], 1, 0.1, 0)
+    grid = spatial_hash.SpatialHash()
+    world.set_collision_grid(grid)
+    world.step(1 / 120)
+    stats = grid.stats()
+    assert stats['queries'] == 204
+    assert stats['candidatePairs'] < stats['allPairs'] / 10
@@ -0,0 +1,89 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Tests of the parameter sweep runner, run with pytest.
+"""
+
+import argparse
+import json
+import pytest
+import sweeps
+
+SETTINGS = (60, 1 / 60, 'objects', 60, 10)
+
+def test_parse_values_and_ranges():
+    assert sweeps.parse_values('balls=4,40') == ('balls', [4.0, 40.0])
+    assert sweeps.parse_range('massBall=0.05:0.5') == ('massBall', 0.05,
+        0.5)
+    with pytest.raises(argparse.ArgumentTypeError):
+        sweeps.parse_values('speed=1,2')
+    with pytest.raises(argparse.ArgumentTypeError):
+        sweeps.parse_range('massBall=1:2:3')
+
+def test_grid_runs_cover_every_combination():
+    runs = sweeps.make_runs([('chargeSatellite', [1, 5, 10]),
+        ('balls', [4, 8])], [], 0, 7, 2)
+    assert len(runs) == 12
+    assert len({run['id'] for run in runs}) == 12
+    assert {(run['params']['chargeSatellite'], run['params']['balls'])
+        for run in runs} == {(c, b) for c in (1, 5, 10) for b in (4, 8)}
+    assert runs[0]['params']['massBall'] == sweeps.PARAMETERS['massBall']
+    # The same arguments give the same runs
+    assert runs == sweeps.make_runs([('chargeSatellite', [1, 5, 10]),
+        ('balls', [4, 8])], [], 0, 7, 2)
+
+def test_random_runs_stay_in_their_range():
+    runs = sweeps.make_runs([], [('massBall', 0.05, 0.5)], 20, 1, 1)
+    assert len(runs) == 20
+    assert all(0.05 <= run['params']['massBall'] <= 0.5 for run in runs)
+
+@pytest.mark.parametrize('engine', ['objects', 'arrays'])
+def test_runs_are_seeded(engine):
+    run = sweeps.make_runs([('balls', [10])], [], 0, 3, 1)[0]
+    settings = (60, 1 / 60, engine, 60, 10)
+    first = sweeps.run_simulation(run, *settings)
+    second = sweeps.run_simulation(run, *settings)
+    for key in ('trappedFraction', 'escapedFraction', 'meanSpeed'):
+        assert first[key] == second[key]
+    assert 0 <= first['trappedFraction'] <= 1
+
+def test_failed_runs_become_result_lines():
+    run = sweeps.make_runs([('balls', [6])], [], 0, 3, 1)[0]
+    run['params']['massBall'] = 0
+    result = sweeps.run_safely(run, *SETTINGS)
+    assert result['id'] == run['id']
+    assert 'ZeroDivisionError' in result['error']
+
+def test_resume_skips_finished_runs(tmp_path):
+    output = str(tmp_path / 'sweep.jsonl')
+    runs = sweeps.make_runs([('balls', [4, 5, 6])], [], 0, 3, 1)
+    assert sweeps.run_sweep(runs[:2], output, False, 1, 2048,
+        *SETTINGS) == 0
+    # A failed run and a line cut off by an interruption
+    with open(output, 'a') as file:
+        file.write(json.dumps({'id': runs[2]['id'], 'error': 'x'}) + '\n')
+        file.write('{"id": "cut')
+    assert sweeps.finished_ids(output) == {runs[0]['id'], runs[1]['id']}
+    with open(output, 'a') as file:
+        file.write('\n')
+    sweeps.run_sweep(runs, output, True, 1, 2048, *SETTINGS)
+    assert sweeps.finished_ids(output) == {run['id'] for run in runs}
+    with open(output) as file:
+        text = file.read()
+    # Only the failed run ran again
+    assert text.count(runs[0]['id']) == 1
+    assert text.count(runs[2]['id']) == 2
+
+def test_sweeps_run_without_max_tasks_per_child(tmp_path, monkeypatch):
+    # Python before 3.11 rejects the max_tasks_per_child keyword
+    executor = sweeps.concurrent.futures.ProcessPoolExecutor
+    def old_executor(max_workers, initializer, initargs):
+        return executor(max_workers = max_workers,
+            initializer = initializer, initargs = initargs)
+    monkeypatch.setattr(sweeps.sys, 'version_info', (3, 10, 0))
+    monkeypatch.setattr(sweeps.concurrent.futures, 'ProcessPoolExecutor',
+        old_executor)
+    output = str(tmp_path / 'sweep.jsonl')
+    runs = sweeps.make_runs([('balls', [4])], [], 0, 1, 1)
+    assert sweeps.run_sweep(runs, output, False, 1, 2048, *SETTINGS) == 0
+    assert sweeps.finished_ids(output) == {runs[0]['id']}
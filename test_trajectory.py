@@ -0,0 +1,92 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Tests of trajectory recording and replay, run with pytest.
+"""
+
+import random
+import numpy as np
+import pytest
+import physics_core
+import particle_arrays
+import ball_lifecycle
+import trajectory
+
+def record_run(worldClass: type, path: str, steps: int = 60) -> list:
+    """Records a run with balls spawned and removed on the way.
+
+    Returns the positions of every body by objectId after each step."""
+    rng = random.Random(3)
+    world = physics_core.populate_default_scene(worldClass([0, 0],
+        [720, 720], physics_core.SimulationClock()), nColMeter = 0,
+        nRowMeter = 0)
+    pool = ball_lifecycle.BallPool(world)
+    truth = []
+    with trajectory.TrajectoryRecorder(path, capacity = 4, dt = 1 / 120,
+            chunk = 8, flushEvery = 5) as recorder:
+        for step in range(steps):
+            world.step(1 / 120)
+            if step % 7 == 3:
+                pool.spawn([rng.uniform(50, 650), rng.uniform(50, 650)], 5,
+                    0.1, 0.5)
+            if step % 11 == 5:
+                pool.retire(rng.choice(world.objs.balls))
+            recorder.record(world)
+            truth.append({obj.objectId: list(obj.xy_current)
+                for obj in world.objs.sources})
+    return truth
+
+@pytest.mark.parametrize('worldClass', [physics_core.World,
+    particle_arrays.ArrayWorld])
+def test_recording_keeps_every_body(worldClass, tmp_path):
+    path = str(tmp_path / 'run.traj')
+    truth = record_run(worldClass, path)
+    recording = trajectory.Trajectory(path)
+    assert len(recording) == 60
+    # Started with room for 4 and grew instead of failing
+    assert recording.capacity >= max(len(bodies) for bodies in truth)
+    assert recording.times[-1] == pytest.approx(0.5)
+    for k, bodies in enumerate(truth):
+        count = int(recording.counts[k])
+        ids = recording.object_ids(k, k + 1)[0, :count].astype(int)
+        xy = recording.positions(k, k + 1)[0, :count]
+        assert sorted(ids.tolist()) == sorted(bodies)
+        for objectId, position in zip(ids.tolist(), xy.tolist()):
+            assert position == pytest.approx(bodies[objectId], abs = 1e-3)
+        assert np.isnan(recording.positions(k, k + 1)[0, count:]).all()
+
+@pytest.mark.parametrize('worldClass', [physics_core.World,
+    particle_arrays.ArrayWorld])
+def test_replay_matches_bodies_by_object_id(worldClass, tmp_path):
+    path = str(tmp_path / 'run.traj')
+    truth = record_run(worldClass, path)
+    world = worldClass([0, 0], [720, 720], physics_core.SimulationClock())
+    player = trajectory.TrajectoryPlayer(trajectory.Trajectory(path), world)
+    # Twice round, so looping back to the start is replayed too
+    for k in list(range(len(truth))) * 2:
+        assert player.frame()
+        assert sorted(player.bodies) == sorted(truth[k])
+        assert len(world.objs.sources) == len(truth[k])
+        for objectId, body in player.bodies.items():
+            assert list(body.xy_current) == pytest.approx(
+                truth[k][objectId], abs = 1e-3)
+
+def test_a_partly_written_file_reads_up_to_its_last_record(tmp_path):
+    path = str(tmp_path / 'run.traj')
+    world = physics_core.default_world(fieldMeters = False)
+    recorder = trajectory.TrajectoryRecorder(path, capacity = 8,
+        flushEvery = 4)
+    for i in range(10):
+        world.step(1 / 60)
+        recorder.record(world)
+    # Not closed: the header only counts the records flushed so far
+    recorder.records.flush()
+    assert len(trajectory.Trajectory(path)) == 8
+    recorder.close()
+    assert len(trajectory.Trajectory(path)) == 10
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / 'other.traj'
+    path.write_bytes(b'\0' * 128)
+    with pytest.raises(ValueError):
+        trajectory.Trajectory(str(path))
@@ -0,0 +1,284 @@
+"""
+Name: Angelina Kim
+Date: Fall 2024
+Purpose: Records every step of a run to a memory-mapped binary file and
+         plays it back. Records are fixed-width float32, so any time slice
+         is a zero-copy NumPy view, even of recordings larger than RAM.
+"""
+
+import os
+import struct
+import numpy as np
+import physics_core
+from particle_arrays import ArrayWorld
+
+# magic, version, body capacity, columns, dt, records
+HEADER = struct.Struct('<8sIIIdQ')
+HEADER_BYTES = 64
+MAGIC = b'PHYSTRAJ'
+VERSION = 2
+# Columns of every body, row 0 of a record holds time, count and step.
+# float32 holds objectIds exactly up to 2**24.
+COLUMNS = ('x', 'y', 'vx', 'vy', 'charge', 'radius', 'mass', 'isBall',
+    'objectId')
+
+class TrajectoryRecorder:
+    """Appends one record per step of all balls and satellites.
+
+    A record is (capacity + 1) x 9 float32 values. Row 0 holds the time,
+    the body count and the step number, the next rows one body each with
+    its objectId, unused rows are NaN. The file grows in chunks and is
+    mapped into memory, the header's record count is updated every
+    flushEvery records and on close(). A step with more bodies than
+    capacity rewrites the file with at least twice the capacity. Add it
+    to FixedStepper.monitors to record every physics step."""
+    def __init__(self, path: str, capacity: int = 1024, dt: float = 0,
+            chunk: int = 256, flushEvery: int = 64):
+        self.path = path
+        self.capacity = capacity
+        self.dt = dt
+        self.chunk = chunk
+        self.flushEvery = flushEvery
+        self.count = 0
+        self.file = open(path, 'w+b')
+        self.write_header()
+        self.allocated = 0
+        self.records = None
+        self.grow()
+
+    def record_shape(self) -> tuple:
+        """Shape of one record."""
+        return (self.capacity + 1, len(COLUMNS))
+
+    def write_header(self) -> None:
+        """Writes the header with the current record count."""
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, self.capacity,
+            len(COLUMNS), self.dt, self.count).ljust(HEADER_BYTES, b'\0'))
+        self.file.flush()
+        return None
+
+    def grow(self, allocated: int = None) -> None:
+        """Extends the file to allocated records, by default chunk more,
+        and maps it again."""
+        if self.records is not None:
+            self.records.flush()
+        self.allocated = allocated or self.allocated + self.chunk
+        recordBytes = 4 * (self.capacity + 1) * len(COLUMNS)
+        self.file.truncate(HEADER_BYTES + self.allocated * recordBytes)
+        self.records = np.memmap(self.file, dtype = np.float32, mode = 'r+',
+            offset = HEADER_BYTES,
+            shape = (self.allocated,) + self.record_shape())
+        return None
+
+    def widen(self, capacity: int) -> None:
+        """Rewrites the file with room for capacity bodies per record.
+
+        Records are copied chunk by chunk, so a long recording is never
+        in memory at once."""
+        self.records.flush()
+        oldRecords = self.records
+        oldFile = self.file
+        oldRows = self.capacity + 1
+        self.capacity = capacity
+        self.file = open(self.path + '.widen', 'w+b')
+        self.write_header()
+        self.records = None
+        self.grow(self.allocated)
+        for start in range(0, self.count, self.chunk):
+            stop = min(start + self.chunk, self.count)
+            self.records[start:stop, :oldRows] = oldRecords[start:stop]
+            self.records[start:stop, oldRows:] = np.nan
+        del oldRecords
+        oldFile.close()
+        os.replace(self.path + '.widen', self.path)
+        return None
+
+    def after_step(self, world: physics_core.World) -> None:
+        """Monitor hook of FixedStepper, records the world."""
+        self.record(world)
+        return None
+
+    def record(self, world: physics_core.World) -> None:
+        """Appends the state of every ball and satellite of world."""
+        if isinstance(world, ArrayWorld):
+            p = world.particles
+            objectIds = np.array([obj.objectId for obj in p.objects],
+                dtype = float)
+            bodies = np.concatenate([p.xy, p.velocity, p.charge[:, None],
+                p.radius[:, None], p.mass[:, None], p.isBall[:, None],
+                objectIds[:, None]], axis = 1)
+        else:
+            bodies = np.array([(obj.xy_current[0], obj.xy_current[1],
+                obj.velocity1[0], obj.velocity1[1], obj.charge, obj.radius,
+                obj.mass, obj.name == 'Ball', obj.objectId)
+                for obj in physics_core.objects_of_kind(world.objs,
+                    'sources')], dtype = float).reshape(-1, len(COLUMNS))
+        if len(bodies) > self.capacity:
+            self.widen(max(len(bodies), 2 * self.capacity))
+
+        if self.count == self.allocated:
+            self.grow()
+        record = self.records[self.count]
+        record[0] = 0
+        record[0, :3] = (world.clock(), len(bodies), self.count)
+        record[1:len(bodies) + 1] = bodies
+        record[len(bodies) + 1:] = np.nan
+        self.count += 1
+        if self.count % self.flushEvery == 0:
+            self.flush()
+        return None
+
+    def flush(self) -> None:
+        """Writes the records and the header count to disk."""
+        self.records.flush()
+        self.write_header()
+        return None
+
+    def close(self) -> None:
+        """Flushes and trims the file to the records written."""
+        self.flush()
+        recordBytes = 4 * (self.capacity + 1) * len(COLUMNS)
+        self.records = None
+        self.file.truncate(HEADER_BYTES + self.count * recordBytes)
+        self.file.close()
+        return None
+
+    def __enter__(self) -> "TrajectoryRecorder":
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.close()
+        return None
+
+class Trajectory:
+    """Read-only view of a recording.
+
+    Nothing is loaded up front. Every accessor returns a NumPy view into
+    the memory-mapped file, pages are read when touched."""
+    def __init__(self, path: str):
+        with open(path, 'rb') as file:
+            magic, version, capacity, columns, dt, count = HEADER.unpack(
+                file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'Not a trajectory file: {path}')
+        self.path = path
+        self.capacity = capacity
+        self.dt = dt
+        recordBytes = 4 * (capacity + 1) * columns
+        # Records past the header count may be half written
+        count = min(count, (os.path.getsize(path) - HEADER_BYTES)
+            // recordBytes)
+        if count > 0:
+            self.records = np.memmap(path, dtype = np.float32, mode = 'r',
+                offset = HEADER_BYTES, shape = (count, capacity + 1, columns))
+        else:
+            self.records = np.zeros((0, capacity + 1, columns),
+                dtype = np.float32)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def times(self) -> np.ndarray:
+        """Simulation time of every record."""
+        return self.records[:, 0, 0]
+
+    @property
+    def counts(self) -> np.ndarray:
+        """Body count of every record."""
+        return self.records[:, 0, 1]
+
+    def bodies(self, start: int = 0, stop: int = None) -> np.ndarray:
+        """Records start to stop as (steps, capacity, columns)."""
+        return self.records[start:stop, 1:]
+
+    def column(self, name: str, start: int = 0,
+            stop: int = None) -> np.ndarray:
+        """One column of COLUMNS for records start to stop."""
+        return self.bodies(start, stop)[..., COLUMNS.index(name)]
+
+    def object_ids(self, start: int = 0, stop: int = None) -> np.ndarray:
+        """objectId of every row as (steps, capacity), NaN past each body
+        count. Rows move when bodies are removed, ids do not."""
+        return self.column('objectId', start, stop)
+
+    def positions(self, start: int = 0, stop: int = None) -> np.ndarray:
+        """Positions as (steps, capacity, 2), NaN past each body count."""
+        return self.bodies(start, stop)[..., 0:2]
+
+    def velocities(self, start: int = 0, stop: int = None) -> np.ndarray:
+        """Velocities as (steps, capacity, 2), NaN past each body count."""
+        return self.bodies(start, stop)[..., 2:4]
+
+    def charges(self, start: int = 0, stop: int = None) -> np.ndarray:
+        """Charges as (steps, capacity)."""
+        return self.column('charge', start, stop)
+
+    def frame(self, index: int) -> np.ndarray:
+        """The bodies of one record, trimmed to its body count."""
+        return self.records[index, 1:int(self.records[index, 0, 1]) + 1]
+
+class TrajectoryPlayer:
+    """Moves the bodies of a world along a recording.
+
+    Recorded bodies are matched by objectId. Bodies missing from the
+    world are added on the way, with the recorded radius, mass and
+    charge, and bodies missing from a record are removed, so RenderSync
+    hides them. The world is never stepped, so RenderSync draws the
+    recorded positions as they are."""
+    def __init__(self, trajectory: Trajectory, world: physics_core.World,
+            recordsPerFrame: int = 1, loop: bool = True):
+        self.trajectory = trajectory
+        self.world = world
+        self.recordsPerFrame = recordsPerFrame
+        self.loop = loop
+        self.index = 0
+        # Bodies by recorded objectId, in the world or removed
+        self.bodies = {}
+        self.removed = {}
+
+    def show(self, index: int) -> None:
+        """Puts every body where record index has it."""
+        rows = self.trajectory.frame(index).tolist()
+        shown = {}
+        for x, y, vx, vy, charge, radius, mass, isBall, objectId in rows:
+            objectId = int(objectId)
+            body = self.bodies.pop(objectId, None)
+            if body is None:
+                body = self.add_body(objectId, [x, y], radius, mass, charge,
+                    isBall)
+            body.xy_current[0] = x
+            body.xy_current[1] = y
+            body.velocity1[0] = vx
+            body.velocity1[1] = vy
+            body.charge = charge
+            shown[objectId] = body
+        # Bodies left over are not in this record
+        for objectId, body in self.bodies.items():
+            self.world.remove_object(body)
+            self.removed[objectId] = body
+        self.bodies = shown
+        return None
+
+    def add_body(self, objectId: int, xy: list, radius: float, mass: float,
+            charge: float, isBall: bool) -> "Ball | Satellite":
+        """Adds the body recorded as objectId, reusing a removed ball."""
+        body = self.removed.pop(objectId, None)
+        if body is not None and isBall:
+            return self.world.respawn_ball(body, xy, radius, mass, charge)
+        if isBall:
+            return self.world.add_ball(xy, radius, mass, charge)
+        return self.world.add_satellite(radius, mass, charge, 0, 0, 0)
+
+    def frame(self) -> bool:
+        """Shows the next record, returns False once the end is reached."""
+        if len(self.trajectory) == 0:
+            return False
+        if self.index >= len(self.trajectory):
+            if not self.loop:
+                return False
+            self.index = 0
+        self.show(self.index)
+        self.index += self.recordsPerFrame
+        return True